@@ -0,0 +1,90 @@
+# Wall-clock scaling of the clinic report (python -m healthtrack report) with the
+# number of worker processes. Headless, no display needed.
+#
+# Builds --profiles synthetic profiles in a scratch data directory (a year of
+# hourly steps, daily water and sleep, a monthly BMI), then reports on all of them
+# over the last year by month with 1, 2, 4, ... workers up to the core count (or
+# --workers), writing the CSV to /dev/null. Prints the time, throughput, speedup
+# over one worker and parallel efficiency for each.
+#
+#     python benchmarks/bench_reports.py --profiles 2000
+#     python benchmarks/bench_reports.py --workers 1 2 3 4 6 8
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from healthtrack import ProfileManager  # noqa: E402
+from healthtrack.reports import report, split_range, write_csv  # noqa: E402
+
+
+def populate(data_dir, count, seed=0):
+    rng = random.Random(seed)
+    manager = ProfileManager(data_dir, max_open=1)
+    end = time.time()
+    hours = [end - h * 3600 for h in range(365 * 24, 0, -1)]
+    days = hours[::24]
+    for i in range(count):
+        tracker = manager.get(f"patient-{i:05d}")
+        tracker.extend("steps", hours, [float(rng.randint(0, 900)) for _ in hours])
+        tracker.extend("water", days, [rng.choice((0.25, 0.5)) * rng.randint(2, 8) for _ in days])
+        tracker.extend("sleep", days, [float(rng.randint(4, 9)) for _ in days])
+        weight = rng.uniform(55, 110)
+        for day in days[::30]:
+            weight += rng.uniform(-1.5, 1.0)
+            tracker.record_bmi(weight, rng.uniform(155, 195), day)
+    manager.close()
+    return manager.profiles_directory
+
+
+def default_workers():
+    cores = os.cpu_count() or 1
+    workers = [1]
+    while workers[-1] * 2 <= cores:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != cores:
+        workers.append(cores)
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clinic report scaling with worker processes")
+    parser.add_argument("--profiles", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers())
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument("--period", default="month")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="healthtrack-reports-")
+    try:
+        start = time.perf_counter()
+        profiles_directory = populate(data_dir, args.profiles)
+        print(f"Created {args.profiles} profiles in {time.perf_counter() - start:.1f}s, {os.cpu_count()} cores")
+        names = sorted(os.listdir(profiles_directory))
+        end = date.today()
+        ranges = split_range(end - timedelta(days=364), end, args.period)
+
+        print(f"{'workers':>8}{'seconds':>10}{'profiles/s':>12}{'speedup':>9}{'efficiency':>12}")
+        single = None
+        with open(os.devnull, "w", newline="") as devnull:
+            for workers in args.workers:
+                start = time.perf_counter()
+                write_csv(report(profiles_directory, names, ranges, workers, args.chunksize), devnull)
+                elapsed = time.perf_counter() - start
+                if workers == 1:
+                    single = elapsed
+                speedup = single / elapsed if single else float("nan")
+                print(f"{workers:>8}{elapsed:>10.2f}{len(names) / elapsed:>12,.0f}{speedup:>8.2f}x{speedup / workers:>12.0%}")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
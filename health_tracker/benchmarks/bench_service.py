@@ -0,0 +1,190 @@
+# Load test for the HTTP service (python -m healthtrack serve): requests per second
+# and latency percentiles. Headless, no display needed.
+#
+# Starts a server on a scratch data directory (or uses --url) and runs --connections
+# concurrent clients, each sending --requests requests back to back. "readings"
+# posts one reading per request, "mixed" adds summaries, BMI, advice and
+# appointment bookings, "batch" posts --batch-size readings per /batch request.
+# --close opens a new connection for every request, to compare with keep-alive.
+#
+#     python benchmarks/bench_service.py --connections 64 --requests 500
+#     python benchmarks/bench_service.py --workload batch --batch-size 50
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from urllib.parse import urlsplit
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from healthtrack import DOCTORS, METRICS, slot_times  # noqa: E402
+from healthtrack.appointments import OPENING, SLOT  # noqa: E402
+
+WORKLOADS = ("readings", "mixed", "batch")
+PROFILES = ["load-%d" % i for i in range(8)]
+SYMPTOMS = ["headache and a cough", "I feel tired", "sore throat and fever", "back pain after running"]
+
+
+def reading(rng):
+    metric = rng.choice(METRICS)
+    return {"metric": metric, "value": {"steps": rng.randint(0, 2000), "water": 0.25, "sleep": 1.0}[metric]}
+
+
+def requests_for(workload, client, count, batch_size):
+    # (method, path, body) for one client
+    rng = random.Random(client)
+    profile = PROFILES[client % len(PROFILES)]
+    slots = itertools.count(client * count)
+    for _ in range(count):
+        if workload == "batch":
+            body = [{"method": "POST", "path": f"/profiles/{profile}/readings", "body": reading(rng)} for _ in range(batch_size)]
+            yield "POST", "/batch", body
+            continue
+        kind = "readings" if workload == "readings" else rng.choice(("readings", "readings", "readings", "summary", "bmi", "advice", "book"))
+        if kind == "readings":
+            yield "POST", f"/profiles/{profile}/readings", reading(rng)
+        elif kind == "summary":
+            yield "GET", f"/profiles/{profile}/summary", None
+        elif kind == "bmi":
+            yield "POST", "/bmi", {"weight": rng.uniform(45, 120), "height": rng.uniform(150, 200)}
+        elif kind == "advice":
+            yield "POST", "/advice", {"symptoms": rng.choice(SYMPTOMS)}
+        else:
+            # Mostly distinct slots far in the future, a few collide and get a 409
+            day, slot = divmod(next(slots) // 2, len(slot_times()))
+            start = datetime.combine(date(2100, 1, 1) + timedelta(days=day), OPENING) + SLOT * slot
+            yield "POST", f"/profiles/{profile}/appointments", {"doctor": rng.choice(DOCTORS), "start": start.isoformat()}
+
+
+async def send(reader, writer, host, method, path, body, keep_alive):
+    data = b"" if body is None else json.dumps(body).encode("utf-8")
+    writer.write(
+        (
+            f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode("latin-1")
+        + data
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, requests, keep_alive, latencies, statuses):
+    connection = None
+    for method, path, body in requests:
+        start = time.perf_counter()
+        if connection is None:
+            connection = await asyncio.open_connection(host, port)
+        status = await send(*connection, host, method, path, body, keep_alive)
+        if not keep_alive:
+            connection[1].close()
+            connection = None
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+    if connection is not None:
+        connection[1].close()
+
+
+async def run(host, port, args):
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client(host, port, requests_for(args.workload, i, args.requests, args.batch_size), not args.close, latencies, statuses)
+            for i in range(args.connections)
+        )
+    )
+    return time.perf_counter() - start, latencies, statuses
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(data_dir, workers):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "healthtrack", "serve", "--port", str(port), "--data-dir", data_dir, "--workers", str(workers)],
+        cwd=APP_DIR,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return server, port
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("The server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the healthtrack HTTP service")
+    parser.add_argument("--url", help="an already running server, e.g. http://127.0.0.1:8765")
+    parser.add_argument("--workload", choices=WORKLOADS, default="mixed")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="per connection")
+    parser.add_argument("--batch-size", type=int, default=20, help="readings per /batch request")
+    parser.add_argument("--close", action="store_true", help="a new connection for every request")
+    parser.add_argument("--workers", type=int, default=4, help="server threads, when the server is started here")
+    args = parser.parse_args()
+
+    server = None
+    data_dir = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    else:
+        data_dir = tempfile.mkdtemp(prefix="healthtrack-load-")
+        server, port = start_server(data_dir, args.workers)
+        host = "127.0.0.1"
+    try:
+        elapsed, latencies, statuses = asyncio.run(run(host, port, args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if data_dir is not None:
+            shutil.rmtree(data_dir)
+
+    latencies.sort()
+    count = len(latencies)
+    readings = count * args.batch_size if args.workload == "batch" else None
+    print(f"{count} requests over {args.connections} connections in {elapsed:.2f}s ({'close' if args.close else 'keep-alive'})")
+    print(f"  {count / elapsed:,.0f} requests/s" + (f", {readings / elapsed:,.0f} readings/s" if readings else ""))
+    print(
+        "  latency ms: "
+        f"p50 {statistics.median(latencies) * 1000:.2f}  "
+        f"p90 {latencies[int(count * 0.9)] * 1000:.2f}  "
+        f"p99 {latencies[min(int(count * 0.99), count - 1)] * 1000:.2f}  "
+        f"max {latencies[-1] * 1000:.2f}"
+    )
+    print("  status codes: " + ", ".join(f"{status}: {n}" for status, n in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
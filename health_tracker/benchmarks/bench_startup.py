@@ -0,0 +1,72 @@
+# Cold-launch benchmark for health_tracker_gui4.1.py.
+#
+# Every launch runs in a fresh interpreter so module imports are included, and the
+# clock stops once the first frame has been drawn (root.update()). Needs a display.
+#
+#     python benchmarks/bench_startup.py --runs 10
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_PATH = os.path.join(APP_DIR, "health_tracker_gui4.1.py")
+
+LAUNCH = """
+import time
+start = time.perf_counter()
+import importlib.util
+import tkinter as tk
+spec = importlib.util.spec_from_file_location("health_tracker_gui", {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+root = tk.Tk()
+app = module.HealthTrackerApp(root, lazy={lazy!r})
+root.update()
+print(time.perf_counter() - start)
+app.on_close()
+"""
+
+
+def launch(lazy, data_dir):
+    env = dict(os.environ, HEALTHTRACK_HOME=data_dir, PYTHONPATH=APP_DIR)
+    output = subprocess.run(
+        [sys.executable, "-c", LAUNCH.format(path=GUI_PATH, lazy=lazy)],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure(label, lazy, runs, warm_cache):
+    timings = []
+    for _ in range(runs):
+        data_dir = tempfile.mkdtemp(prefix="healthtrack-bench-")
+        try:
+            if warm_cache:
+                launch(lazy, data_dir)
+            timings.append(launch(lazy, data_dir))
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    print(f"{label:<32} median {statistics.median(timings) * 1000:8.1f} ms   min {min(timings) * 1000:8.1f} ms")
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-launch benchmark for the Tk app")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    eager = measure("eager, no logo cache", False, args.runs, warm_cache=False)
+    measure("eager, cached logo", False, args.runs, warm_cache=True)
+    lazy = measure("lazy, cached logo", True, args.runs, warm_cache=True)
+    print(f"lazy startup is {eager / lazy:.2f}x faster than the eager cold launch")
+
+
+if __name__ == "__main__":
+    main()
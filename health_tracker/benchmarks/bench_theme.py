@@ -0,0 +1,94 @@
+# Theme toggle time against widget count. Needs a display.
+#
+# For each size the window is filled with that many ttk widgets and the theme is
+# toggled repeatedly. "switch" is the ThemeManager.use call alone, "redrawn"
+# includes Tk repainting every widget (update_idletasks). "walk" is the old
+# approach, configuring each widget in turn; it has to use classic tk widgets
+# because ttk ones reject bg=.
+#
+#     python benchmarks/bench_theme.py --sizes 100 1000 5000
+import argparse
+import os
+import statistics
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from theme import THEMES, ThemeManager  # noqa: E402
+
+COLUMNS = 20
+
+
+def fill(parent, count, classic):
+    for index in range(count):
+        row, column = divmod(index, COLUMNS)
+        if classic:
+            widget = tk.Label(parent, text=str(index))
+        elif index % 3 == 0:
+            widget = ttk.Button(parent, text=str(index))
+        elif index % 3 == 1:
+            widget = ttk.Entry(parent, width=6)
+        else:
+            widget = ttk.Label(parent, text=str(index))
+        widget.grid(row=row, column=column)
+
+
+def walk(widget, colors):
+    for child in widget.winfo_children():
+        child.config(bg=colors["background"], fg=colors["foreground"])
+        walk(child, colors)
+
+
+def median_ms(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def measure(root, count, runs):
+    frame = ttk.Frame(root)
+    frame.pack()
+    fill(frame, count, classic=False)
+    root.update()
+    theme = ThemeManager(root)
+    switch = median_ms(theme.toggle, runs)
+
+    def toggle_and_redraw():
+        theme.toggle()
+        root.update_idletasks()
+
+    redrawn = median_ms(toggle_and_redraw, runs)
+    frame.destroy()
+
+    frame = tk.Frame(root)
+    frame.pack()
+    fill(frame, count, classic=True)
+    root.update()
+    names = iter(["dark", "light"] * runs)
+    walked = median_ms(lambda: walk(frame, THEMES[next(names)]), runs)
+    frame.destroy()
+    return switch, redrawn, walked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Theme toggle time against widget count")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    print(f"{'widgets':>8}{'switch ms':>12}{'redrawn ms':>12}{'walk ms':>12}")
+    for count in args.sizes:
+        switch, redrawn, walked = measure(root, count, args.runs)
+        print(f"{count:>8}{switch:>12.2f}{redrawn:>12.2f}{walked:>12.2f}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Import/export throughput of healthtrack.wearables, in rows per second per format.
+#
+# A synthetic year of readings is written in every format, then each file is
+# imported into a fresh profile and exported back out. Headless, no display needed.
+#
+#     python benchmarks/bench_wearables.py --rows 1000000
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from healthtrack import FORMATS, METRICS, ProfileManager, export_file, import_file  # noqa: E402
+
+EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "xml": ".xml"}
+
+
+def synthetic_rows(count, seed=0):
+    # (metric, timestamp, value) spread evenly over the year before now
+    rng = random.Random(seed)
+    end = time.time()
+    step = 365 * 86400 / count
+    for i in range(count):
+        metric = METRICS[i % len(METRICS)]
+        value = {"steps": rng.randint(0, 2000), "water": rng.randint(1, 10) / 4, "sleep": rng.randint(2, 18) / 2}[metric]
+        yield metric, end - (count - i) * step, float(value)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wearable import/export throughput")
+    parser.add_argument("--rows", type=int, default=300000)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="healthtrack-bench-")
+    try:
+        with ProfileManager(os.path.join(work, "home"), max_open=len(FORMATS) + 1) as profiles:
+            source = profiles.get("source")
+            for metric in METRICS:
+                rows = [(timestamp, value) for name, timestamp, value in synthetic_rows(args.rows) if name == metric]
+                source.extend(metric, [timestamp for timestamp, _ in rows], [value for _, value in rows])
+
+            print(f"{'format':<8}{'export rows/s':>16}{'import rows/s':>16}{'file size':>14}")
+            for format in FORMATS:
+                path = os.path.join(work, "wearables" + EXTENSIONS[format])
+                exported, export_seconds = timed(export_file, source, path)
+                counts, import_seconds = timed(import_file, profiles.get(format), path)
+                imported = sum(counts.values())
+                if imported != exported:
+                    raise SystemExit(f"{format}: exported {exported} rows but imported {imported}")
+                print(
+                    f"{format:<8}{exported / export_seconds:>16,.0f}{imported / import_seconds:>16,.0f}"
+                    f"{os.path.getsize(path) / 1e6:>11.1f} MB"
+                )
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+# Regression benchmarks for the hot paths behind HealthTrackerApp.
+#
+# Each benchmark times one operation the app performs: advice generation (cold and
+# from the cache), BMI, the add_* buttons (HealthTracker.record + total_today, and
+# the same waiting for its fsync), reopening a profile, the summary, goals,
+# history, charts, wearable import, one profile of a clinic report, the package
+# import and, when a display is available, building the main window. Timings are
+# the median of --repeat runs, each run looping the operation long enough to be
+# measurable.
+#
+# Results are compared with the baseline stored for this machine in
+# baselines.json; a benchmark regresses when its median is more than its
+# threshold times the baseline (1.3x unless the benchmark sets its own). The exit
+# status is 1 if anything regressed, so the suite can gate a CI job, and 2 if
+# there is no baseline to compare with.
+#
+#     python benchmarks/suite.py                     compare with the baseline
+#     python benchmarks/suite.py --save              record a new baseline
+#     python benchmarks/suite.py -k advice -k bmi    only names containing these
+#     python benchmarks/suite.py --machine reference compare with a named baseline
+#
+# Baselines are per machine (the host name unless --machine is given) since
+# absolute timings only mean something on the hardware they were taken on.
+# "reference" is the machine the committed baselines were recorded on, and what a
+# machine without a baseline of its own is compared with.
+import argparse
+import atexit
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from healthtrack import (  # noqa: E402
+    HealthTracker,
+    MetricStore,
+    TrendTiles,
+    bulk_bmi,
+    cached_advice,
+    calculate_bmi,
+    generate_advice,
+    import_file,
+    interpret_bmi,
+)
+from healthtrack.metrics import optional_numpy  # noqa: E402
+from healthtrack.reports import profile_rows, split_range  # noqa: E402
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+REFERENCE_MACHINE = "reference"
+DEFAULT_THRESHOLD = 1.3
+MIN_RUN_TIME = 0.05
+
+BENCHMARKS = {}
+# Cleanups registered by the benchmark being set up, run once it is measured
+TEARDOWN = []
+
+
+def benchmark(name, threshold=DEFAULT_THRESHOLD, needs_display=False):
+    # Registers setup() under name. setup() returns the function to time, or
+    # (prepare, fn) when every call needs state of its own: each call is then
+    # fn(prepare()), prepare() runs outside the timer and what it returns is
+    # closed after.
+    def register(setup):
+        BENCHMARKS[name] = (setup, threshold, needs_display)
+        return setup
+
+    return register
+
+
+def teardown(fn):
+    TEARDOWN.append(fn)
+
+
+def scratch_dir():
+    directory = tempfile.mkdtemp(prefix="healthtrack-suite-")
+    atexit.register(shutil.rmtree, directory, True)
+    return directory
+
+
+def year_of_readings(count, seed=0):
+    # {metric: (timestamps, values)} spread evenly over the year before now
+    rng = random.Random(seed)
+    end = time.time()
+    step = 365 * 86400 / count
+    timestamps = [end - (count - i) * step for i in range(count)]
+    return {
+        "steps": (timestamps, [float(rng.randint(0, 2000)) for _ in timestamps]),
+        "water": (timestamps[::10], [0.25] * len(timestamps[::10])),
+        "sleep": (timestamps[::50], [float(rng.randint(2, 9)) for _ in timestamps[::50]]),
+    }
+
+
+def empty_tracker():
+    return HealthTracker(MetricStore(scratch_dir()))
+
+
+def loaded_tracker(count=200_000):
+    tracker = empty_tracker()
+    teardown(tracker.close)
+    for metric, (timestamps, values) in year_of_readings(count).items():
+        tracker.extend(metric, timestamps, values)
+    return tracker
+
+
+@benchmark("advice.short_note")
+def advice_short():
+    return lambda: generate_advice("I have a headache and a bit of a cough")
+
+
+@benchmark("advice.long_note")
+def advice_long():
+    note = " ".join(["I have been feeling tired with a sore throat, some back pain and headaches"] * 50)
+    return lambda: generate_advice(note)
+
+
+@benchmark("advice.cached_repeat")
+def advice_cached():
+    # Submitting a note that was asked about before
+    note = "I have a headache and a bit of a cough"
+    return lambda: cached_advice(note)
+
+
+@benchmark("bmi.calculate_interpret")
+def bmi_single():
+    return lambda: interpret_bmi(calculate_bmi(72.5, 178))
+
+
+@benchmark("bmi.bulk_100k")
+def bmi_bulk():
+    rng = random.Random(0)
+    weights = [rng.uniform(40, 140) for _ in range(100_000)]
+    heights = [rng.uniform(140, 205) for _ in range(100_000)]
+    return lambda: bulk_bmi(weights, heights)
+
+
+@benchmark("tracker.add_reading", threshold=1.5)
+def add_reading():
+    # What each Add Steps/Water/Sleep click does
+    tracker = empty_tracker()
+    teardown(tracker.close)
+
+    def add():
+        tracker.record("steps", 1000)
+        return tracker.total_today("steps")
+
+    return add
+
+
+@benchmark("tracker.add_reading_durable", threshold=2.0)
+def add_reading_durable():
+    # record() then waiting for its group commit, what the HTTP service does per batch
+    tracker = empty_tracker()
+    teardown(tracker.close)
+
+    def add():
+        tracker.record("steps", 1000)
+        tracker.flush()
+
+    return add
+
+
+@benchmark("tracker.extend_100k", threshold=1.5)
+def extend():
+    # Into a new profile each time, opened before the clock starts
+    readings = year_of_readings(100_000)["steps"]
+    return empty_tracker, lambda tracker: tracker.extend("steps", *readings)
+
+
+@benchmark("tracker.summary")
+def summary():
+    tracker = loaded_tracker()
+    return tracker.format_summary
+
+
+@benchmark("tracker.goal_stats_cold")
+def goal_stats():
+    tracker = loaded_tracker()
+
+    def cold():
+        tracker.goals._cache.clear()
+        return tracker.goal_stats()
+
+    return cold
+
+
+@benchmark("tracker.reopen_200k")
+def reopen():
+    # Opening a profile with a year of readings, what switching profiles costs
+    tracker = loaded_tracker()
+    tracker.close()
+
+    def open_close():
+        HealthTracker(MetricStore(tracker.store.directory)).close()
+
+    return open_close
+
+
+@benchmark("tracker.history_200k")
+def history():
+    return loaded_tracker().history
+
+
+@benchmark("charts.tile_cold")
+def chart_tile():
+    series = loaded_tracker().store.series("steps")
+    tiles = TrendTiles.from_series(series)
+    zoom = tiles.fit_zoom(900)
+    index = tiles.tile_index(zoom, tiles.start)
+
+    def build():
+        tiles._tiles.clear()
+        return tiles.tile(zoom, index)
+
+    return build
+
+
+@benchmark("wearables.import_csv_50k", threshold=1.5)
+def import_csv():
+    path = os.path.join(scratch_dir(), "readings.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("metric,timestamp,value\n")
+        for metric, (timestamps, values) in year_of_readings(50_000).items():
+            f.writelines(f"{metric},{t:.0f},{v:g}\n" for t, v in zip(timestamps, values))
+    return empty_tracker, lambda tracker: import_file(tracker, path)
+
+
+@benchmark("reports.profile_year")
+def report_profile():
+    # One profile's rows in a clinic report: a year of readings, by month
+    tracker = loaded_tracker()
+    tracker.flush()
+    today = datetime.date.today()
+    ranges = split_range(today - datetime.timedelta(days=364), today, "month")
+    return lambda: profile_rows(tracker.store.directory, "suite", ranges, today)
+
+
+@benchmark("startup.import_healthtrack", threshold=1.5)
+def import_package():
+    # Fresh interpreter each time, the cost the GUI pays before its first frame
+    command = [sys.executable, "-c", "import healthtrack"]
+    env = dict(os.environ, PYTHONPATH=APP_DIR)
+    return lambda: subprocess.run(command, env=env, check=True)
+
+
+@benchmark("startup.create_widgets", threshold=1.5, needs_display=True)
+def create_widgets():
+    import tkinter as tk
+
+    spec = importlib.util.spec_from_file_location("health_tracker_gui", os.path.join(APP_DIR, "health_tracker_gui4.1.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    os.environ["HEALTHTRACK_HOME"] = scratch_dir()
+
+    def launch():
+        root = tk.Tk()
+        app = module.HealthTrackerApp(root, lazy=True)
+        root.update()
+        app.on_close()
+
+    return launch
+
+
+def display_available():
+    try:
+        import tkinter as tk
+
+        tk.Tk().destroy()
+        return True
+    except Exception:
+        return False
+
+
+def timed_run(fn, number, prepare=None):
+    # Seconds taken by number calls of fn, or of fn(state) for a fresh prepare()d
+    # state each, counting only the calls
+    if prepare is None:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - start
+    states = [prepare() for _ in range(number)]
+    start = time.perf_counter()
+    for state in states:
+        fn(state)
+    elapsed = time.perf_counter() - start
+    for state in states:
+        state.close()
+    return elapsed
+
+
+def measure(fn, repeat, prepare=None):
+    # Median seconds per call over repeat runs of `number` calls each
+    timed_run(fn, 1, prepare)
+    number = 1
+    while True:
+        elapsed = timed_run(fn, number, prepare)
+        if elapsed >= MIN_RUN_TIME:
+            break
+        number *= 10 if elapsed < MIN_RUN_TIME / 10 else 2
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        timings.append(timed_run(fn, number, prepare) / number)
+    return statistics.median(timings)
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds * 1e9:.3g} ns"
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(path, baselines):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regression benchmarks for the health tracker")
+    parser.add_argument("-k", dest="filters", action="append", help="only benchmarks whose name contains this, repeatable")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--save", action="store_true", help="store the results as this machine's baseline")
+    parser.add_argument(
+        "--machine", help=f"baseline name (default: the host name, compared with {REFERENCE_MACHINE!r} if it has none)"
+    )
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--threshold", type=float, help="override every benchmark's threshold")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if not args.filters or any(f in name for f in args.filters)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    baselines = load_baselines(args.baselines)
+    machine = args.machine or platform.node()
+    compare_with = machine
+    if args.machine is None and machine not in baselines and REFERENCE_MACHINE in baselines:
+        compare_with = REFERENCE_MACHINE
+        print(
+            f"No baseline for {machine!r}, comparing with {REFERENCE_MACHINE!r}, which may be other hardware. "
+            "Regressions are only reported, run with --save to record a baseline to gate against."
+        )
+    baseline = baselines.get(compare_with)
+    has_numpy = optional_numpy() is not None
+    if baseline is None and not args.save:
+        print(f"No baseline for {compare_with!r} in {args.baselines}, run with --save to record one.")
+        return 2
+    if baseline is not None and baseline["numpy"] != has_numpy:
+        print(f"Warning: the baseline was recorded {'with' if baseline['numpy'] else 'without'} NumPy.")
+    display = None
+    results = {}
+    regressions = []
+
+    print(f"{'benchmark':<30}{'median':>12}{'baseline':>12}{'ratio':>8}")
+    for name in names:
+        setup, threshold, needs_display = BENCHMARKS[name]
+        if needs_display:
+            display = display_available() if display is None else display
+            if not display:
+                print(f"{name:<30}{'skipped, no display':>32}")
+                continue
+        try:
+            timed = setup()
+            prepare, fn = timed if isinstance(timed, tuple) else (None, timed)
+            seconds = results[name] = measure(fn, args.repeat, prepare)
+        finally:
+            while TEARDOWN:
+                TEARDOWN.pop()()
+        line = f"{name:<30}{format_time(seconds):>12}"
+        previous = baseline["results"].get(name) if baseline else None
+        if previous:
+            ratio = seconds / previous
+            limit = args.threshold or threshold
+            line += f"{format_time(previous):>12}{ratio:>7.2f}x"
+            if ratio > limit:
+                line += f"  REGRESSION (limit {limit:.2f}x)"
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        entry = baselines.setdefault(machine, {"results": {}})
+        entry.update(python=platform.python_version(), numpy=has_numpy, recorded=time.strftime("%Y-%m-%d"))
+        entry["results"].update(results)
+        save_baselines(args.baselines, baselines)
+        print(f"Saved {len(results)} results as the {machine!r} baseline in {args.baselines}")
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        if compare_with != machine:
+            # Another machine's timings differ by the hardware as much as the code
+            print(f"Warning only, the baseline is {compare_with!r}'s and not this machine's.")
+            return 0
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# Tk side of the opt-in instrumentation (see healthtrack/instruments.py).
+#
+# install() swaps tkinter's CallWrapper, the object Tk calls into Python through
+# for every command, binding and after() callback, for one that times the call, so
+# every button handler and event is timed without touching the handlers. A
+# heartbeat on after() measures how late the event loop gets back to it, which
+# catches stalls that no single Python callback accounts for (long redraws,
+# geometry passes). The diagnostics window shows it all live and can save a JSON
+# dump or a cProfile capture.
+import os
+import time
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+
+from healthtrack.instruments import callable_name
+from theme import style_window, subscribe
+from virtual_list import VirtualList
+
+HEARTBEAT_MS = 50
+STALL_SECONDS = 0.1
+
+
+def _after_target(callit):
+    # after() registers a closure that calls the real callback, find that instead
+    for cell in callit.__closure__ or ():
+        value = cell.cell_contents
+        if callable(value) and not isinstance(value, tk.Misc):
+            return value
+    return callit
+
+
+def _tk_name(func):
+    if getattr(func, "__qualname__", "").endswith("after.<locals>.callit"):
+        return "tk.after." + callable_name(_after_target(func))
+    return "tk." + callable_name(func)
+
+
+def install(instruments):
+    # Times every Tk callback registered from now on, returns a function undoing it
+    original = tk.CallWrapper
+
+    class TimedCallWrapper(original):
+        def __init__(self, func, subst, widget):
+            super().__init__(func, subst, widget)
+            self.name = _tk_name(func)
+
+        def __call__(self, *args):
+            start = time.perf_counter()
+            try:
+                return super().__call__(*args)
+            finally:
+                instruments.record(self.name, time.perf_counter() - start)
+
+    tk.CallWrapper = TimedCallWrapper
+
+    def uninstall():
+        tk.CallWrapper = original
+
+    return uninstall
+
+
+class StallMonitor:
+    # Records how late every heartbeat runs as "loop.lag", and the lateness of
+    # those over STALL_SECONDS again as "loop.stall"
+    def __init__(self, root, instruments, interval_ms=HEARTBEAT_MS, stall_seconds=STALL_SECONDS):
+        self.root = root
+        self.instruments = instruments
+        self.interval = interval_ms / 1000
+        self.interval_ms = interval_ms
+        self.stall_seconds = stall_seconds
+        self.expected = time.perf_counter() + self.interval
+        self.root.after(interval_ms, self.beat)
+
+    def beat(self):
+        now = time.perf_counter()
+        lag = max(now - self.expected, 0.0)
+        self.instruments.record("loop.lag", lag)
+        if lag >= self.stall_seconds:
+            self.instruments.record("loop.stall", lag)
+        self.expected = now + self.interval
+        self.root.after(self.interval_ms, self.beat)
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:,.1f}"
+
+
+class DiagnosticsWindow:
+    REFRESH_MS = 1000
+    COLUMNS = ("Callback", "Calls", "Total ms", "Mean ms", "p50 ms", "p99 ms", "Max ms")
+    WIDTHS = (44, 8, 10, 9, 9, 9, 9)
+
+    def __init__(self, root, instruments, theme, data_dir):
+        self.instruments = instruments
+        self.data_dir = data_dir
+        self.rows = []
+        self.window = tk.Toplevel(root)
+        self.window.title("Diagnostics")
+        subscribe(theme, self.window, style_window(self.window))
+        self.summary = ttk.Label(self.window, text="")
+        self.summary.pack(anchor="w", padx=10, pady=(10, 0))
+        self.table = VirtualList(self.window, self.COLUMNS, self.row, widths=self.WIDTHS, visible_rows=20)
+        self.table.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        controls = ttk.Frame(self.window)
+        controls.pack(pady=(0, 10))
+        ttk.Button(controls, text="Save JSON...", command=self.save_json).pack(side=tk.LEFT, padx=5)
+        self.profile_button = ttk.Button(controls, text="Start Profile", command=self.toggle_profile)
+        self.profile_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Reset", command=self.reset).pack(side=tk.LEFT, padx=5)
+        self.refresh()
+
+    def row(self, index):
+        name, histogram = self.rows[index]
+        return (
+            name,
+            histogram.count,
+            _ms(histogram.total),
+            _ms(histogram.mean),
+            _ms(histogram.percentile(0.5)),
+            _ms(histogram.percentile(0.99)),
+            _ms(histogram.max),
+        )
+
+    def refresh(self):
+        if self.window.winfo_exists():
+            self.show()
+            self.window.after(self.REFRESH_MS, self.refresh)
+
+    def show(self):
+        self.rows = self.instruments.stats()
+        stalls = self.instruments.histograms.get("loop.stall")
+        elapsed = time.time() - self.instruments.started
+        self.summary.configure(
+            text=f"{elapsed:,.0f}s recorded, {stalls.count if stalls else 0} event loop stalls over "
+            f"{STALL_SECONDS * 1000:g} ms" + (", profiling..." if self.instruments.profiler is not None else "")
+        )
+        self.table.set_rows(len(self.rows))
+
+    def save_json(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="Save Diagnostics",
+            initialdir=self.data_dir,
+            initialfile="diagnostics.json",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json")],
+        )
+        if path:
+            self.instruments.dump(path)
+
+    def toggle_profile(self):
+        if self.instruments.profiler is None:
+            self.instruments.start_profile()
+            self.profile_button.configure(text="Stop Profile")
+            return
+        path = os.path.join(self.data_dir, time.strftime("profile-%Y%m%d-%H%M%S.prof"))
+        self.instruments.stop_profile(path)
+        self.profile_button.configure(text="Start Profile")
+        messagebox.showinfo("Profile Saved", f"Saved the cProfile capture to {path}.", parent=self.window)
+
+    def reset(self):
+        self.instruments.reset()
+        self.show()
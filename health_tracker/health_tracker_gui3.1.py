@@ -1,9 +1,11 @@
 import tkinter as tk
+from datetime import datetime
 from tkinter import messagebox
 from tkinter import ttk
 from tkinter import filedialog
 from tkcalendar import Calendar
 from PIL import Image, ImageTk
+from virtual_list import VirtualList
 
 class HealthTrackerApp:
     def __init__(self, root):
@@ -17,8 +19,10 @@ class HealthTrackerApp:
         self.scrollbar = ttk.Scrollbar(self.root, orient="vertical", command=self.canvas.yview)
         self.scrollable_frame = ttk.Frame(self.canvas)
 
-        # Configure the scrollable frame
-        self.scrollable_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+        # Configure the scrollable frame. Resizes arrive in bursts while the layout
+        # settles, the scroll region is only updated once Tk is idle again
+        self.scrollregion_pending = None
+        self.scrollable_frame.bind("<Configure>", self.schedule_scrollregion)
         self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
 
         # Pack the canvas and scrollbar
@@ -37,6 +41,7 @@ class HealthTrackerApp:
         self.sleep = tk.DoubleVar()
         self.doctor_name = tk.StringVar()
         self.medical_records = ""
+        self.history = []
 
         # Totals
         self.total_steps = 0
@@ -102,23 +107,57 @@ class HealthTrackerApp:
         self.symptom_input.grid(row=8, column=1, padx=10, pady=5)
         ttk.Button(self.scrollable_frame, text="Get Advice", command=self.get_advice).grid(row=8, column=2, padx=10, pady=5)
 
+        # History, newest first. Only the visible rows have widgets, however long it gets.
+        ttk.Label(self.scrollable_frame, text="History:").grid(row=9, column=0, padx=10, pady=5, sticky="ne")
+        self.history_list = VirtualList(
+            self.scrollable_frame,
+            ("Time", "Entry", "Amount"),
+            lambda index: self.history[-1 - index],
+            widths=(18, 12, 12),
+            visible_rows=8,
+        )
+        self.history_list.grid(row=9, column=1, columnspan=2, padx=10, pady=5, sticky="w")
+
+    def schedule_scrollregion(self, event):
+        if self.scrollregion_pending is None:
+            self.scrollregion_pending = self.root.after_idle(self.update_scrollregion)
+
+    def update_scrollregion(self):
+        self.scrollregion_pending = None
+        # The frame is the canvas' only item, so its size is the scroll region
+        # without asking the canvas for bbox("all")
+        self.canvas.configure(scrollregion=(0, 0, self.scrollable_frame.winfo_width(), self.scrollable_frame.winfo_height()))
+
     def on_mouse_wheel(self, event):
-        # Scroll the canvas
-        self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        # Scroll the canvas, Linux reports the wheel as buttons 4 and 5 with no delta
+        if event.num == 4:
+            units = -1
+        elif event.num == 5:
+            units = 1
+        else:
+            units = int(-1*(event.delta/120))
+        self.canvas.yview_scroll(units, "units")
+
+    def add_history(self, entry, amount):
+        self.history.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), entry, amount))
+        self.history_list.set_rows(len(self.history))
 
     def add_steps(self):
         steps = self.steps.get()
         self.total_steps += steps
+        self.add_history("Steps", f"{steps}")
         messagebox.showinfo("Info", f"Added {steps} steps. Total steps: {self.total_steps}")
 
     def add_water(self):
         water = self.water.get()
         self.total_water += water
+        self.add_history("Water", f"{water} liters")
         messagebox.showinfo("Info", f"Added {water} liters of water. Total water: {self.total_water} liters")
 
     def add_sleep(self):
         sleep = self.sleep.get()
         self.total_sleep += sleep
+        self.add_history("Sleep", f"{sleep} hours")
         messagebox.showinfo("Info", f"Added {sleep} hours of sleep. Total sleep: {self.total_sleep} hours")
 
     def show_summary(self):
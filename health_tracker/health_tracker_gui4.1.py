@@ -1,95 +1,144 @@
+import argparse
+import os
 import tkinter as tk
+from datetime import date, datetime, time
 from tkinter import messagebox, ttk, filedialog
-from tkcalendar import Calendar
-from PIL import Image, ImageTk
-import random
+from healthtrack import (
+    DEFAULT_PROFILE,
+    DOCTORS,
+    METRIC_LABELS,
+    AppointmentConflict,
+    Instruments,
+    ProfileManager,
+    StoreLocked,
+    TaskRunner,
+    TrendTiles,
+    cached_advice,
+    daily_tip,
+    default_data_dir,
+    export_file,
+    import_file,
+    interpret_bmi,
+    slot_times,
+)
+from theme import ThemeManager, style_text, style_window, subscribe
+from virtual_list import VirtualList
+
+# tkcalendar and PIL are imported where they are first needed, they are the
+# slowest imports at startup and the entry form does not use either of them
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo.PNG")
+LOGO_SIZE = 100
+WEARABLE_FILETYPES = [
+    ("CSV", "*.csv"),
+    ("JSON Lines", "*.jsonl *.ndjson"),
+    ("Apple Health export", "*.xml *.zip"),
+    ("All files", "*.*"),
+]
+# Timed once each when diagnostics are on, besides every Tk callback
+STARTUP_SECTIONS = ("create_widgets", "create_logo", "create_calendar", "create_advice_section", "create_bmi_section")
 
 class HealthTrackerApp:
-    def __init__(self, root):
+    def __init__(self, root, lazy=True, instruments=None):
         self.root = root
+        # Opt-in timing of every callback, installed before any are registered.
+        # diagnostics.py is only imported when it is on.
+        self.instruments = instruments or Instruments.from_environment()
+        if self.instruments.enabled:
+            from diagnostics import StallMonitor, install
+
+            install(self.instruments)
+            StallMonitor(self.root, self.instruments)
+            for name in STARTUP_SECTIONS:
+                setattr(self, name, self.instruments.wrap("startup." + name, getattr(self, name)))
+        # In lazy mode the logo, calendar, AI assistant and BMI calculator are only
+        # built after the window is up or when the user first asks for them
+        self.lazy = lazy
+        self.cal = None
+        self.symptom_input = None
         self.root.title("Health Tracker")
         self.root.geometry("1000x1000")
         
         # Default light mode
-        self.is_dark_mode = False
-        self.set_theme()
+        self.theme = ThemeManager(self.root)
 
         # Initialize health-related variables
         self.steps = tk.IntVar()
         self.water = tk.DoubleVar()
         self.sleep = tk.DoubleVar()
         self.doctor_name = tk.StringVar()
+        self.appointment_time = tk.StringVar(value=slot_times()[0])
         self.medical_records = ""
 
         # BMI variables
         self.weight = tk.DoubleVar()
         self.height = tk.DoubleVar()
 
-        # Totals
-        self.total_steps = 0
-        self.total_water = 0.0
-        self.total_sleep = 0.0
-
-        # Recommended amounts
-        self.recommended_steps = 10000
-        self.recommended_water = 2.0
-        self.recommended_sleep = 8.0
-
-        # Daily health tips
-        self.health_tips = [
-            "Stay hydrated! Drink at least 8 cups of water daily.",
-            "Aim for 7-8 hours of sleep each night for optimal health.",
-            "Take a short walk after meals to aid digestion.",
-            "Incorporate fruits and vegetables into your diet.",
-            "Limit screen time before bed for better sleep."
-        ]
-        
+        # Each user's history, appointments and records live in their own profile,
+        # the headless core does all the work on whichever one is selected
+        self.profiles = ProfileManager()
+        self.profiles.adopt_legacy_data()
+        self.profile_name = tk.StringVar(value=DEFAULT_PROFILE)
+        self.current_profile = DEFAULT_PROFILE
+        try:
+            self.tracker = self.profiles.get(DEFAULT_PROFILE)
+        except StoreLocked as e:
+            # The service or an import has it, only one process writes a profile
+            messagebox.showerror("Profile In Use", str(e))
+            raise SystemExit(1)
+
+        # Anything slower than reading a widget runs on the task pool
+        self.tasks = TaskRunner(self.root, instruments=self.instruments)
+        self.active_tasks = set()
+
         # Create the UI
         self.create_widgets()
 
-    def set_theme(self):
-        # Define colors for light and dark mode
-        if self.is_dark_mode:
-            self.root.config(bg="#2e2e2e")
-            self.bg_color = "#2e2e2e"
-            self.text_color = "#f0f4f7"
-        else:
-            self.root.config(bg="#f0f4f7")
-            self.bg_color = "#f0f4f7"
-            self.text_color = "#000000"
+        # Entries are group-committed to disk as they are added, see healthtrack/journal.py
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        # Running imports and uploads stop at their next chunk instead of holding
+        # the window open until they finish, then the profiles can be closed
+        self.cancel_tasks()
+        self.tasks.shutdown()
+        self.profiles.close()
+        if self.instruments.enabled:
+            self.instruments.dump(os.path.join(self.profiles.directory, "diagnostics.json"))
+        self.root.destroy()
+
+    def show_diagnostics(self):
+        from diagnostics import DiagnosticsWindow
+
+        DiagnosticsWindow(self.root, self.instruments, self.theme, self.profiles.directory)
 
     def toggle_dark_mode(self):
-        self.is_dark_mode = not self.is_dark_mode
-        self.set_theme()
-        self.update_ui_theme()
-
-    def update_ui_theme(self):
-        # Update all widget themes based on current mode
-        self.root.config(bg=self.bg_color)
-        for widget in self.root.winfo_children():
-            widget.config(bg=self.bg_color)
-            if isinstance(widget, ttk.Label):
-                widget.config(foreground=self.text_color)
+        # One style update recolors every ttk widget, see theme.py
+        self.theme.toggle()
 
     def create_widgets(self):
         # Dark mode toggle
         self.dark_mode_button = ttk.Button(self.root, text="Toggle Dark Mode", command=self.toggle_dark_mode)
         self.dark_mode_button.grid(row=0, column=0, columnspan=2, pady=10)
 
+        # User profile, type a new name and press Enter to add one
+        profile_frame = ttk.Frame(self.root)
+        profile_frame.grid(row=0, column=2, padx=10)
+        ttk.Label(profile_frame, text="User:").pack(side=tk.LEFT)
+        self.profile_dropdown = ttk.Combobox(profile_frame, textvariable=self.profile_name, values=self.profiles.names(), width=15)
+        self.profile_dropdown.pack(side=tk.LEFT)
+        self.profile_dropdown.bind("<<ComboboxSelected>>", self.switch_profile)
+        self.profile_dropdown.bind("<Return>", self.switch_profile)
+
         # Daily Health Tip
-        daily_tip = random.choice(self.health_tips)
-        self.tip_label = ttk.Label(self.root, text="Health Tip: " + daily_tip, font=("Helvetica", 10, "italic"), wraplength=400)
+        self.tip_label = ttk.Label(self.root, text="Health Tip: " + daily_tip(), font=("Helvetica", 10, "italic"), wraplength=400)
         self.tip_label.grid(row=1, column=0, columnspan=2, pady=10)
+        ttk.Button(self.root, text="My Goals", command=self.show_goals).grid(row=1, column=2, padx=10)
 
-        # Load and display the logo
-        try:
-            logo_image = Image.open("logo.png")  # Replace with your logo file name
-            logo_image = logo_image.resize((100, 100), Image.LANCZOS)
-            self.logo = ImageTk.PhotoImage(logo_image)
-            logo_label = ttk.Label(self.root, image=self.logo, background=self.bg_color)
-            logo_label.grid(row=2, column=0, columnspan=2, pady=10)
-        except Exception as e:
-            print(f"Logo not found: {e}")
+        # Logo, loaded once the window is showing in lazy mode
+        if self.lazy:
+            self.root.after_idle(self.create_logo)
+        else:
+            self.create_logo()
 
         # Steps
         ttk.Label(self.root, text="Steps:").grid(row=3, column=0, padx=10, sticky="e")
@@ -107,32 +156,143 @@ class HealthTrackerApp:
         ttk.Button(self.root, text="Add Sleep", command=self.add_sleep).grid(row=5, column=2, padx=10)
 
         # Show Summary
-        ttk.Button(self.root, text="Show Summary", command=self.show_summary).grid(row=6, column=0, columnspan=3, pady=10)
+        ttk.Button(self.root, text="Show Summary", command=self.show_summary).grid(row=6, column=0, pady=10)
+        ttk.Button(self.root, text="Show Charts", command=self.show_charts).grid(row=6, column=1, pady=10)
+        ttk.Button(self.root, text="Show History", command=self.show_history).grid(row=6, column=2, pady=10)
 
         # Appointment Scheduling
         ttk.Label(self.root, text="Select Doctor:").grid(row=7, column=0, padx=10, sticky="e")
-        doctors = ['Dr. Smith', 'Dr. Johnson', 'Dr. Lee']
-        self.doctor_dropdown = ttk.Combobox(self.root, textvariable=self.doctor_name, values=doctors)
+        self.doctor_dropdown = ttk.Combobox(self.root, textvariable=self.doctor_name, values=DOCTORS)
         self.doctor_dropdown.grid(row=7, column=1, padx=10)
+        self.time_dropdown = ttk.Combobox(self.root, textvariable=self.appointment_time, values=slot_times(), width=8, state="readonly")
+        self.time_dropdown.grid(row=7, column=2, padx=10)
 
         ttk.Label(self.root, text="Select Appointment Date:").grid(row=8, column=0, padx=10, sticky="e")
-        self.cal = Calendar(self.root, selectmode='day', date_pattern='y-mm-dd')
-        self.cal.grid(row=8, column=1, padx=10)
-
         ttk.Button(self.root, text="Schedule Appointment", command=self.schedule_appointment).grid(row=8, column=2, padx=10)
 
         # Upload Medical Records
-        ttk.Button(self.root, text="Upload Medical Records", command=self.upload_records).grid(row=9, column=0, columnspan=3, pady=10)
+        ttk.Button(self.root, text="Upload Medical Records", command=self.upload_records).grid(row=9, column=0, pady=10)
+
+        # Wearable data
+        ttk.Button(self.root, text="Import Wearable Data", command=self.import_wearables).grid(row=9, column=1, pady=10)
+        ttk.Button(self.root, text="Export Wearable Data", command=self.export_wearables).grid(row=9, column=2, pady=10)
+
+        # Background task status
+        self.status_label = ttk.Label(self.root, text="")
+        self.status_label.grid(row=15, column=0, padx=10, sticky="e")
+        self.progress = ttk.Progressbar(self.root, mode="indeterminate", length=200)
+        self.progress.grid(row=15, column=1, padx=10)
+        self.cancel_button = ttk.Button(self.root, text="Cancel", command=self.cancel_tasks, state="disabled")
+        self.cancel_button.grid(row=15, column=2, padx=10)
+        if self.instruments.enabled:
+            ttk.Button(self.root, text="Diagnostics", command=self.show_diagnostics).grid(row=16, column=0, pady=10)
+
+        if self.lazy:
+            # Placeholders that build the real section on first use
+            self.calendar_button = ttk.Button(self.root, text="Choose Date...", command=self.create_calendar)
+            self.calendar_button.grid(row=8, column=1, padx=10)
+            self.advice_button = ttk.Button(self.root, text="Ask the AI Assistant", command=self.create_advice_section)
+            self.advice_button.grid(row=10, column=0, columnspan=3, pady=10)
+            self.bmi_button = ttk.Button(self.root, text="Open BMI Calculator", command=self.create_bmi_section)
+            self.bmi_button.grid(row=11, column=0, columnspan=3, pady=10)
+        else:
+            self.create_calendar()
+            self.create_advice_section()
+            self.create_bmi_section()
+
+    def switch_profile(self, event=None):
+        name = self.profile_name.get().strip()
+        try:
+            self.tracker = self.profiles.get(name)
+        except ValueError as e:
+            messagebox.showwarning("Invalid User", str(e))
+            self.profile_name.set(self.current_profile)
+            return
+        except StoreLocked as e:
+            messagebox.showwarning("Profile In Use", str(e))
+            self.profile_name.set(self.current_profile)
+            return
+        self.current_profile = name
+        self.profile_dropdown.config(values=self.profiles.names())
+        if self.cal is not None:
+            self.cal.calevent_remove("all")
+            self.mark_booked_days()
+
+    def mark_booked_days(self):
+        # Mark the days that already have upcoming appointments
+        for day in self.tracker.appointments.booked_dates(start=datetime.combine(date.today(), time())):
+            self.cal.calevent_create(day, "Appointment", "appointment")
+
+    def create_logo(self):
+        try:
+            self.logo = tk.PhotoImage(file=self.logo_thumbnail())
+            logo_label = ttk.Label(self.root, image=self.logo)
+            logo_label.grid(row=2, column=0, columnspan=2, pady=10)
+        except Exception as e:
+            print(f"Logo not found: {e}")
 
-        # AI Assistant
+    def logo_thumbnail(self):
+        # Decoding and LANCZOS-resizing the logo is the slowest part of startup, so
+        # the resized copy is cached as a PNG that Tk can load without PIL
+        thumbnail = os.path.join(default_data_dir(), "cache", f"logo_{LOGO_SIZE}.png")
+        if not os.path.exists(thumbnail) or os.path.getmtime(thumbnail) < os.path.getmtime(LOGO_PATH):
+            from PIL import Image
+
+            os.makedirs(os.path.dirname(thumbnail), exist_ok=True)
+            logo_image = Image.open(LOGO_PATH)
+            logo_image = logo_image.resize((LOGO_SIZE, LOGO_SIZE), Image.LANCZOS)
+            logo_image.save(thumbnail)
+        return thumbnail
+
+    def create_calendar(self):
+        if self.cal is not None:
+            return
+        from tkcalendar import Calendar
+
+        if self.lazy:
+            self.calendar_button.destroy()
+        self.cal = Calendar(self.root, selectmode='day', date_pattern='y-mm-dd')
+        self.cal.grid(row=8, column=1, padx=10)
+        self.cal.tag_config("appointment", background="#4a90d9", foreground="white")
+        subscribe(self.theme, self.cal, self.style_calendar)
+        self.mark_booked_days()
+
+    def style_calendar(self, colors):
+        # tkcalendar draws with its own color options rather than ttk styles
+        self.cal.configure(
+            background=colors["field"],
+            foreground=colors["foreground"],
+            bordercolor=colors["border"],
+            headersbackground=colors["background"],
+            headersforeground=colors["foreground"],
+            normalbackground=colors["field"],
+            normalforeground=colors["foreground"],
+            weekendbackground=colors["field"],
+            weekendforeground=colors["foreground"],
+            othermonthbackground=colors["background"],
+            othermonthforeground=colors["disabled"],
+            othermonthwebackground=colors["background"],
+            othermonthweforeground=colors["disabled"],
+            selectbackground=colors["select"],
+            selectforeground=colors["select_foreground"],
+        )
+
+    def create_advice_section(self):
+        if self.symptom_input is not None:
+            return
+        if self.lazy:
+            self.advice_button.destroy()
         ttk.Label(self.root, text="Describe your symptoms:").grid(row=10, column=0, padx=10, sticky="e")
         self.symptom_input = tk.Text(self.root, height=4, width=40)
         self.symptom_input.grid(row=10, column=1, padx=10)
+        subscribe(self.theme, self.symptom_input, style_text(self.symptom_input))
         ttk.Button(self.root, text="Get Advice", command=self.get_advice).grid(row=10, column=2, padx=10)
 
-        # BMI Calculator
+    def create_bmi_section(self):
+        if self.lazy:
+            self.bmi_button.destroy()
         ttk.Label(self.root, text="BMI Calculator", font=("Helvetica", 14, "bold")).grid(row=11, column=0, columnspan=3, pady=10)
-        
+
         ttk.Label(self.root, text="Weight (kg):").grid(row=12, column=0, padx=10, sticky="e")
         ttk.Entry(self.root, textvariable=self.weight).grid(row=12, column=1, padx=10)
 
@@ -143,94 +303,449 @@ class HealthTrackerApp:
 
     def add_steps(self):
         steps = self.steps.get()
-        self.total_steps += steps
-        messagebox.showinfo("Info", f"Added {steps} steps. Total steps: {self.total_steps}")
+        self.tracker.record("steps", steps)
+        messagebox.showinfo("Info", f"Added {steps} steps. Total steps today: {self.tracker.total_today('steps'):g}")
 
     def add_water(self):
         water = self.water.get()
-        self.total_water += water
-        messagebox.showinfo("Info", f"Added {water} liters of water. Total water: {self.total_water} liters")
+        self.tracker.record("water", water)
+        messagebox.showinfo("Info", f"Added {water} liters of water. Total water today: {self.tracker.total_today('water'):g} liters")
 
     def add_sleep(self):
         sleep = self.sleep.get()
-        self.total_sleep += sleep
-        messagebox.showinfo("Info", f"Added {sleep} hours of sleep. Total sleep: {self.total_sleep} hours")
+        self.tracker.record("sleep", sleep)
+        messagebox.showinfo("Info", f"Added {sleep} hours of sleep. Total sleep today: {self.tracker.total_today('sleep'):g} hours")
+
+    def run_task(self, description, fn, *args, on_done):
+        # Runs fn(task, *args) in the background, showing its progress in the status row.
+        # The current profile is leased until the task ends, so switching through
+        # other profiles meanwhile cannot close the tracker it is working on.
+        profile = self.current_profile
+        self.profiles.acquire(profile)
+
+        def finished(callback=None, *result):
+            self.profiles.release(profile)
+            self.active_tasks.discard(task)
+            if not self.active_tasks:
+                self.progress.stop()
+                self.progress.config(mode="indeterminate", value=0)
+                self.status_label.config(text="")
+                self.cancel_button.config(state="disabled")
+            if callback is not None:
+                callback(*result)
+
+        def show_progress(done, total):
+            if total:
+                self.progress.stop()
+                self.progress.config(mode="determinate", maximum=total, value=done)
+
+        def show_error(error):
+            messagebox.showerror("Error", f"{description} failed: {error}")
+
+        self.status_label.config(text=description)
+        self.progress.start()
+        self.cancel_button.config(state="normal")
+        task = self.tasks.submit(
+            fn,
+            *args,
+            on_done=lambda result: finished(on_done, result),
+            on_error=lambda error: finished(show_error, error),
+            on_cancel=finished,
+            on_progress=show_progress,
+        )
+        self.active_tasks.add(task)
+        return task
+
+    def cancel_tasks(self):
+        for task in list(self.active_tasks):
+            task.cancel()
 
     def show_summary(self):
-        steps_comparison = "✓" if self.total_steps >= self.recommended_steps else "✗"
-        water_comparison = "✓" if self.total_water >= self.recommended_water else "✗"
-        sleep_comparison = "✓" if self.total_sleep >= self.recommended_sleep else "✗"
-
-        summary = (
-            f"Total steps: {self.total_steps} (Recommended: {self.recommended_steps}) [{steps_comparison}]\n"
-            f"Total water intake: {self.total_water} liters (Recommended: {self.recommended_water} liters) [{water_comparison}]\n"
-            f"Total sleep: {self.total_sleep} hours (Recommended: {self.recommended_sleep} hours) [{sleep_comparison}]"
+        # Bind the current profile now, the user may switch before the task runs
+        tracker = self.tracker
+        self.run_task(
+            "Computing summary...",
+            lambda task: tracker.format_summary(),
+            on_done=lambda summary: messagebox.showinfo("Health Summary", summary),
+        )
+
+    def show_charts(self):
+        tracker = self.tracker
+        profile = self.current_profile
+
+        def load(task):
+            with tracker.lock:
+                series = {metric: tracker.store.series(metric) for metric in tracker.summaries}
+                return {metric: TrendTiles.from_series(values) for metric, values in series.items()}
+
+        def show(tiles):
+            if not any(len(metric_tiles) for metric_tiles in tiles.values()):
+                messagebox.showinfo("Charts", "There are no readings to chart yet.")
+                return
+            ChartWindow(self.root, f"Trends - {profile}", tiles, self.theme)
+
+        self.run_task("Loading charts...", load, on_done=show)
+
+    def show_history(self):
+        tracker = self.tracker
+        profile = self.current_profile
+
+        def load(task):
+            book = tracker.appointments
+            appointments = sorted(
+                (appointment for doctor in book.doctors() for appointment in book.appointments(doctor)),
+                key=lambda appointment: appointment.start,
+                reverse=True,
+            )
+            return tracker.history(), appointments, tracker.records.find()
+
+        self.run_task("Loading history...", load, on_done=lambda result: self.history_window(profile, *result))
+
+    def history_window(self, profile, readings, appointments, records):
+        # Readings, appointments and records in virtualized lists, rows are only
+        # formatted as they scroll into view
+        metrics, timestamps, codes, values = readings
+        labels = [METRIC_LABELS[metric] for metric in metrics]
+
+        def reading_row(index):
+            label, unit = labels[codes[index]]
+            return (f"{datetime.fromtimestamp(timestamps[index]):%Y-%m-%d %H:%M:%S}", label, f"{values[index]:g}{unit}")
+
+        def appointment_row(index):
+            appointment = appointments[index]
+            return (f"{appointment.start:%Y-%m-%d}", f"{appointment.start:%H:%M}-{appointment.end:%H:%M}", appointment.doctor)
+
+        def record_row(index):
+            record = records[index]
+            return (record.record_date, record.name, record.doctor or "", f"{record.size / 1024:,.0f} KiB")
+
+        window = tk.Toplevel(self.root)
+        window.title(f"History - {profile}")
+        subscribe(self.theme, window, style_window(window))
+        notebook = ttk.Notebook(window)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        for title, columns, widths, get_row, count in (
+            ("Readings", ("Time", "Metric", "Amount"), (20, 14, 14), reading_row, len(values)),
+            ("Appointments", ("Date", "Time", "Doctor"), (12, 12, 16), appointment_row, len(appointments)),
+            ("Records", ("Date", "File", "Doctor", "Size"), (12, 30, 14, 12), record_row, len(records)),
+        ):
+            notebook.add(VirtualList(notebook, columns, get_row, count, widths=widths, visible_rows=20), text=f"{title} ({count})")
+
+    def show_goals(self):
+        tracker = self.tracker
+        profile = self.current_profile
+        self.run_task(
+            "Computing goals...",
+            lambda task: tracker.goal_stats(),
+            on_done=lambda stats: self.goals_window(profile, tracker, stats),
         )
-        messagebox.showinfo("Health Summary", summary)
+
+    def goals_window(self, profile, tracker, stats):
+        # The details the targets are worked out from, and how often each was met
+        settings = tracker.goals.settings
+        window = tk.Toplevel(self.root)
+        window.title(f"My Goals - {profile}")
+        subscribe(self.theme, window, style_window(window))
+        fields = {}
+        for row, (name, label, value) in enumerate(
+            (("age", "Age:", settings.age), ("weight", "Weight (kg):", settings.weight), ("height", "Height (cm):", settings.height))
+        ):
+            fields[name] = tk.StringVar(value="" if value is None else f"{value:g}")
+            ttk.Label(window, text=label).grid(row=row, column=0, padx=10, sticky="e")
+            ttk.Entry(window, textvariable=fields[name]).grid(row=row, column=1, padx=10)
+        table = ttk.Frame(window)
+        table.grid(row=4, column=0, columnspan=2, padx=10, pady=10)
+
+        def show(stats):
+            if not window.winfo_exists():
+                return
+            for child in table.winfo_children():
+                child.destroy()
+            for column, title in enumerate(("Metric", "Today's Goal", "Days Met", "Streak", "Best")):
+                ttk.Label(table, text=title, font=("Helvetica", 10, "bold")).grid(row=0, column=column, padx=5, sticky="w")
+            for row, (metric, goal) in enumerate(stats.items(), start=1):
+                label, unit = METRIC_LABELS[metric]
+                cells = (label, f"{goal.target:g}{unit}", f"{goal.met}/{goal.days} ({goal.attainment:.0%})", goal.current_streak, goal.best_streak)
+                for column, text in enumerate(cells):
+                    ttk.Label(table, text=text).grid(row=row, column=column, padx=5, sticky="w")
+
+        def save():
+            try:
+                changes = {name: float(var.get()) if var.get().strip() else None for name, var in fields.items()}
+            except ValueError:
+                messagebox.showwarning("Input Error", "Age, weight and height must be numbers.", parent=window)
+                return
+            if any(value is not None and value <= 0 for value in changes.values()):
+                messagebox.showwarning("Input Error", "Age, weight and height must be positive.", parent=window)
+                return
+            if changes["age"] is not None:
+                changes["age"] = int(changes["age"])
+
+            def update(task):
+                tracker.update_goals(**changes)
+                return tracker.goal_stats()
+
+            self.run_task("Updating goals...", update, on_done=show)
+
+        ttk.Button(window, text="Save", command=save).grid(row=3, column=0, columnspan=2, pady=10)
+        show(stats)
 
     def get_advice(self):
         symptoms = self.symptom_input.get("1.0", tk.END).strip()
         if symptoms:
-            advice = self.generate_advice(symptoms)
-            messagebox.showinfo("AI Assistant Advice", advice)
+            self.run_task(
+                "Generating advice...",
+                lambda task: cached_advice(symptoms),
+                on_done=lambda advice: messagebox.showinfo("AI Assistant Advice", advice),
+            )
         else:
             messagebox.showwarning("Warning", "Please enter your symptoms.")
 
-    def generate_advice(self, symptoms):
-        symptoms = symptoms.lower()
-        advice = []
-
-        symptom_dict = {
-            "headache": "For headaches, try resting in a dark room and staying hydrated. If the pain persists, consider consulting a doctor.",
-            "fever": "For a fever, rest and drink plenty of fluids. If the fever exceeds 101°F, seek medical attention.",
-            "cough": "For a cough, stay hydrated and consider using a humidifier. If it lasts more than a week, consult a doctor.",
-            "nausea": "For nausea, try ginger tea and avoid heavy meals. If it persists, see a healthcare provider.",
-            "fatigue": "For fatigue, ensure you are getting enough sleep and nutrition. If extreme, consult a doctor.",
-            "sore throat": "For a sore throat, warm salt water gargles and staying hydrated can help. Consult a doctor if it persists.",
-            "runny nose": "For a runny nose, try antihistamines and keep hydrated. If symptoms worsen, see a healthcare professional."
-        }
-
-        for symptom, suggestion in symptom_dict.items():
-            if symptom in symptoms:
-                advice.append(suggestion)
-
-        if not advice:
-            advice.append("I cannot provide specific advice for those symptoms. Please consult a healthcare professional.")
-
-        return "\n".join(advice)
-
     def schedule_appointment(self):
+        if self.cal is None:
+            # First use, show the calendar so a date can be picked
+            self.create_calendar()
+            return
         doctor = self.doctor_name.get()
-        date = self.cal.get_date()
-        messagebox.showinfo("Appointment Scheduled", f"Appointment with {doctor} on {date}.")
+        if not doctor:
+            messagebox.showwarning("Warning", "Please select a doctor.")
+            return
+        start = datetime.strptime(f"{self.cal.get_date()} {self.appointment_time.get()}", "%Y-%m-%d %H:%M")
+        tracker = self.tracker
+        cal = self.cal
+
+        def book(task):
+            # (conflict, next free slot), or None once booked and on disk
+            with tracker.lock:
+                try:
+                    tracker.appointments.book(doctor, start)
+                except AppointmentConflict as e:
+                    return e, tracker.appointments.next_free_slot(doctor, start)
+            return None
+
+        def show(conflict):
+            if conflict is not None:
+                error, free = conflict
+                messagebox.showwarning("Appointment Unavailable", f"{error}\nNext free slot: {free:%Y-%m-%d %H:%M}")
+                return
+            cal.calevent_create(start.date(), f"{doctor} {start:%H:%M}", "appointment")
+            messagebox.showinfo("Appointment Scheduled", f"Appointment with {doctor} on {start:%Y-%m-%d} at {start:%H:%M}.")
+
+        self.run_task("Booking appointment...", book, on_done=show)
 
     def upload_records(self):
         file_path = filedialog.askopenfilename(title="Select Medical Record File")
         if file_path:
-            self.medical_records = file_path
+            doctor = self.doctor_name.get() or None
+            records = self.tracker.records
+            self.run_task(
+                "Uploading medical records...",
+                lambda task: records.ingest(file_path, doctor=doctor, progress=task.progress),
+                on_done=lambda record: self.records_uploaded(file_path, record),
+            )
+
+    def records_uploaded(self, file_path, record):
+        self.medical_records = file_path
+        if record.duplicate:
+            messagebox.showinfo("Success", f"{file_path} was already uploaded.")
+        else:
             messagebox.showinfo("Success", f"Uploaded medical records from {file_path}.")
 
+    def import_wearables(self):
+        file_path = filedialog.askopenfilename(title="Select Wearable Data", filetypes=WEARABLE_FILETYPES)
+        if file_path:
+            tracker = self.tracker
+            self.run_task(
+                "Importing wearable data...",
+                lambda task: import_file(tracker, file_path, progress=task.progress),
+                on_done=lambda counts: messagebox.showinfo(
+                    "Import Complete", "\n".join(f"{metric}: {count} readings" for metric, count in counts.items())
+                ),
+            )
+
+    def export_wearables(self):
+        file_path = filedialog.asksaveasfilename(title="Export Wearable Data", defaultextension=".csv", filetypes=WEARABLE_FILETYPES)
+        if file_path:
+            tracker = self.tracker
+            self.run_task(
+                "Exporting wearable data...",
+                lambda task: export_file(tracker, file_path),
+                on_done=lambda rows: messagebox.showinfo("Export Complete", f"Exported {rows} readings to {file_path}."),
+            )
+
     def calculate_bmi(self):
-        weight = self.weight.get()
-        height = self.height.get() / 100  # convert height from cm to meters
-        if weight > 0 and height > 0:
-            bmi = weight / (height ** 2)
-            interpretation = self.interpret_bmi(bmi)
-            messagebox.showinfo("BMI Result", f"Your BMI is: {bmi:.2f}\nCategory: {interpretation}")
-        else:
-            messagebox.showwarning("Input Error", "Please enter valid weight and height values.")
-
-    def interpret_bmi(self, bmi):
-        if bmi < 18.5:
-            return "Underweight"
-        elif 18.5 <= bmi < 24.9:
-            return "Normal weight"
-        elif 25 <= bmi < 29.9:
-            return "Overweight"
-        else:
-            return "Obesity"
+        try:
+            bmi = self.tracker.record_bmi(self.weight.get(), self.height.get())
+        except ValueError as e:
+            messagebox.showwarning("Input Error", str(e))
+            return
+        interpretation = interpret_bmi(bmi)
+        messagebox.showinfo("BMI Result", f"Your BMI is: {bmi:.2f}\nCategory: {interpretation}")
+
+class ChartWindow:
+    # One canvas per metric on a shared time axis. Lines are drawn on an absolute
+    # pixel grid and panning just scrolls the canvases, so the only drawing done
+    # while panning is for tiles coming into view; their downsampled points are
+    # cached per zoom level by TrendTiles.
+    WIDTH = 900
+    HEIGHT = 150
+    MARGIN = 12
+    COLORS = {"steps": "#1f77b4", "water": "#17becf", "sleep": "#9467bd"}
+
+    def __init__(self, root, title, tiles, theme):
+        self.tiles = tiles
+        self.text_color = theme.colors["foreground"]
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.columnconfigure(0, weight=1)
+
+        filled = [metric_tiles for metric_tiles in tiles.values() if len(metric_tiles)]
+        self.start = min(metric_tiles.start for metric_tiles in filled)
+        self.end = max(metric_tiles.end for metric_tiles in filled)
+        self.axis = filled[0]  # every metric shares the same zoom levels and tile grid
+        self.max_zoom = self.fit_zoom()
+
+        self.canvases = {}
+        self.drawn = {}
+        for row, (metric, metric_tiles) in enumerate(tiles.items()):
+            label, unit = METRIC_LABELS[metric]
+            extent = f" ({metric_tiles.low:g} to {metric_tiles.high:g}{unit})" if len(metric_tiles) else " (no readings)"
+            ttk.Label(self.window, text=label + extent).grid(row=2 * row, column=0, padx=10, sticky="w")
+            canvas = tk.Canvas(
+                self.window, width=self.WIDTH, height=self.HEIGHT, highlightthickness=0, xscrollincrement=1
+            )
+            canvas.grid(row=2 * row + 1, column=0, padx=10, sticky="ew")
+            canvas.bind("<ButtonPress-1>", self.start_drag)
+            canvas.bind("<B1-Motion>", self.drag)
+            canvas.bind("<MouseWheel>", self.wheel)
+            canvas.bind("<Button-4>", self.wheel)
+            canvas.bind("<Button-5>", self.wheel)
+            canvas.bind("<Configure>", self.schedule_draw)
+            self.canvases[metric] = canvas
+            self.drawn[metric] = set()
+
+        self.scrollbar = ttk.Scrollbar(self.window, orient=tk.HORIZONTAL, command=self.scroll)
+        self.scrollbar.grid(row=2 * len(tiles), column=0, padx=10, sticky="ew")
+        next(iter(self.canvases.values())).config(xscrollcommand=self.scrollbar.set)
+        controls = ttk.Frame(self.window)
+        controls.grid(row=2 * len(tiles) + 1, column=0, pady=5)
+        ttk.Button(controls, text="Zoom In", command=lambda: self.zoom_by(-1)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Zoom Out", command=lambda: self.zoom_by(1)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Show All", command=lambda: self.set_zoom(self.max_zoom, self.start, 0)).pack(side=tk.LEFT, padx=5)
+
+        self.drag_x = 0
+        self.pending_draw = None
+        subscribe(theme, self.window, self.apply_theme)
+        self.set_zoom(self.max_zoom, self.start, 0)
+
+    def apply_theme(self, colors):
+        self.text_color = colors["foreground"]
+        self.window.configure(bg=colors["background"])
+        for canvas in self.canvases.values():
+            canvas.configure(bg=colors["background"])
+            canvas.itemconfigure("label", fill=self.text_color)
+
+    def fit_zoom(self):
+        zoom = 0
+        while (self.end - self.start) / self.axis.seconds_per_pixel(zoom) > self.WIDTH:
+            zoom += 1
+        return zoom
+
+    def set_zoom(self, zoom, anchor_time, anchor_x):
+        # Redraws at another zoom level keeping anchor_time under pixel anchor_x
+        self.zoom = max(0, min(zoom, self.max_zoom))
+        self.seconds_per_pixel = self.axis.seconds_per_pixel(self.zoom)
+        span = self.axis.tile_span(self.zoom)
+        self.origin = self.axis.tile_index(self.zoom, self.start) * span
+        width = (self.axis.tile_index(self.zoom, self.end) + 1) * span - self.origin
+        width /= self.seconds_per_pixel
+        for metric, canvas in self.canvases.items():
+            canvas.delete("all")
+            self.drawn[metric].clear()
+            canvas.config(scrollregion=(0, 0, width, self.HEIGHT))
+            canvas.xview_moveto(((anchor_time - self.origin) / self.seconds_per_pixel - anchor_x) / width)
+        self.schedule_draw()
+
+    def zoom_by(self, step, x=None):
+        canvas = next(iter(self.canvases.values()))
+        if x is None:
+            x = canvas.winfo_width() / 2
+        anchor_time = self.origin + canvas.canvasx(x) * self.seconds_per_pixel
+        self.set_zoom(self.zoom + step, anchor_time, x)
+
+    def wheel(self, event):
+        zoom_in = event.num == 4 or event.delta > 0
+        self.zoom_by(-1 if zoom_in else 1, event.x)
+
+    def scroll(self, *args):
+        for canvas in self.canvases.values():
+            canvas.xview(*args)
+        self.schedule_draw()
+
+    def start_drag(self, event):
+        self.drag_x = event.x
+
+    def drag(self, event):
+        for canvas in self.canvases.values():
+            canvas.xview_scroll(self.drag_x - event.x, "units")
+        self.drag_x = event.x
+        self.schedule_draw()
+
+    def schedule_draw(self, event=None):
+        # Bursts of drag and resize events are drawn once, when Tk is next idle
+        if self.pending_draw is None:
+            self.pending_draw = self.window.after_idle(self.draw)
+
+    def draw(self):
+        self.pending_draw = None
+        canvas = next(iter(self.canvases.values()))
+        left = self.origin + canvas.canvasx(0) * self.seconds_per_pixel
+        right = self.origin + canvas.canvasx(canvas.winfo_width()) * self.seconds_per_pixel
+        # One tile of margin either side, so a short pan never shows an empty edge
+        visible = set(range(self.axis.tile_index(self.zoom, left) - 1, self.axis.tile_index(self.zoom, right) + 2))
+        for metric, canvas in self.canvases.items():
+            drawn = self.drawn[metric]
+            for index in drawn - visible:
+                canvas.delete(f"tile{index}")
+            for index in visible - drawn:
+                self.draw_tile(metric, canvas, index)
+            self.drawn[metric] = visible
+
+    def draw_tile(self, metric, canvas, index):
+        tiles = self.tiles[metric]
+        tag = f"tile{index}"
+        span = self.axis.tile_span(self.zoom)
+        x = (index * span - self.origin) / self.seconds_per_pixel
+        canvas.create_line(x, 0, x, self.HEIGHT, fill="#cccccc", dash=(2, 4), tags=tag)
+        label = datetime.fromtimestamp(index * span).strftime("%Y-%m-%d" if span >= 86400 else "%Y-%m-%d %H:%M")
+        canvas.create_text(
+            x + 3, self.HEIGHT - 2, text=label, anchor="sw", fill=self.text_color, font=("Helvetica", 8), tags=(tag, "label")
+        )
+        if not len(tiles):
+            return
+        timestamps, values = tiles.tile(self.zoom, index)
+        scale = (self.HEIGHT - 2 * self.MARGIN) / ((tiles.high - tiles.low) or 1)
+        coords = []
+        for timestamp, value in zip(timestamps, values):
+            coords.append((timestamp - self.origin) / self.seconds_per_pixel)
+            coords.append(self.HEIGHT - self.MARGIN - (value - tiles.low) * scale)
+        if len(coords) >= 4:
+            canvas.create_line(coords, fill=self.COLORS.get(metric, self.text_color), tags=tag)
+        elif coords:
+            x, y = coords
+            canvas.create_oval(x - 2, y - 2, x + 2, y + 2, fill=self.COLORS.get(metric, self.text_color), outline="", tags=tag)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Health Tracker")
+    parser.add_argument("--eager", action="store_true", help="build every section at startup")
+    parser.add_argument("--diagnostics", action="store_true", help="time every callback, also HEALTHTRACK_DIAGNOSTICS=1")
+    parser.add_argument("--profile", metavar="PATH", help="cProfile the whole session into PATH, implies --diagnostics")
+    args = parser.parse_args()
+    instruments = Instruments(True) if args.diagnostics or args.profile else Instruments.from_environment()
+    if args.profile:
+        instruments.start_profile()
     root = tk.Tk()
-    app = HealthTrackerApp(root)
+    app = HealthTrackerApp(root, lazy=not args.eager, instruments=instruments)
     root.mainloop()
+    if args.profile:
+        instruments.stop_profile(args.profile)
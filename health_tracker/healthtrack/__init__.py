@@ -0,0 +1,89 @@
+# GUI-free core of the health tracker. Nothing imported here may pull in tkinter,
+# tkcalendar or PIL, so the package stays importable on headless workers.
+from .advice import (
+    ADVICE_CACHE,
+    DEFAULT_ADVICE,
+    SYMPTOM_ADVICE,
+    SYMPTOM_SYNONYMS,
+    AdviceCache,
+    SymptomMatcher,
+    cached_advice,
+    generate_advice,
+)
+from .appointments import Appointment, AppointmentBook, AppointmentConflict, check_slot, slot_times
+from .bmi import BMI_BINS, BMI_CATEGORIES, bulk_bmi, bulk_categories, calculate_bmi, interpret_bmi
+from .charts import TrendTiles, lttb, minmax
+from .core import DOCTORS, HEALTH_TIPS, METRIC_LABELS, RECOMMENDED, HealthTracker, daily_tip
+from .goals import GoalEngine, GoalSettings, GoalStats, personal_targets
+from .instruments import Histogram, Instruments
+from .journal import GroupCommit
+from .metrics import MetricSeries, Sample
+from .profiles import DEFAULT_PROFILE, ProfileManager
+from .records import Record, RecordStore
+from .segments import Segment
+from .storage import METRICS, MetricLog, MetricStore, StoreLocked, default_data_dir, read_log, read_series
+from .summary import DayBucket, RollingSummary, WindowStats
+from .tasks import Task, TaskCancelled, TaskRunner
+from .wearables import APPLE_TYPES, FORMATS, export_file, import_file
+
+__all__ = [
+    "ADVICE_CACHE",
+    "APPLE_TYPES",
+    "BMI_BINS",
+    "BMI_CATEGORIES",
+    "DEFAULT_ADVICE",
+    "DEFAULT_PROFILE",
+    "DOCTORS",
+    "FORMATS",
+    "HEALTH_TIPS",
+    "METRICS",
+    "METRIC_LABELS",
+    "RECOMMENDED",
+    "SYMPTOM_ADVICE",
+    "SYMPTOM_SYNONYMS",
+    "AdviceCache",
+    "Appointment",
+    "AppointmentBook",
+    "AppointmentConflict",
+    "DayBucket",
+    "GoalEngine",
+    "GoalSettings",
+    "GoalStats",
+    "GroupCommit",
+    "HealthTracker",
+    "Histogram",
+    "Instruments",
+    "MetricLog",
+    "MetricSeries",
+    "MetricStore",
+    "ProfileManager",
+    "Record",
+    "RecordStore",
+    "RollingSummary",
+    "Sample",
+    "Segment",
+    "StoreLocked",
+    "SymptomMatcher",
+    "Task",
+    "TaskCancelled",
+    "TaskRunner",
+    "TrendTiles",
+    "WindowStats",
+    "bulk_bmi",
+    "bulk_categories",
+    "cached_advice",
+    "calculate_bmi",
+    "check_slot",
+    "daily_tip",
+    "default_data_dir",
+    "export_file",
+    "generate_advice",
+    "import_file",
+    "interpret_bmi",
+    "lttb",
+    "minmax",
+    "personal_targets",
+    "read_log",
+    "read_series",
+    "slot_times",
+]
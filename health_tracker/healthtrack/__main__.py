@@ -0,0 +1,25 @@
+# Command line entry point: python -m healthtrack <command> [options]
+import importlib
+import sys
+
+# command -> module whose main(argv) implements it
+COMMANDS = {
+    "bmi": "healthtrack.bmi",
+    "report": "healthtrack.reports",
+    "serve": "healthtrack.server",
+    "triage": "healthtrack.batch",
+    "wearables": "healthtrack.wearables",
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(f"usage: python -m healthtrack {{{','.join(COMMANDS)}}} [options]", file=sys.stderr)
+        return 2
+    status = importlib.import_module(COMMANDS[argv[0]]).main(argv[1:])
+    return 0 if status is None else status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+SYMPTOM_ADVICE = {
+    "headache": "For headaches, try resting in a dark room and staying hydrated. If the pain persists, consider consulting a doctor.",
+    "fever": "For a fever, rest and drink plenty of fluids. If the fever exceeds 101°F, seek medical attention.",
+    "cough": "For a cough, stay hydrated and consider using a humidifier. If it lasts more than a week, consult a doctor.",
+    "nausea": "For nausea, try ginger tea and avoid heavy meals. If it persists, see a healthcare provider.",
+    "fatigue": "For fatigue, ensure you are getting enough sleep and nutrition. If extreme, consult a doctor.",
+    "sore throat": "For a sore throat, warm salt water gargles and staying hydrated can help. Consult a doctor if it persists.",
+    "runny nose": "For a runny nose, try antihistamines and keep hydrated. If symptoms worsen, see a healthcare professional.",
+}
+
+DEFAULT_ADVICE = "I cannot provide specific advice for those symptoms. Please consult a healthcare professional."
+
+# Other ways of describing each symptom in SYMPTOM_ADVICE. Inflected forms of the
+# last word (headaches, coughing, ...) are generated, so only base forms go here.
+SYMPTOM_SYNONYMS = {
+    "headache": ["head ache", "head hurts", "head is pounding", "migraine", "pounding head"],
+    "fever": ["feverish", "high temperature", "pyrexia"],
+    "cough": ["hacking cough", "dry cough", "chesty cough"],
+    "nausea": ["nauseous", "nauseated", "queasy", "feel sick", "feeling sick", "want to vomit", "throw up"],
+    "fatigue": ["tired", "exhausted", "exhaustion", "worn out", "no energy", "lethargic", "lethargy"],
+    "sore throat": ["throat hurts", "throat is sore", "scratchy throat", "throat pain", "painful throat"],
+    "runny nose": ["running nose", "nose is running", "nasal drip", "dripping nose"],
+}
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text):
+    # Lowercase words separated by single spaces, the form every phrase is matched in
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _inflections(word):
+    forms = {word, word + "s", word + "es", word + "ed", word + "ing"}
+    if word.endswith("e"):
+        forms.update({word[:-1] + "ing", word + "d"})
+    return forms
+
+
+def _phrase_forms(phrase):
+    words = normalize(phrase).split(" ")
+    return {" ".join(words[:-1] + [form]) for form in _inflections(words[-1])}
+
+
+def _trie_pattern(phrases):
+    # One alternation with shared prefixes factored out, so the regex engine walks
+    # a trie instead of trying every phrase at every position. At each node the
+    # longer continuations are optional-greedy, which keeps the longest phrase.
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class SymptomMatcher:
+    # Maps free text to the set of symptoms it mentions in one pass over the text
+    def __init__(self, synonyms):
+        self.phrases = {}
+        for symptom, alternatives in synonyms.items():
+            for phrase in [symptom, *alternatives]:
+                for form in _phrase_forms(phrase):
+                    self.phrases.setdefault(form, symptom)
+        self.pattern = re.compile(r"\b(?:" + _trie_pattern(self.phrases) + r")\b")
+
+    def match(self, text, normalized=False):
+        if not normalized:
+            text = normalize(text)
+        return {self.phrases[found.group()] for found in self.pattern.finditer(text)}
+
+
+MATCHER = SymptomMatcher({symptom: SYMPTOM_SYNONYMS.get(symptom, []) for symptom in SYMPTOM_ADVICE})
+
+
+def _compose(found):
+    advice = [suggestion for symptom, suggestion in SYMPTOM_ADVICE.items() if symptom in found]
+    if not advice:
+        advice.append(DEFAULT_ADVICE)
+    return "\n".join(advice)
+
+
+def generate_advice(symptoms, matcher=MATCHER):
+    return _compose(matcher.match(symptoms))
+
+
+class AdviceCache:
+    # Bounded LRU of advice in front of the matcher. Entries are keyed on the text
+    # as given and on its normalized form, so a repeat costs one dict lookup and a
+    # variant in case, punctuation or spacing costs a normalize() and a lookup.
+    # The normalized form is as far as canonicalization can go: the matcher works
+    # on phrases, so "head hurts" and "hurts head" are different inputs. Past the
+    # matcher, advice only depends on the set of symptoms found, so composed
+    # advice is shared between every text that finds the same set.
+    # Texts over max_text characters are not cached, they are one-off notes and
+    # would pin their whole length in memory. ttl (seconds) bounds how long an
+    # entry is served, None keeps entries until they are evicted.
+    def __init__(self, maxsize=4096, ttl=None, max_text=2000, matcher=MATCHER, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_text = max_text
+        self.matcher = matcher
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()  # text -> (advice, expires)
+        self._composed = {}  # frozenset of symptoms -> advice
+        # Shared by the Tk thread, task threads and the service's executor
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, symptoms):
+        if len(symptoms) > self.max_text:
+            with self._lock:
+                self.misses += 1
+            return generate_advice(symptoms, self.matcher)
+        now = self.clock()
+        with self._lock:
+            entry = self._lookup(symptoms, now)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+        key = normalize(symptoms)
+        with self._lock:
+            entry = self._lookup(key, now)
+            if entry is not None:
+                self.hits += 1
+                self._store(symptoms, entry)
+                return entry[0]
+            self.misses += 1
+        found = frozenset(self.matcher.match(key, normalized=True))
+        with self._lock:
+            advice = self._composed.get(found)
+            if advice is None:
+                advice = self._composed[found] = _compose(found)
+            entry = (advice, None if self.ttl is None else now + self.ttl)
+            self._store(key, entry)
+            self._store(symptoms, entry)
+        return advice
+
+    def clear(self):
+        # Drops every entry, e.g. after SYMPTOM_ADVICE has been edited
+        with self._lock:
+            self._entries.clear()
+            self._composed.clear()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# The process-wide cache behind cached_advice(), used by the GUI, the HTTP service
+# and each triage worker
+ADVICE_CACHE = AdviceCache()
+
+
+def cached_advice(symptoms):
+    return ADVICE_CACHE.get(symptoms)
@@ -0,0 +1,194 @@
+import json
+import os
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta
+
+from .journal import GroupCommit, checksum_line, read_lines
+
+SLOT = timedelta(minutes=30)
+OPENING = time(9, 0)
+CLOSING = time(17, 0)
+
+
+def slot_times(opening=OPENING, closing=CLOSING, slot=SLOT):
+    # "HH:MM" start times of every slot in a day, for pickers
+    times = []
+    current = datetime.combine(datetime.min.date(), opening)
+    last = datetime.combine(datetime.min.date(), closing) - slot
+    while current <= last:
+        times.append(f"{current:%H:%M}")
+        current += slot
+    return times
+
+
+def check_slot(start, duration=SLOT, opening=OPENING, closing=CLOSING, slot=SLOT):
+    # Raises ValueError unless start is on the slot grid and the appointment fits in
+    # that day's opening hours, the same slots next_free_slot and slot_times offer
+    day_open = datetime.combine(start.date(), opening)
+    if start < day_open or start + duration > datetime.combine(start.date(), closing):
+        raise ValueError(f"Appointments are between {opening:%H:%M} and {closing:%H:%M}.")
+    if (start - day_open) % slot:
+        raise ValueError(f"Appointments start every {slot.seconds // 60} minutes from {opening:%H:%M}.")
+
+
+class AppointmentConflict(ValueError):
+    def __init__(self, appointment):
+        super().__init__(
+            f"{appointment.doctor} is already booked from {appointment.start:%Y-%m-%d %H:%M} to {appointment.end:%H:%M}."
+        )
+        self.appointment = appointment
+
+
+class Appointment:
+    __slots__ = ("doctor", "start", "end")
+
+    def __init__(self, doctor, start, end):
+        self.doctor = doctor
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"Appointment({self.doctor!r}, {self.start:%Y-%m-%d %H:%M}, {self.end:%H:%M})"
+
+    def to_dict(self):
+        return {"doctor": self.doctor, "start": self.start.isoformat(), "end": self.end.isoformat()}
+
+
+class AppointmentBook:
+    # Per-doctor lists of bookings kept sorted by start time. Bookings for a doctor
+    # never overlap, so they are sorted by end time too and a conflict can only be
+    # with the neighbours found by one bisect. Every change is appended to a journal
+    # of checksummed JSON lines and replayed on open; book() and cancel() only
+    # return once their line is on disk, and only change the lists after that, so
+    # a failed write leaves nothing in memory that is not on disk.
+    def __init__(self, path, committer=None):
+        self.path = path
+        self._starts = {}
+        self._bookings = {}
+        self._own_committer = committer is None
+        self.committer = GroupCommit() if committer is None else committer
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            lines, end = read_lines(data)
+            for line in lines:
+                if line.strip():
+                    self._replay(json.loads(line))
+            if end != len(data):
+                # Drop the line torn by a crash mid-write
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._log = open(path, "ab")
+
+    def _replay(self, entry):
+        appointment = Appointment(entry["doctor"], datetime.fromisoformat(entry["start"]), datetime.fromisoformat(entry["end"]))
+        if entry["op"] == "book":
+            self._insert(appointment)
+        else:
+            self._remove(appointment)
+
+    def _write(self, op, appointment):
+        self._log.write(checksum_line(json.dumps(dict(appointment.to_dict(), op=op))))
+        self._log.flush()
+        self.committer.wait(self.committer.submit(self._log))
+
+    def _insert(self, appointment):
+        starts = self._starts.setdefault(appointment.doctor, [])
+        index = bisect_right(starts, appointment.start)
+        starts.insert(index, appointment.start)
+        self._bookings.setdefault(appointment.doctor, []).insert(index, appointment)
+
+    def _index(self, appointment):
+        starts = self._starts.get(appointment.doctor, [])
+        index = bisect_left(starts, appointment.start)
+        if index == len(starts) or starts[index] != appointment.start:
+            raise KeyError(f"No appointment with {appointment.doctor} at {appointment.start}")
+        return index
+
+    def _remove(self, appointment):
+        index = self._index(appointment)
+        del self._starts[appointment.doctor][index]
+        del self._bookings[appointment.doctor][index]
+
+    def doctors(self):
+        return sorted(self._bookings)
+
+    def appointments(self, doctor, start=None, end=None):
+        # Bookings for doctor that start in [start, end)
+        starts = self._starts.get(doctor, [])
+        low = 0 if start is None else bisect_left(starts, start)
+        high = len(starts) if end is None else bisect_left(starts, end)
+        return self._bookings.get(doctor, [])[low:high]
+
+    def conflict(self, doctor, start, end):
+        # The booking that overlaps [start, end), or None
+        starts = self._starts.get(doctor)
+        if not starts:
+            return None
+        bookings = self._bookings[doctor]
+        index = bisect_right(starts, start)
+        if index > 0 and bookings[index - 1].end > start:
+            return bookings[index - 1]
+        if index < len(bookings) and bookings[index].start < end:
+            return bookings[index]
+        return None
+
+    def book(self, doctor, start, duration=SLOT):
+        check_slot(start, duration)
+        end = start + duration
+        existing = self.conflict(doctor, start, end)
+        if existing is not None:
+            raise AppointmentConflict(existing)
+        appointment = Appointment(doctor, start, end)
+        self._write("book", appointment)
+        self._insert(appointment)
+        return appointment
+
+    def cancel(self, appointment):
+        self._index(appointment)  # KeyError before anything is written
+        self._write("cancel", appointment)
+        self._remove(appointment)
+
+    def next_free_slot(self, doctor, after, duration=SLOT, opening=OPENING, closing=CLOSING, slot=SLOT):
+        # Earliest slot start >= after inside opening hours where doctor is free. Finds
+        # the first booking to check with a bisect, then walks forward over the
+        # bookings that are back to back with it.
+        if datetime.combine(after.date(), opening) + duration > datetime.combine(after.date(), closing):
+            raise ValueError("The appointment is longer than the opening hours.")
+        starts = self._starts.get(doctor, [])
+        bookings = self._bookings.get(doctor, [])
+        index = bisect_right(starts, after)
+        if index > 0 and bookings[index - 1].end > after:
+            index -= 1
+        candidate = after
+        while True:
+            day_open = datetime.combine(candidate.date(), opening)
+            day_close = datetime.combine(candidate.date(), closing)
+            if candidate < day_open:
+                candidate = day_open
+            candidate += -(candidate - day_open) % slot
+            if candidate + duration > day_close:
+                candidate = day_open + timedelta(days=1)
+                continue
+            while index < len(bookings) and bookings[index].end <= candidate:
+                index += 1
+            if index < len(bookings) and bookings[index].start < candidate + duration:
+                candidate = bookings[index].end
+                continue
+            return candidate
+
+    def booked_dates(self, start=None, end=None):
+        # Dates with at least one booking starting in [start, end), for the calendar
+        dates = set()
+        for doctor in self._bookings:
+            dates.update(appointment.start.date() for appointment in self.appointments(doctor, start, end))
+        return dates
+
+    def close(self):
+        if not self._log.closed:
+            self.committer.retire(self._log)
+            self._log.close()
+        if self._own_committer:
+            self.committer.close()
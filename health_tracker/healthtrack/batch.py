@@ -0,0 +1,102 @@
+# Batch symptom triage: cached_advice over large files of notes.
+#
+#     python -m healthtrack triage notes.txt -o advice.jsonl --workers 8
+#
+# Notes are read one per line and streamed through a process pool in chunks, with
+# only a bounded number of chunks in flight, so memory stays flat however large the
+# input is. Results are written in input order as JSON Lines.
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from .advice import cached_advice
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ordered_map(executor, fn, items, max_pending):
+    # Like executor.map, but submits lazily so at most max_pending tasks are queued
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def triage_chunk(notes):
+    # Each worker process has its own cache, repeated notes in its chunks hit it
+    return [cached_advice(note) for note in notes]
+
+
+def triage(notes, workers=None, chunksize=1000):
+    # Yields the advice for each note, in order
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunked(notes, chunksize):
+            yield from triage_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for advice in ordered_map(executor, triage_chunk, chunked(notes, chunksize), workers * 2):
+            yield from advice
+
+
+def read_notes(lines):
+    # Yields (line number, note), blank lines are skipped but still counted
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\n")
+        if line:
+            yield number, line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m healthtrack triage", description="Generate advice for a file of symptom notes.")
+    parser.add_argument("input", help="notes file, one note per line, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    count = 0
+    numbers = deque()
+
+    def notes():
+        # triage() reads notes ahead of its results, in order, so their line
+        # numbers queue up here until the advice for each comes back
+        for number, note in read_notes(source):
+            numbers.append(number)
+            yield note
+
+    try:
+        for count, advice in enumerate(triage(notes(), args.workers, args.chunksize), 1):
+            target.write(json.dumps({"note": numbers.popleft(), "advice": advice}, ensure_ascii=False) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else 0.0
+    cores = min(args.workers, os.cpu_count() or 1)
+    print(
+        f"{count} notes in {elapsed:.2f}s: {rate:,.0f} notes/s with {args.workers} workers "
+        f"({rate / cores:,.0f} notes/s per core)",
+        file=sys.stderr,
+    )
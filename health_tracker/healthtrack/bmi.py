@@ -0,0 +1,154 @@
+# BMI for one person (the GUI) and for whole populations (reporting).
+#
+#     python -m healthtrack bmi people.csv -o people_bmi.csv
+#
+# Both paths share BMI_BINS, so a value is always put in the same category.
+import argparse
+import csv
+import math
+import sys
+import time
+from array import array
+from bisect import bisect_right
+
+from .metrics import optional_numpy
+
+# Category boundaries: [0, 18.5) underweight, [18.5, 25) normal, [25, 30) overweight, 30+ obesity
+BMI_BINS = (18.5, 25.0, 30.0)
+BMI_CATEGORIES = ("Underweight", "Normal weight", "Overweight", "Obesity")
+
+# Category code for rows with a missing or invalid weight/height
+INVALID = -1
+
+
+def calculate_bmi(weight, height):
+    # Weight in kg, height in cm
+    height = height / 100
+    if weight <= 0 or height <= 0:
+        raise ValueError("Please enter valid weight and height values.")
+    return weight / (height ** 2)
+
+
+def bmi_category(bmi):
+    return bisect_right(BMI_BINS, bmi)
+
+
+def interpret_bmi(bmi):
+    return BMI_CATEGORIES[bmi_category(bmi)]
+
+
+def bulk_bmi(weights, heights):
+    # BMI for every (kg, cm) pair, NaN where either value is not positive. Returns a
+    # NumPy array when NumPy is available and an array("d") otherwise.
+    np = optional_numpy()
+    if np is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        heights = np.asarray(heights, dtype=np.float64) / 100
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bmi = weights / (heights * heights)
+        bmi[(weights <= 0) | (heights <= 0)] = np.nan
+        return bmi
+    result = array("d")
+    for weight, height in zip(weights, heights):
+        height = height / 100
+        result.append(weight / (height * height) if weight > 0 and height > 0 else math.nan)
+    return result
+
+
+def bulk_categories(bmi):
+    # Index into BMI_CATEGORIES for every value, INVALID for NaN
+    np = optional_numpy()
+    if np is not None:
+        bmi = np.asarray(bmi, dtype=np.float64)
+        codes = np.digitize(bmi, BMI_BINS).astype(np.int8)
+        codes[np.isnan(bmi)] = INVALID
+        return codes
+    return array("b", (INVALID if math.isnan(value) else bisect_right(BMI_BINS, value) for value in bmi))
+
+
+def category_counts(codes):
+    np = optional_numpy()
+    if np is not None:
+        tally = np.bincount(np.asarray(codes, dtype=np.int64) + 1, minlength=len(BMI_CATEGORIES) + 1)
+    else:
+        tally = [0] * (len(BMI_CATEGORIES) + 1)
+        for code in codes:
+            tally[code + 1] += 1
+    counts = {name: int(count) for name, count in zip(BMI_CATEGORIES, tally[1:])}
+    counts["Invalid"] = int(tally[0])
+    return counts
+
+
+def read_csv(path, weight_column="weight", height_column="height"):
+    # Loads the two columns into typed arrays, blank, missing or unparsable cells
+    # become NaN
+    weights = array("d")
+    heights = array("d")
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{path} is empty")
+        missing = [column for column in (weight_column, height_column) if column not in header]
+        if missing:
+            raise ValueError(f"{path} has no {' or '.join(repr(column) for column in missing)} column")
+        weight_index = header.index(weight_column)
+        height_index = header.index(height_column)
+        for row in reader:
+            if not row:
+                continue
+            weights.append(_to_float(row[weight_index]) if weight_index < len(row) else math.nan)
+            heights.append(_to_float(row[height_index]) if height_index < len(row) else math.nan)
+    return weights, heights
+
+
+def read_parquet(path, weight_column="weight", height_column="height"):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet files requires pyarrow") from None
+    table = pq.read_table(path, columns=[weight_column, height_column])
+    return (
+        table.column(weight_column).to_numpy(zero_copy_only=False),
+        table.column(height_column).to_numpy(zero_copy_only=False),
+    )
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m healthtrack bmi", description="BMI and categories for a file of people.")
+    parser.add_argument("input", help="CSV or Parquet file with weight (kg) and height (cm) columns")
+    parser.add_argument("-o", "--output", help="write a CSV with bmi and category columns")
+    parser.add_argument("--weight-column", default="weight")
+    parser.add_argument("--height-column", default="height")
+    args = parser.parse_args(argv)
+
+    read = read_parquet if args.input.endswith(".parquet") else read_csv
+    try:
+        weights, heights = read(args.input, args.weight_column, args.height_column)
+    except (ImportError, OSError, ValueError) as e:
+        parser.error(str(e))
+
+    optional_numpy()  # import NumPy before the clock starts
+    start = time.perf_counter()
+    bmi = bulk_bmi(weights, heights)
+    codes = bulk_categories(bmi)
+    elapsed = time.perf_counter() - start
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["bmi", "category"])
+            for value, code in zip(bmi, codes):
+                writer.writerow(["" if code == INVALID else f"{value:.2f}", "" if code == INVALID else BMI_CATEGORIES[code]])
+
+    for name, count in category_counts(codes).items():
+        print(f"{name}: {count}")
+    rate = len(bmi) / elapsed if elapsed else 0.0
+    print(f"{len(bmi)} rows classified in {elapsed * 1000:.1f} ms ({rate:,.0f} rows/s)", file=sys.stderr)
@@ -0,0 +1,232 @@
+# Downsampling and tiling for the trend charts. GUI-free: the Tk side only turns
+# the (timestamps, values) of each tile into canvas lines.
+#
+# Time is cut into tiles of TILE_WIDTH pixels on a grid anchored at the epoch,
+# with zoom level z showing BASE_RESOLUTION * 2**z seconds per pixel. A tile holds
+# at most a few points per pixel whatever the density of the data underneath, and
+# tiles are cached per (zoom, index), so panning only ever computes the tiles that
+# scroll into view and zooming back to a level reuses what was already built.
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import islice
+
+from .metrics import optional_numpy
+
+TILE_WIDTH = 256
+BASE_RESOLUTION = 60  # seconds per pixel at zoom level 0
+METHODS = ("lttb", "minmax")
+
+
+def minmax(timestamps, values, start, seconds_per_column, columns):
+    # Keeps the lowest and highest reading of every column (in time order), so no
+    # spike is lost however many readings share a pixel, and the first and last
+    # reading, so the line still starts and ends where the data does. Ties keep the
+    # first lowest and the last highest reading. Timestamps must be sorted.
+    np = optional_numpy()
+    if np is not None:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) <= 2 * columns:
+            return timestamps, values
+        column = np.minimum(((timestamps - start) // seconds_per_column).astype(np.int64), columns - 1)
+        order = np.lexsort((values, column))
+        firsts = np.flatnonzero(np.diff(column[order], prepend=-1))
+        lasts = np.append(firsts[1:], len(order)) - 1
+        keep = np.unique(np.concatenate((order[firsts], order[lasts], (0, len(values) - 1))))
+        return timestamps[keep], values[keep]
+
+    if len(values) <= 2 * columns:
+        return array("d", timestamps), array("d", values)
+    lows = {}
+    highs = {}
+    for index, (timestamp, value) in enumerate(zip(timestamps, values)):
+        column = min(int((timestamp - start) // seconds_per_column), columns - 1)
+        low = lows.get(column)
+        if low is None:
+            lows[column] = highs[column] = index
+        elif value < values[low]:
+            lows[column] = index
+        elif value >= values[highs[column]]:
+            highs[column] = index
+    keep = sorted(set(lows.values()) | set(highs.values()) | {0, len(values) - 1})
+    return array("d", (timestamps[i] for i in keep)), array("d", (values[i] for i in keep))
+
+
+def lttb(timestamps, values, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, from each
+    # of threshold - 2 buckets in between, the point forming the largest triangle
+    # with the point kept before it and the average of the next bucket.
+    count = len(values)
+    np = optional_numpy()
+    if threshold >= count or threshold < 3:
+        if np is not None:
+            return np.asarray(timestamps, dtype=np.float64), np.asarray(values, dtype=np.float64)
+        return array("d", timestamps), array("d", values)
+    every = (count - 2) / (threshold - 2)
+    keep = [0]
+    previous = 0
+    if np is not None:
+        xs = np.asarray(timestamps, dtype=np.float64)
+        ys = np.asarray(values, dtype=np.float64)
+        # Relative to the first point, so the areas are not products of epoch seconds
+        xs = xs - xs[0]
+        for bucket in range(threshold - 2):
+            low = int(bucket * every) + 1
+            high = int((bucket + 1) * every) + 1
+            next_high = min(int((bucket + 2) * every) + 1, count)
+            average_x = xs[high:next_high].mean()
+            average_y = ys[high:next_high].mean()
+            x, y = xs[previous], ys[previous]
+            areas = np.abs((x - average_x) * (ys[low:high] - y) - (x - xs[low:high]) * (average_y - y))
+            previous = low + int(areas.argmax())
+            keep.append(previous)
+        keep.append(count - 1)
+        keep = np.array(keep)
+        return np.asarray(timestamps, dtype=np.float64)[keep], ys[keep]
+
+    origin = timestamps[0]
+    for bucket in range(threshold - 2):
+        low = int(bucket * every) + 1
+        high = int((bucket + 1) * every) + 1
+        next_high = min(int((bucket + 2) * every) + 1, count)
+        span = next_high - high
+        average_x = sum(timestamps[high:next_high]) / span - origin
+        average_y = sum(values[high:next_high]) / span
+        x, y = timestamps[previous] - origin, values[previous]
+        best_area = -1.0
+        for index in range(low, high):
+            area = abs((x - average_x) * (values[index] - y) - (x - timestamps[index] + origin) * (average_y - y))
+            if area > best_area:
+                best_area = area
+                previous = index
+        keep.append(previous)
+    keep.append(count - 1)
+    return array("d", (timestamps[i] for i in keep)), array("d", (values[i] for i in keep))
+
+
+class TrendTiles:
+    # A time-sorted copy of one metric's readings and an LRU of downsampled tiles.
+    # "lttb" pre-selects the min and max of every half pixel and runs LTTB down to
+    # one point per pixel; "minmax" keeps the min and max of every pixel.
+    def __init__(self, timestamps, values, tile_width=TILE_WIDTH, base_resolution=BASE_RESOLUTION, method="lttb", max_tiles=512):
+        if method not in METHODS:
+            raise ValueError(f"Unknown downsampling method: {method}")
+        self.tile_width = tile_width
+        self.base_resolution = base_resolution
+        self.method = method
+        self.max_tiles = max_tiles
+        self.hits = 0
+        self.misses = 0
+        self._tiles = OrderedDict()
+        self._load(timestamps, values)
+
+    @classmethod
+    def from_series(cls, series, **options):
+        return cls(series.timestamps, series.values, **options)
+
+    def _load(self, timestamps, values):
+        # Columns mapped from a segment (read-only memoryviews, sorted) are used in
+        # place. Anything else is copied, a live array would grow under the tiles.
+        np = optional_numpy()
+        mapped = isinstance(values, memoryview)
+        if np is not None:
+            if mapped:
+                timestamps = np.frombuffer(timestamps, dtype=np.float64)
+                values = np.frombuffer(values, dtype=np.float64)
+            else:
+                timestamps = np.array(timestamps, dtype=np.float64)
+                values = np.array(values, dtype=np.float64)
+            if len(timestamps) > 1 and (timestamps[1:] < timestamps[:-1]).any():
+                order = np.argsort(timestamps, kind="stable")
+                timestamps = timestamps[order]
+                values = values[order]
+            self.timestamps = timestamps
+            self.values = values
+        elif mapped and all(a <= b for a, b in zip(timestamps, islice(timestamps, 1, None))):
+            self.timestamps = timestamps
+            self.values = values
+        else:
+            order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+            self.timestamps = array("d", (timestamps[i] for i in order))
+            self.values = array("d", (values[i] for i in order))
+        self._tiles.clear()
+        if len(self.values):
+            self.start = float(self.timestamps[0])
+            self.end = float(self.timestamps[-1])
+            self.low = float(self.values.min() if np is not None else min(self.values))
+            self.high = float(self.values.max() if np is not None else max(self.values))
+        else:
+            self.start = self.end = self.low = self.high = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def refresh(self, series):
+        # Reloads when readings were added since, returns whether anything changed
+        if len(series) == len(self):
+            return False
+        self._load(series.timestamps, series.values)
+        return True
+
+    def seconds_per_pixel(self, zoom):
+        return self.base_resolution * 2 ** zoom
+
+    def tile_span(self, zoom):
+        return self.tile_width * self.seconds_per_pixel(zoom)
+
+    def tile_index(self, zoom, timestamp):
+        return int(timestamp // self.tile_span(zoom))
+
+    def fit_zoom(self, pixels):
+        # Lowest zoom level at which the whole history fits in `pixels`
+        zoom = 0
+        if self.start is not None:
+            while (self.end - self.start) / self.seconds_per_pixel(zoom) > pixels:
+                zoom += 1
+        return zoom
+
+    def tile(self, zoom, index):
+        # (timestamps, values) to draw for a tile. The last reading before and the
+        # first after it are included, so the lines of neighbouring tiles join up.
+        key = (zoom, index)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self.hits += 1
+            self._tiles.move_to_end(key)
+            return tile
+        self.misses += 1
+        tile = self._tiles[key] = self._build(zoom, index)
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def _build(self, zoom, index):
+        span = self.tile_span(zoom)
+        start = index * span
+        np = optional_numpy()
+        if np is not None:
+            low, high = np.searchsorted(self.timestamps, (start, start + span))
+            low, high = int(low), int(high)
+        else:
+            low = bisect_left(self.timestamps, start)
+            high = bisect_left(self.timestamps, start + span)
+        timestamps = self.timestamps[low:high]
+        values = self.values[low:high]
+        if self.method == "minmax":
+            timestamps, values = minmax(timestamps, values, start, self.seconds_per_pixel(zoom), self.tile_width)
+        else:
+            columns = self.tile_width * 2
+            timestamps, values = minmax(timestamps, values, start, span / columns, columns)
+            timestamps, values = lttb(timestamps, values, self.tile_width)
+
+        first = max(low - 1, 0)
+        last = min(high + 1, len(self.values))
+        if np is not None:
+            timestamps = np.concatenate((self.timestamps[first:low], timestamps, self.timestamps[high:last]))
+            values = np.concatenate((self.values[first:low], values, self.values[high:last]))
+            return timestamps.tolist(), values.tolist()
+        return (
+            self.timestamps[first:low].tolist() + list(timestamps) + self.timestamps[high:last].tolist(),
+            self.values[first:low].tolist() + list(values) + self.values[high:last].tolist(),
+        )
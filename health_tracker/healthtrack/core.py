@@ -0,0 +1,191 @@
+import os
+import random
+import threading
+import time
+from array import array
+
+from .appointments import AppointmentBook
+from .bmi import calculate_bmi
+from .goals import GoalEngine, GoalSettings
+from .metrics import day_number, optional_numpy
+from .records import RecordStore
+from .storage import METRICS, MetricStore
+from .summary import RollingSummary
+
+# Daily recommendations, keyed by metric
+RECOMMENDED = {
+    "steps": 10000,
+    "water": 2.0,
+    "sleep": 8.0,
+}
+
+DOCTORS = ["Dr. Smith", "Dr. Johnson", "Dr. Lee"]
+
+HEALTH_TIPS = [
+    "Stay hydrated! Drink at least 8 cups of water daily.",
+    "Aim for 7-8 hours of sleep each night for optimal health.",
+    "Take a short walk after meals to aid digestion.",
+    "Incorporate fruits and vegetables into your diet.",
+    "Limit screen time before bed for better sleep.",
+]
+
+# (label, unit) used when reporting each metric
+METRIC_LABELS = {
+    "steps": ("Steps", ""),
+    "water": ("Water intake", " liters"),
+    "sleep": ("Sleep", " hours"),
+}
+
+
+def daily_tip():
+    return random.choice(HEALTH_TIPS)
+
+
+class HealthTracker:
+    # Everything HealthTrackerApp does apart from drawing it: recording entries in
+    # the persistent store, keeping the rolling summaries and checking them against
+    # the daily recommendations
+    def __init__(self, store=None, recommended=None):
+        self.store = store if store is not None else MetricStore()
+        self.recommended = dict(RECOMMENDED, **(recommended or {}))
+        self.summaries = {}
+        for metric in METRICS:
+            log = self.store.log(metric)
+            self.summaries[metric] = RollingSummary.from_segment(log.segment, log.tail)
+        self.records = RecordStore(os.path.join(self.store.directory, "records"))
+        self.appointments = AppointmentBook(os.path.join(self.store.directory, "appointments.jsonl"), self.store.committer)
+        # self.recommended are the general guidelines, the goals engine turns them
+        # into this user's own daily targets
+        self.goals = GoalEngine(
+            self.summaries, GoalSettings.load(os.path.join(self.store.directory, "goals.json")), self.recommended
+        )
+        # The GUI records entries on the Tk thread while summaries and syncs run on
+        # worker threads, so every access to the store and summaries takes this lock
+        self.lock = threading.RLock()
+
+    def record(self, metric, value, timestamp=None):
+        if metric not in self.summaries:
+            raise ValueError(f"Unknown metric: {metric}")
+        if timestamp is None:
+            timestamp = time.time()
+        with self.lock:
+            self.store.append(metric, value, timestamp)
+            summary = self.summaries[metric]
+            summary.add(value, timestamp)
+            self.goals.invalidate(metric, day_number(timestamp, summary.utc_offset))
+
+    def extend(self, metric, timestamps, values):
+        # Bulk version of record() for imports, timestamps and values are parallel sequences
+        if metric not in self.summaries:
+            raise ValueError(f"Unknown metric: {metric}")
+        if not len(values):
+            return
+        with self.lock:
+            self.store.extend(metric, timestamps, values)
+            summary = self.summaries[metric]
+            summary.extend(timestamps, values)
+            self.goals.invalidate(
+                metric, day_number(min(timestamps), summary.utc_offset), day_number(max(timestamps), summary.utc_offset)
+            )
+
+    def record_bmi(self, weight, height, timestamp=None):
+        # Calculates and keeps a BMI reading, the clinic reports follow it over time.
+        # It is a series of its own rather than one of METRICS, there is no daily
+        # total or goal for it.
+        bmi = calculate_bmi(weight, height)
+        with self.lock:
+            self.store.append("bmi", bmi, time.time() if timestamp is None else timestamp)
+        return bmi
+
+    def history(self):
+        # Every reading of every metric, newest first, as parallel columns (metric
+        # names, then per row: timestamp, index into the names, value) so a long
+        # history can be listed without a Python object per reading
+        with self.lock:
+            metrics = tuple(self.summaries)
+            timestamps = array("d")
+            codes = array("b")
+            values = array("d")
+            for code, metric in enumerate(metrics):
+                series = self.store.series(metric)
+                timestamps.frombytes(memoryview(series.timestamps).cast("B"))
+                values.frombytes(memoryview(series.values).cast("B"))
+                codes.extend(bytes([code]) * len(series))
+        np = optional_numpy()
+        if np is not None:
+            order = np.argsort(-np.frombuffer(timestamps, dtype=np.float64), kind="stable")
+            return (
+                metrics,
+                array("d", np.frombuffer(timestamps, dtype=np.float64)[order].tobytes()),
+                array("b", np.frombuffer(codes, dtype=np.int8)[order].tobytes()),
+                array("d", np.frombuffer(values, dtype=np.float64)[order].tobytes()),
+            )
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__, reverse=True)
+        return (
+            metrics,
+            array("d", (timestamps[i] for i in order)),
+            array("b", (codes[i] for i in order)),
+            array("d", (values[i] for i in order)),
+        )
+
+    def total_today(self, metric):
+        with self.lock:
+            return self.summaries[metric].window(1).sum
+
+    def summary(self, today=None):
+        # {metric: (today's total, today's target, 7-day stats, 30-day stats)}
+        result = {}
+        with self.lock:
+            for metric, summary in self.summaries.items():
+                result[metric] = (
+                    summary.window(1, today).sum,
+                    self.goals.target(metric, today),
+                    summary.window(7, today),
+                    summary.window(30, today),
+                )
+        return result
+
+    def goal_stats(self, today=None):
+        # {metric: GoalStats}
+        with self.lock:
+            return {metric: self.goals.stats(metric, today) for metric in self.summaries}
+
+    def goal_history(self, metric, today=None):
+        with self.lock:
+            return self.goals.history(metric, today)
+
+    def update_goals(self, **settings):
+        with self.lock:
+            self.goals.update_settings(**settings)
+
+    def format_summary(self, today=None):
+        lines = []
+        goals = self.goal_stats(today)
+        for metric, (total, target, week, month) in self.summary(today).items():
+            label, unit = METRIC_LABELS[metric]
+            comparison = "✓" if total >= target else "✗"
+            stats = goals[metric]
+            lines.append(
+                f"{label} today: {total:g}{unit} (Goal: {target:g}{unit}) [{comparison}]\n"
+                f"    7-day average: {week.mean:.1f}{unit}, 30-day average: {month.mean:.1f}{unit}\n"
+                f"    Goal met on {stats.met} of {stats.days} days, streak: {stats.current_streak} "
+                f"(best {stats.best_streak})"
+            )
+        return "\n".join(lines)
+
+    def flush(self):
+        # Waits for the group commit rather than taking the lock, so writers carry
+        # on while the fsync runs
+        self.store.flush()
+
+    def close(self):
+        with self.lock:
+            self.appointments.close()
+            self.records.close()
+            self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,279 @@
+# Personal daily targets and goal attainment.
+#
+# A user's base targets come from their age, weight and BMI (GoalSettings, stored
+# as goals.json in their profile). The steps target also follows their own history:
+# while the trailing HISTORY_DAYS average is below the base target, each day's
+# target is a step of PROGRESSION above that average, so the goal stays reachable
+# and rises with the user. Targets set by hand are used as they are.
+#
+# Attainment is worked out per day from the RollingSummary day buckets, over every
+# day from the first entry to today, in one vectorized pass when NumPy is available.
+# The per-day results are cached; a new entry only recomputes its own day and, for
+# steps, the HISTORY_DAYS after it whose targets looked back at it.
+import json
+import os
+from datetime import date
+
+from .bmi import BMI_BINS
+from .metrics import date_to_day, day_to_date, optional_numpy
+
+HISTORY_DAYS = 28
+PROGRESSION = 1.1
+STEP_ROUNDING = 500
+MIN_STEPS = 3000
+
+# Metrics whose target depends on the days before it
+HISTORY_METRICS = ("steps",)
+
+# Steps target factor from a BMI of OVERWEIGHT_BMI up, more walking for weight
+# management. The climb to it from the user's own average is the same PROGRESSION.
+OVERWEIGHT_BMI = BMI_BINS[1]
+OVERWEIGHT_STEPS = 1.2
+
+# (up to age, hours): sleep recommendations by age group
+SLEEP_BY_AGE = ((12, 10.0), (17, 9.0), (64, 8.0), (200, 7.5))
+
+
+class GoalSettings:
+    __slots__ = ("path", "age", "weight", "height", "targets")
+
+    def __init__(self, path=None, age=None, weight=None, height=None, targets=None):
+        self.path = path
+        self.age = age
+        self.weight = weight
+        self.height = height
+        self.targets = dict(targets or {})
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(path, data.get("age"), data.get("weight"), data.get("height"), data.get("targets"))
+
+    def save(self):
+        data = {"age": self.age, "weight": self.weight, "height": self.height, "targets": self.targets}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def bmi(self):
+        if self.weight and self.height:
+            return self.weight / (self.height / 100) ** 2
+        return None
+
+
+def personal_targets(settings, defaults):
+    # Base daily targets for a user, before the steps history is taken into account
+    targets = dict(defaults)
+    if settings.age is not None:
+        if settings.age < 18:
+            targets["steps"] = defaults["steps"] * 1.2
+        elif settings.age >= 65:
+            targets["steps"] = defaults["steps"] * 0.75
+        targets["sleep"] = next(hours for limit, hours in SLEEP_BY_AGE if settings.age <= limit)
+    bmi = settings.bmi
+    if bmi is not None and bmi >= OVERWEIGHT_BMI:
+        targets["steps"] = round(targets["steps"] * OVERWEIGHT_STEPS / STEP_ROUNDING) * STEP_ROUNDING
+    if settings.weight:
+        # About 33 ml per kg, within sensible bounds
+        targets["water"] = round(min(max(settings.weight * 0.033, 1.5), 4.0), 1)
+    targets.update(settings.targets)
+    return targets
+
+
+class GoalStats:
+    __slots__ = ("metric", "target", "days", "met", "attainment", "current_streak", "best_streak")
+
+    def __init__(self, metric, target, days, met, current_streak, best_streak):
+        self.metric = metric
+        self.target = target
+        self.days = days
+        self.met = met
+        self.attainment = met / days if days else 0.0
+        self.current_streak = current_streak
+        self.best_streak = best_streak
+
+
+class _Attainment:
+    # Dense per-day columns for one metric, from first_day to last_day inclusive
+    __slots__ = ("first_day", "totals", "targets", "met", "stats")
+
+    def __init__(self, first_day):
+        self.first_day = first_day
+        self.totals = []
+        self.targets = []
+        self.met = []
+        self.stats = None
+
+    @property
+    def last_day(self):
+        return self.first_day + len(self.totals) - 1
+
+
+class GoalEngine:
+    def __init__(self, summaries, settings, defaults):
+        self.summaries = summaries
+        self.settings = settings
+        self.defaults = dict(defaults)
+        self.base = personal_targets(settings, self.defaults)
+        self._cache = {}
+
+    def update_settings(self, **changes):
+        # Changes and saves the settings, every cached day is worked out again
+        for name, value in changes.items():
+            setattr(self.settings, name, value)
+        if self.settings.path is not None:
+            self.settings.save()
+        self.base = personal_targets(self.settings, self.defaults)
+        self._cache.clear()
+
+    def invalidate(self, metric, first, last=None):
+        # Entries were added on days first..last (day numbers)
+        cache = self._cache.get(metric)
+        if cache is None:
+            return
+        last = first if last is None else last
+        if first < cache.first_day or last - first > HISTORY_DAYS:
+            del self._cache[metric]
+            return
+        cache.stats = None
+        if first > cache.last_day:
+            return
+        follows = HISTORY_DAYS if self._uses_history(metric) else 0
+        self._fill(metric, cache, first - cache.first_day, min(last + follows, cache.last_day) - cache.first_day + 1)
+
+    def _uses_history(self, metric):
+        return metric in HISTORY_METRICS and metric not in self.settings.targets
+
+    def _attainment(self, metric, today):
+        # The cache for metric covering every day up to today, built or extended as
+        # needed; None if nothing was logged by today
+        cache = self._cache.get(metric)
+        if cache is None:
+            days = self.summaries[metric].days
+            if not days:
+                return None
+            cache = self._cache[metric] = _Attainment(min(days))
+        if today < cache.first_day:
+            return None
+        if today > cache.last_day:
+            start = len(cache.totals)
+            missing = today - cache.last_day
+            cache.totals.extend([0.0] * missing)
+            cache.targets.extend([0.0] * missing)
+            cache.met.extend([False] * missing)
+            cache.stats = None
+            self._fill(metric, cache, start, len(cache.totals))
+        return cache
+
+    def _fill(self, metric, cache, start, end):
+        # Recomputes totals, targets and met for cache positions [start, end)
+        buckets = self.summaries[metric].days
+        first_day = cache.first_day
+        totals = cache.totals
+        for position in range(start, end):
+            bucket = buckets.get(first_day + position)
+            totals[position] = bucket.sum if bucket is not None else 0.0
+        base = self.base[metric]
+        if not self._uses_history(metric):
+            targets = [base] * (end - start)
+        else:
+            low = max(start - HISTORY_DAYS, 0)
+            logged = [first_day + position in buckets for position in range(low, end)]
+            np = optional_numpy()
+            if np is not None and end - start > HISTORY_DAYS:
+                targets = _history_targets_numpy(np, totals[low:end], logged, start - low, base)
+            else:
+                targets = _history_targets(totals[low:end], logged, start - low, base)
+        cache.targets[start:end] = targets
+        cache.met[start:end] = [total >= target for total, target in zip(totals[start:end], targets)]
+
+    def target(self, metric, today=None):
+        today = date_to_day(today or date.today())
+        cache = self._attainment(metric, today)
+        if cache is None:
+            return self.base[metric]
+        return cache.targets[today - cache.first_day]
+
+    def stats(self, metric, today=None):
+        today = date_to_day(today or date.today())
+        cache = self._attainment(metric, today)
+        if cache is None:
+            return GoalStats(metric, self.base[metric], 0, 0, 0, 0)
+        if cache.stats is None or cache.stats.days != today - cache.first_day + 1:
+            cache.stats = _stats(metric, cache, today - cache.first_day + 1)
+        return cache.stats
+
+    def history(self, metric, today=None):
+        # [(date, total, target, met)] for every day from the first entry to today
+        today = date_to_day(today or date.today())
+        cache = self._attainment(metric, today)
+        if cache is None:
+            return []
+        return [
+            (day_to_date(cache.first_day + position), cache.totals[position], cache.targets[position], cache.met[position])
+            for position in range(today - cache.first_day + 1)
+        ]
+
+
+def _progressive_target(average, base):
+    if average >= base:
+        return base
+    target = round(average * PROGRESSION / STEP_ROUNDING) * STEP_ROUNDING
+    return float(min(max(target, MIN_STEPS), base))
+
+
+def _history_targets(totals, logged, offset, base):
+    # Targets for positions offset.. of totals, each from the logged days among the
+    # HISTORY_DAYS before it
+    targets = []
+    window_sum = 0.0
+    window_count = 0
+    for position, (total, is_logged) in enumerate(zip(totals, logged)):
+        if position >= offset:
+            targets.append(_progressive_target(window_sum / window_count, base) if window_count else base)
+        window_sum += total
+        window_count += is_logged
+        if position >= HISTORY_DAYS:
+            window_sum -= totals[position - HISTORY_DAYS]
+            window_count -= logged[position - HISTORY_DAYS]
+    return targets
+
+
+def _history_targets_numpy(np, totals, logged, offset, base):
+    # _history_targets with the trailing windows taken from cumulative sums
+    sums = np.concatenate(([0.0], np.cumsum(totals)))
+    counts = np.concatenate(([0], np.cumsum(logged, dtype=np.int64)))
+    positions = np.arange(offset, len(totals))
+    lows = np.maximum(positions - HISTORY_DAYS, 0)
+    window_sum = sums[positions] - sums[lows]
+    window_count = counts[positions] - counts[lows]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = window_sum / window_count
+    progressive = np.minimum(np.maximum(np.round(average * PROGRESSION / STEP_ROUNDING) * STEP_ROUNDING, MIN_STEPS), base)
+    targets = np.where(window_count == 0, base, np.where(average >= base, base, progressive))
+    return targets.astype(np.float64).tolist()
+
+
+def _stats(metric, cache, days):
+    # A day that is not over yet does not break the current streak
+    met = cache.met[:days]
+    best = run = 0
+    for day_met in met:
+        run = run + 1 if day_met else 0
+        best = max(best, run)
+    current = run if met[-1] or days < 2 else _trailing_run(met[:-1])
+    return GoalStats(metric, cache.targets[days - 1], days, sum(met), current, best)
+
+
+def _trailing_run(met):
+    run = 0
+    for day_met in reversed(met):
+        if not day_met:
+            break
+        run += 1
+    return run
@@ -0,0 +1,188 @@
+# Opt-in timing of the app's callbacks and background tasks.
+#
+# Every timed name gets a latency histogram with fixed log-spaced buckets, so
+# recording is a perf_counter() pair, a bisect and a few additions, and memory
+# does not grow with the number of calls. When instruments are disabled, wrap()
+# returns the function itself and timer() a shared no-op, so the app pays nothing.
+# Enable with HEALTHTRACK_DIAGNOSTICS=1 (or the GUI's --diagnostics flag).
+#
+# The whole state can be dumped as JSON, and a cProfile capture can be started
+# and stopped at any time for a function-level breakdown of the same period.
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Bucket upper bounds in seconds: 100us doubling up to ~13s, then everything above
+BUCKET_BOUNDS = tuple(0.0001 * 2**i for i in range(18))
+
+
+def callable_name(fn):
+    # A readable, stable name for a callback: Class.method, function, or
+    # outer.<lambda>:line for lambdas and nested functions
+    owner = getattr(fn, "__self__", None)
+    if owner is not None and not isinstance(owner, type(os)):
+        return f"{type(owner).__name__}.{fn.__name__}"
+    qualname = getattr(fn, "__qualname__", None) or getattr(fn, "__name__", None) or type(fn).__name__
+    if "<locals>" in qualname or "<lambda>" in qualname:
+        qualname = qualname.replace(".<locals>", "")
+        code = getattr(fn, "__code__", None)
+        if code is not None:
+            qualname += f":{code.co_firstlineno}"
+    return qualname
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding that fraction of calls, capped at the
+        # slowest call seen
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+            "buckets": {f"{bound:g}": count for bound, count in zip(BUCKET_BOUNDS + (float("inf"),), self.counts) if count},
+        }
+
+
+class _Timer:
+    __slots__ = ("instruments", "name", "start")
+
+    def __init__(self, instruments, name):
+        self.instruments = instruments
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.instruments.record(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Instruments:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.started = time.time()
+        self.profiler = None
+        # Tasks record from worker threads
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls):
+        return cls(os.environ.get("HEALTHTRACK_DIAGNOSTICS", "") not in ("", "0"))
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def timer(self, name):
+        # with instruments.timer("name"): ...
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    def wrap(self, name, fn):
+        if not self.enabled:
+            return fn
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+
+        return timed
+
+    def stats(self):
+        # [(name, Histogram)], slowest in total first
+        with self._lock:
+            return sorted(self.histograms.items(), key=lambda item: item[1].total, reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        return {
+            "started": self.started,
+            "elapsed": time.time() - self.started,
+            "profiling": self.profiler is not None,
+            "timings": {name: histogram.to_dict() for name, histogram in self.stats()},
+        }
+
+    def dump(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_profile(self):
+        # cProfile only sees the thread it was enabled on, the Tk thread here
+        import cProfile
+
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop_profile(self, path):
+        # Writes the capture in pstats format (python -m pstats path, snakeviz, ...)
+        if self.profiler is None:
+            return False
+        self.profiler.disable()
+        self.profiler.dump_stats(path)
+        self.profiler = None
+        return True
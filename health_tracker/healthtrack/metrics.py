@@ -0,0 +1,182 @@
+import time
+from array import array
+from datetime import date, timedelta
+
+PERIODS = ("day", "week", "month")
+AGGREGATES = ("sum", "count", "mean", "min", "max")
+
+_EPOCH = date(1970, 1, 1)
+_SECONDS_PER_DAY = 86400
+
+_numpy = None
+
+
+def optional_numpy():
+    # numpy is optional and slow to import, so it is only loaded the first time a
+    # vectorized path is taken; without it the pure Python paths give the same results
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+
+def local_utc_offset():
+    return time.localtime().tm_gmtoff
+
+
+def day_number(timestamp, utc_offset=None):
+    # Days since the epoch in local time, the unit every aggregation is bucketed by
+    if utc_offset is None:
+        utc_offset = local_utc_offset()
+    return int((timestamp + utc_offset) // _SECONDS_PER_DAY)
+
+
+def day_to_date(day):
+    return _EPOCH + timedelta(days=day)
+
+
+def date_to_day(value):
+    return (value - _EPOCH).days
+
+
+def _period_start(day, period):
+    # First day (as a day number) of the day/week/month containing `day`
+    if period == "day":
+        return day
+    if period == "week":
+        # 1970-01-01 was a Thursday, weeks start on Monday
+        return day - (day + 3) % 7
+    value = day_to_date(day)
+    return date_to_day(value.replace(day=1))
+
+
+class Sample:
+    __slots__ = ("timestamp", "value")
+
+    def __init__(self, timestamp, value):
+        self.timestamp = timestamp
+        self.value = value
+
+    def __repr__(self):
+        return f"Sample(timestamp={self.timestamp!r}, value={self.value!r})"
+
+
+def copy_column(column):
+    # array("d") copy of a column of doubles (an array or a memoryview), with one memcpy
+    copy = array("d")
+    copy.frombytes(memoryview(column).cast("B"))
+    return copy
+
+
+class MetricSeries:
+    # Two parallel typed columns, so a year of per-minute readings is a pair of
+    # flat double buffers rather than half a million Python objects. The columns
+    # may be read-only memoryviews of a mapped segment, the first write copies them.
+    __slots__ = ("name", "timestamps", "values")
+
+    def __init__(self, name, timestamps=None, values=None):
+        self.name = name
+        self.timestamps = timestamps if timestamps is not None else array("d")
+        self.values = values if values is not None else array("d")
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return Sample(self.timestamps[index], self.values[index])
+
+    def __iter__(self):
+        for timestamp, value in zip(self.timestamps, self.values):
+            yield Sample(timestamp, value)
+
+    def _writable(self):
+        if not isinstance(self.values, array):
+            self.timestamps = copy_column(self.timestamps)
+            self.values = copy_column(self.values)
+
+    def append(self, value, timestamp):
+        if type(self.values) is not array:
+            self._writable()
+        self.timestamps.append(timestamp)
+        self.values.append(value)
+
+    def extend(self, timestamps, values):
+        self._writable()
+        self.timestamps.extend(timestamps)
+        self.values.extend(values)
+
+    def total(self):
+        np = optional_numpy()
+        if np is not None and self.values:
+            return float(np.frombuffer(self.values, dtype=np.float64).sum())
+        return sum(self.values)
+
+    def aggregate(self, period="day", how="sum", utc_offset=None):
+        # Returns [(period start date, aggregate)] in date order
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        if how not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {how}")
+        if utc_offset is None:
+            utc_offset = local_utc_offset()
+        if not self.values:
+            return []
+        if optional_numpy() is not None:
+            return self._aggregate_numpy(period, how, utc_offset)
+        return self._aggregate_python(period, how, utc_offset)
+
+    def _aggregate_numpy(self, period, how, utc_offset):
+        np = optional_numpy()
+        timestamps = np.frombuffer(self.timestamps, dtype=np.float64)
+        values = np.frombuffer(self.values, dtype=np.float64)
+        days = np.floor_divide(timestamps + utc_offset, _SECONDS_PER_DAY).astype(np.int64)
+        if period == "week":
+            keys = days - (days + 3) % 7
+        elif period == "month":
+            months = days.astype("datetime64[D]").astype("datetime64[M]")
+            keys = months.astype("datetime64[D]").astype(np.int64)
+        else:
+            keys = days
+
+        starts, inverse = np.unique(keys, return_inverse=True)
+        if how in ("sum", "count", "mean"):
+            counts = np.bincount(inverse)
+            sums = np.bincount(inverse, weights=values)
+            result = {"sum": sums, "count": counts, "mean": sums / counts}[how]
+        else:
+            order = np.argsort(inverse, kind="stable")
+            boundaries = np.flatnonzero(np.diff(inverse[order], prepend=-1))
+            reduce = np.minimum if how == "min" else np.maximum
+            result = reduce.reduceat(values[order], boundaries)
+        return [(day_to_date(int(start)), value.item()) for start, value in zip(starts, result)]
+
+    def _aggregate_python(self, period, how, utc_offset):
+        buckets = {}
+        last_day = None
+        key = None
+        for timestamp, value in zip(self.timestamps, self.values):
+            day = int((timestamp + utc_offset) // _SECONDS_PER_DAY)
+            if day != last_day:
+                last_day = day
+                key = _period_start(day, period)
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [value, 1, value, value]
+            else:
+                bucket[0] += value
+                bucket[1] += 1
+                if value < bucket[2]:
+                    bucket[2] = value
+                if value > bucket[3]:
+                    bucket[3] = value
+
+        result = []
+        for key in sorted(buckets):
+            total, count, low, high = buckets[key]
+            value = {"sum": total, "count": count, "mean": total / count, "min": low, "max": high}[how]
+            result.append((day_to_date(key), value))
+        return result
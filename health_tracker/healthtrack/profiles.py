@@ -0,0 +1,141 @@
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .core import HealthTracker
+from .storage import MetricStore, default_data_dir
+
+DEFAULT_PROFILE = "default"
+
+_VALID_NAME = re.compile(r"^[\w][\w .-]{0,63}$")
+
+# Files written directly under the data directory before there were profiles
+_LEGACY_SUFFIXES = (".seg", ".log")
+_LEGACY_NAMES = ("appointments.jsonl", "records")
+
+
+class ProfileManager:
+    # One shard per user: profiles/<name>/ holds that user's metric logs,
+    # appointments and medical records. Trackers are opened on first use and kept
+    # in an LRU of at most max_open, so memory and file handles are bounded by
+    # max_open rather than by the number of users.
+    #
+    # Work that keeps using a tracker after get() returns (background tasks,
+    # service requests) holds a lease on it, from acquire() or lease(). A leased
+    # tracker that falls out of the LRU is only closed once its last lease is
+    # released, and is reused if its profile is asked for again before then.
+    def __init__(self, directory=None, max_open=4):
+        if max_open < 1:
+            raise ValueError("max_open must be at least 1")
+        self.directory = directory or default_data_dir()
+        self.profiles_directory = os.path.join(self.directory, "profiles")
+        self.max_open = max_open
+        self._open = OrderedDict()
+        self._leases = {}
+        # Evicted from the LRU while leased, {name: tracker}
+        self._retired = {}
+        # Syncs run on worker threads while the GUI switches profiles
+        self._lock = threading.RLock()
+
+    def adopt_legacy_data(self):
+        # Moves data from before profiles existed into the default profile. Left to
+        # the entry points that write (the app, the service, imports), so opening
+        # a manager to read, as the reports do, never changes anything on disk.
+        if not os.path.isdir(self.directory):
+            return
+        entries = [
+            entry
+            for entry in os.listdir(self.directory)
+            if entry in _LEGACY_NAMES or entry.endswith(_LEGACY_SUFFIXES)
+        ]
+        target = self.path(DEFAULT_PROFILE)
+        if not entries or os.path.exists(target):
+            return
+        os.makedirs(target)
+        for entry in entries:
+            shutil.move(os.path.join(self.directory, entry), os.path.join(target, entry))
+
+    def path(self, name):
+        if not _VALID_NAME.match(name):
+            raise ValueError(f"Invalid profile name: {name!r}")
+        return os.path.join(self.profiles_directory, name)
+
+    def names(self):
+        if not os.path.isdir(self.profiles_directory):
+            return []
+        return sorted(
+            entry for entry in os.listdir(self.profiles_directory) if os.path.isdir(os.path.join(self.profiles_directory, entry))
+        )
+
+    def get(self, name):
+        # The tracker for a profile, creating the profile if it does not exist yet
+        with self._lock:
+            tracker = self._open.get(name)
+            if tracker is not None:
+                self._open.move_to_end(name)
+                return tracker
+            tracker = self._retired.pop(name, None)
+            if tracker is None:
+                tracker = HealthTracker(MetricStore(self.path(name)))
+            self._open[name] = tracker
+            while len(self._open) > self.max_open:
+                evicted_name, evicted = self._open.popitem(last=False)
+                if self._leases.get(evicted_name):
+                    self._retired[evicted_name] = evicted
+                else:
+                    evicted.close()
+            return tracker
+
+    def acquire(self, name):
+        # get() plus a lease, the tracker stays open until release(name)
+        with self._lock:
+            tracker = self.get(name)
+            self._leases[name] = self._leases.get(name, 0) + 1
+            return tracker
+
+    def release(self, name):
+        with self._lock:
+            self._leases[name] -= 1
+            if self._leases[name]:
+                return
+            del self._leases[name]
+            # Closed under the lock, so get(name) cannot open the profile again
+            # while this tracker still holds it
+            tracker = self._retired.pop(name, None)
+            if tracker is not None:
+                tracker.close()
+
+    @contextmanager
+    def lease(self, name):
+        tracker = self.acquire(name)
+        try:
+            yield tracker
+        finally:
+            self.release(name)
+
+    def open_profiles(self):
+        with self._lock:
+            return list(self._open)
+
+    def flush(self):
+        with self._lock:
+            for tracker in list(self._open.values()) + list(self._retired.values()):
+                tracker.flush()
+
+    def close(self):
+        with self._lock:
+            while self._open:
+                _, tracker = self._open.popitem()
+                tracker.close()
+            while self._retired:
+                _, tracker = self._retired.popitem()
+                tracker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
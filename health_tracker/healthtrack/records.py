@@ -0,0 +1,249 @@
+import hashlib
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date
+
+from .metrics import optional_numpy
+
+BLOCK_SIZE = 1 << 20
+
+# Content-defined chunking: a chunk ends after any byte where the gear hash of the
+# last 64 bytes has its top 16 bits clear (one position in 64 KiB on average), so an
+# edit only changes the chunks around it and the rest of the file still dedups.
+MIN_CHUNK = 16 << 10
+MAX_CHUNK = 256 << 10
+_WINDOW = 64
+_MASK = 0xFFFF << 48
+_WORD = (1 << 64) - 1
+
+
+def _gear_table(seed):
+    rng = random.Random(seed)
+    return tuple(rng.getrandbits(64) for _ in range(256))
+
+
+# Fixed seed: changing the table would change every chunk boundary
+_GEAR = _gear_table(0x48545243)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    record_date TEXT NOT NULL,
+    doctor TEXT,
+    record_type TEXT,
+    ingested REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_by_date ON records (record_date);
+CREATE INDEX IF NOT EXISTS records_by_doctor ON records (doctor, record_date);
+CREATE INDEX IF NOT EXISTS records_by_type ON records (record_type, record_date);
+CREATE TABLE IF NOT EXISTS record_chunks (
+    record_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    chunk TEXT NOT NULL,
+    PRIMARY KEY (record_id, seq)
+) WITHOUT ROWID;
+"""
+
+_COLUMNS = "id, sha256, name, size, record_date, doctor, record_type, ingested"
+
+
+def _boundaries_python(history, block):
+    # Offsets in block after which the hash matches, history is the (at most 63)
+    # bytes that came before block in the file
+    gear = _GEAR
+    h = 0
+    for byte in history:
+        h = ((h << 1) + gear[byte]) & _WORD
+    found = []
+    for offset, byte in enumerate(block):
+        h = ((h << 1) + gear[byte]) & _WORD
+        if not h & _MASK:
+            found.append(offset)
+    return found
+
+
+def _boundaries_numpy(np, history, block):
+    # The same hash as _boundaries_python, built by doubling the window six times:
+    # the sum over 2w bytes is the sum over the last w plus the previous w shifted by w
+    data = np.frombuffer(bytes(history) + bytes(block), dtype=np.uint8)
+    h = np.array(_GEAR, dtype=np.uint64)[data]
+    shift = 1
+    while shift < _WINDOW:
+        h[shift:] = h[shift:] + (h[:-shift] << np.uint64(shift))
+        shift *= 2
+    hits = np.flatnonzero((h & np.uint64(_MASK)) == 0) - len(history)
+    return hits[hits >= 0].tolist()
+
+
+def iter_chunks(source, block_size=BLOCK_SIZE):
+    np = optional_numpy()
+    pending = bytearray()
+    history = b""
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        if np is not None:
+            boundaries = _boundaries_numpy(np, history, block)
+        else:
+            boundaries = _boundaries_python(history, block)
+        history = (history + block)[-(_WINDOW - 1):]
+
+        position = 0
+        for end in [offset + 1 for offset in boundaries] + [None]:
+            limit = len(block) if end is None else end
+            while len(pending) + limit - position > MAX_CHUNK:
+                cut = position + MAX_CHUNK - len(pending)
+                yield bytes(pending) + block[position:cut]
+                pending = bytearray()
+                position = cut
+            if end is not None and len(pending) + end - position >= MIN_CHUNK:
+                yield bytes(pending) + block[position:end]
+                pending = bytearray()
+                position = end
+        pending += block[position:]
+    if pending:
+        yield bytes(pending)
+
+
+class Record:
+    __slots__ = ("id", "sha256", "name", "size", "record_date", "doctor", "record_type", "ingested", "duplicate")
+
+    def __init__(self, id, sha256, name, size, record_date, doctor, record_type, ingested, duplicate=False):
+        self.id = id
+        self.sha256 = sha256
+        self.name = name
+        self.size = size
+        self.record_date = record_date
+        self.doctor = doctor
+        self.record_type = record_type
+        self.ingested = ingested
+        self.duplicate = duplicate
+
+    def __repr__(self):
+        return f"Record(id={self.id!r}, name={self.name!r}, record_date={self.record_date!r}, doctor={self.doctor!r})"
+
+
+class RecordStore:
+    # Medical record files split into content-defined chunks stored by SHA-256, with
+    # a SQLite index of record metadata. Files are streamed block by block, so a
+    # multi-gigabyte export never has to fit in memory; a chunk that is already
+    # stored is never written again, and re-uploading a whole file adds nothing.
+    def __init__(self, directory, block_size=BLOCK_SIZE):
+        self.directory = directory
+        self.block_size = block_size
+        self.chunk_directory = os.path.join(directory, "chunks")
+        os.makedirs(self.chunk_directory, exist_ok=True)
+        # Uploads run on worker threads, every use of the connection holds the lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+
+    def chunk_path(self, sha256):
+        return os.path.join(self.chunk_directory, sha256[:2], sha256[2:])
+
+    def _store_chunk(self, chunk):
+        sha256 = hashlib.sha256(chunk).hexdigest()
+        path = self.chunk_path(sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+            with os.fdopen(fd, "wb") as f:
+                f.write(chunk)
+            os.replace(tmp_path, path)
+        return sha256
+
+    def ingest(self, path, doctor=None, record_date=None, record_type=None, progress=None):
+        # progress(bytes_done, bytes_total) is called after every chunk
+        total = os.path.getsize(path)
+        digest = hashlib.sha256()
+        chunks = []
+        done = 0
+        with open(path, "rb") as source:
+            for chunk in iter_chunks(source, self.block_size):
+                digest.update(chunk)
+                chunks.append(self._store_chunk(chunk))
+                done += len(chunk)
+                if progress is not None:
+                    progress(done, total)
+        sha256 = digest.hexdigest()
+
+        if record_date is None:
+            record_date = date.today().isoformat()
+        if record_type is None:
+            record_type = os.path.splitext(path)[1].lstrip(".").lower() or None
+        name = os.path.basename(path)
+        ingested = time.time()
+        # One transaction, so of two uploads of the same file racing here the second
+        # inserts nothing and gets the first one's record back
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO records (sha256, name, size, record_date, doctor, record_type, ingested) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha256, name, done, record_date, doctor, record_type, ingested),
+            )
+            if not cursor.rowcount:
+                row = self._db.execute(f"SELECT {_COLUMNS} FROM records WHERE sha256 = ?", (sha256,)).fetchone()
+                return Record(*row, duplicate=True)
+            record_id = cursor.lastrowid
+            self._db.executemany(
+                "INSERT INTO record_chunks (record_id, seq, chunk) VALUES (?, ?, ?)",
+                ((record_id, seq, chunk) for seq, chunk in enumerate(chunks)),
+            )
+        return Record(record_id, sha256, name, done, record_date, doctor, record_type, ingested)
+
+    def get(self, sha256):
+        with self._lock:
+            row = self._db.execute(f"SELECT {_COLUMNS} FROM records WHERE sha256 = ?", (sha256,)).fetchone()
+        return Record(*row) if row else None
+
+    def find(self, doctor=None, record_type=None, start=None, end=None, limit=None):
+        # Records matching every given filter, newest first. Dates are ISO strings or dates.
+        clauses = []
+        params = []
+        for clause, value in (
+            ("doctor = ?", doctor),
+            ("record_type = ?", record_type),
+            ("record_date >= ?", start),
+            ("record_date <= ?", end),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value.isoformat() if isinstance(value, date) else value)
+        query = f"SELECT {_COLUMNS} FROM records"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY record_date DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [Record(*row) for row in self._db.execute(query, params)]
+
+    def read(self, record):
+        # Yields the record's contents chunk by chunk
+        with self._lock:
+            chunks = [
+                row[0]
+                for row in self._db.execute("SELECT chunk FROM record_chunks WHERE record_id = ? ORDER BY seq", (record.id,))
+            ]
+        for sha256 in chunks:
+            with open(self.chunk_path(sha256), "rb") as f:
+                yield f.read()
+
+    def export(self, record, path):
+        with open(path, "wb") as f:
+            for chunk in self.read(record):
+                f.write(chunk)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,288 @@
+# Clinic reports: daily totals, goal attainment and BMI trends for every profile
+# (or the ones named) over a date range, as CSV or HTML.
+#
+#     python -m healthtrack report -o clinic.csv --start 2026-01-01 --end 2026-06-30
+#     python -m healthtrack report -o clinic.html --period month --workers 8
+#     python -m healthtrack report -o team.csv --profile alice --profile bob
+#
+# A row covers one profile over one period of the range (the whole range unless
+# --period splits it into weeks or months). Profiles are read straight from their
+# files without opening them for writing (storage.read_log), so a report can
+# run while the app or the service is using them, and are handed to a process
+# pool in chunks with only a bounded number of chunks in flight. Rows are written
+# as they come back, in profile order, so memory stays flat however many profiles
+# there are.
+import argparse
+import csv
+import html
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from .batch import chunked, ordered_map
+from .bmi import interpret_bmi
+from .core import METRIC_LABELS, RECOMMENDED
+from .goals import GoalEngine, GoalSettings
+from .metrics import date_to_day, day_number, day_to_date, local_utc_offset
+from .profiles import ProfileManager
+from .storage import METRICS, default_data_dir, read_log, read_series
+from .summary import RollingSummary
+
+FORMATS = ("csv", "html")
+REPORT_PERIODS = ("all", "week", "month")
+DEFAULT_DAYS = 30
+
+METRIC_FIELDS = ("total", "daily_mean", "logged_days", "goal_met", "attainment", "best_streak")
+BMI_FIELDS = ("bmi_readings", "bmi_first", "bmi_last", "bmi_change", "bmi_category")
+COLUMNS = (
+    ("profile", "start", "end", "days")
+    + tuple(f"{metric}_{field}" for metric in METRICS for field in METRIC_FIELDS)
+    + BMI_FIELDS
+)
+
+
+def split_range(start, end, period="all"):
+    # [(first, last)] dates covering start..end, whole or by calendar week/month
+    if end < start:
+        raise ValueError("The report ends before it starts.")
+    if period not in REPORT_PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    if period == "all":
+        return [(start, end)]
+    ranges = []
+    first = start
+    while first <= end:
+        if period == "week":
+            last = first + timedelta(days=6 - first.weekday())
+        else:
+            following = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+            last = following - timedelta(days=1)
+        ranges.append((first, min(last, end)))
+        first = last + timedelta(days=1)
+    return ranges
+
+
+def _best_streak(met):
+    best = run = 0
+    for day_met in met:
+        run = run + 1 if day_met else 0
+        best = max(best, run)
+    return best
+
+
+def profile_rows(directory, name, ranges, today):
+    # One row (ordered as COLUMNS) per range for the profile stored in directory
+    summaries = {}
+    for metric in METRICS:
+        segment, tail = read_log(directory, metric)
+        summaries[metric] = RollingSummary.from_segment(segment, tail)
+        if segment is not None:
+            segment.close()
+    goals = GoalEngine(summaries, GoalSettings.load(os.path.join(directory, "goals.json")), RECOMMENDED)
+    # Goals are only judged up to today, later days have not happened yet
+    judged_until = date_to_day(min(ranges[-1][1], today))
+    histories = {metric: goals.history(metric, day_to_date(judged_until)) for metric in METRICS}
+
+    bmi = read_series(directory, "bmi")
+    utc_offset = local_utc_offset()
+    bmi_readings = sorted((day_number(timestamp, utc_offset), timestamp, value) for timestamp, value in zip(bmi.timestamps, bmi.values))
+
+    rows = []
+    for first, last in ranges:
+        low, high = date_to_day(first), date_to_day(last)
+        row = [name, first.isoformat(), last.isoformat(), high - low + 1]
+        for metric in METRICS:
+            totals = [bucket.sum for day, bucket in summaries[metric].days.items() if low <= day <= high]
+            total = sum(totals)
+            history = histories[metric]
+            met = []
+            if history:
+                start = date_to_day(history[0][0])
+                met = [day_met for _, _, _, day_met in history[max(low - start, 0) : max(min(high, judged_until) - start + 1, 0)]]
+            row += [
+                total,
+                total / len(totals) if totals else None,
+                len(totals),
+                sum(met),
+                sum(met) / len(met) if met else None,
+                _best_streak(met),
+            ]
+        values = [value for day, _, value in bmi_readings if low <= day <= high]
+        if values:
+            row += [len(values), values[0], values[-1], values[-1] - values[0], interpret_bmi(values[-1])]
+        else:
+            row += [0, None, None, None, None]
+        rows.append(row)
+    return rows
+
+
+def report_chunk(job):
+    # Worker entry point: the rows for a chunk of profiles
+    profiles_directory, names, ranges, today = job
+    rows = []
+    for name in names:
+        rows.extend(profile_rows(os.path.join(profiles_directory, name), name, ranges, today))
+    return rows
+
+
+def report(profiles_directory, names, ranges, workers=None, chunksize=16, today=None):
+    # Yields the rows for names in order, the profiles are read by `workers` processes
+    today = today or date.today()
+    workers = workers or os.cpu_count() or 1
+    jobs = ((profiles_directory, chunk, ranges, today) for chunk in chunked(names, chunksize))
+    if workers == 1:
+        for job in jobs:
+            yield from report_chunk(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in ordered_map(executor, report_chunk, jobs, workers * 2):
+            yield from rows
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{round(value, 3):.12g}"
+    return str(value)
+
+
+def write_csv(rows, f):
+    # Returns the number of rows written
+    writer = csv.writer(f)
+    writer.writerow(COLUMNS)
+    count = 0
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_cell(value) for value in row])
+    return count
+
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: Helvetica, Arial, sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; font-size: 13px; }}
+th, td {{ border: 1px solid #ccc; padding: 3px 6px; text-align: right; }}
+th {{ background: #f0f0f0; position: sticky; top: 0; }}
+td:first-child, th:first-child {{ text-align: left; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>{subtitle}</p>
+<table>
+<thead><tr>{header}</tr></thead>
+<tbody>
+"""
+
+
+def _html_header():
+    # (label, unit) per COLUMNS entry
+    labels = [("Profile", ""), ("From", ""), ("To", ""), ("Days", "")]
+    for metric in METRICS:
+        label, unit = METRIC_LABELS[metric]
+        labels += [
+            (f"{label} total", unit),
+            (f"{label} daily mean", unit),
+            (f"{label} days logged", ""),
+            (f"{label} goal met", ""),
+            (f"{label} attainment", ""),
+            (f"{label} best streak", ""),
+        ]
+    return labels + [("BMI readings", ""), ("BMI first", ""), ("BMI last", ""), ("BMI change", ""), ("BMI category", "")]
+
+
+def _html_cell(column, value):
+    if value is None:
+        return ""
+    if column.endswith("_attainment"):
+        return f"{value:.0%}"
+    if column.startswith("bmi_") and isinstance(value, float):
+        return f"{value:+.1f}" if column == "bmi_change" else f"{value:.1f}"
+    if isinstance(value, float):
+        return f"{value:,.1f}" if value < 100 else f"{value:,.0f}"
+    return html.escape(str(value))
+
+
+def write_html(rows, f, title="Health report", subtitle=""):
+    # One table, written row by row, with the average attainment per metric at the end
+    header = "".join(f"<th>{html.escape(label + unit)}</th>" for label, unit in _html_header())
+    f.write(_HTML_HEAD.format(title=html.escape(title), subtitle=html.escape(subtitle), header=header))
+    attainment = {metric: [0.0, 0] for metric in METRICS}
+    positions = {metric: COLUMNS.index(f"{metric}_attainment") for metric in METRICS}
+    count = 0
+    for count, row in enumerate(rows, 1):
+        f.write("<tr>" + "".join(f"<td>{_html_cell(column, value)}</td>" for column, value in zip(COLUMNS, row)) + "</tr>\n")
+        for metric, position in positions.items():
+            if row[position] is not None:
+                attainment[metric][0] += row[position]
+                attainment[metric][1] += 1
+    f.write("</tbody>\n</table>\n")
+    averages = ", ".join(
+        f"{METRIC_LABELS[metric][0]} {total / rows_with_goals:.0%}"
+        for metric, (total, rows_with_goals) in attainment.items()
+        if rows_with_goals
+    )
+    f.write(f"<p>{count} rows. Average goal attainment: {html.escape(averages or 'no data')}.</p>\n</body>\n</html>\n")
+    return count
+
+
+def _date(text):
+    return date.fromisoformat(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m healthtrack report", description="Totals, goal attainment and BMI trends for many profiles."
+    )
+    parser.add_argument("-o", "--output", default="-", help="CSV or HTML file (default: CSV on stdout)")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the output file's extension")
+    parser.add_argument("--start", type=_date, help=f"first day, YYYY-MM-DD (default: {DEFAULT_DAYS} days before --end)")
+    parser.add_argument("--end", type=_date, help="last day, YYYY-MM-DD (default: today)")
+    parser.add_argument("--period", choices=REPORT_PERIODS, default="all", help="a row per profile and week or month")
+    parser.add_argument("--profile", dest="profiles", action="append", help="only this profile, repeatable")
+    parser.add_argument("--data-dir", default=default_data_dir())
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=16, help="profiles per task")
+    args = parser.parse_args(argv)
+
+    end = args.end or date.today()
+    start = args.start or end - timedelta(days=DEFAULT_DAYS - 1)
+    try:
+        ranges = split_range(start, end, args.period)
+    except ValueError as e:
+        parser.error(str(e))
+    manager = ProfileManager(args.data_dir)
+    names = manager.names()
+    if args.profiles:
+        missing = sorted(set(args.profiles) - set(names))
+        if missing:
+            parser.error(f"No such profile: {', '.join(missing)}")
+        names = args.profiles
+    output_format = args.format or ("html" if args.output.lower().endswith((".html", ".htm")) else "csv")
+
+    target = sys.stdout if args.output == "-" else open(args.output, "w", newline="" if output_format == "csv" else None, encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        rows = report(manager.profiles_directory, names, ranges, args.workers, args.chunksize)
+        if output_format == "html":
+            count = write_html(rows, target, "Health report", f"{len(names)} profiles, {start.isoformat()} to {end.isoformat()}")
+        else:
+            count = write_csv(rows, target)
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+    elapsed = time.perf_counter() - started
+    rate = len(names) / elapsed if elapsed else 0.0
+    cores = min(args.workers, os.cpu_count() or 1)
+    print(
+        f"{len(names)} profiles ({count} rows) in {elapsed:.2f}s: {rate:,.0f} profiles/s with {args.workers} workers "
+        f"({rate / cores:,.0f} profiles/s per core)",
+        file=sys.stderr,
+    )
@@ -0,0 +1,139 @@
+# Memory-mapped columnar segments, the compacted part of each metric log.
+#
+# Layout (HTSEG002): a 64-byte header, the timestamp column, the value column, then
+# a day index with one entry per local day that has readings. Columns are native
+# doubles sorted by timestamp, so once the file is mapped they are read in place
+# as memoryviews (or NumPy arrays over the same pages) without loading or parsing
+# anything; the pages are shared by every process that maps the file, through
+# the OS page cache. The day index holds each day's first row, count, sum, min and
+# max, which is what the rolling summaries and goals need, so reopening years of
+# readings reads a few KiB instead of scanning them all.
+#
+# The day index is built for the UTC offset in effect when the segment was
+# written. Readers in another offset (after a DST change) fall back to the columns.
+#
+# A segment is never changed once written: compaction writes the next generation
+# to a new file, so a mapped segment is never replaced under its readers.
+import mmap
+import os
+import struct
+from bisect import bisect_left
+
+from .metrics import optional_numpy
+
+SEGMENT_MAGIC = b"HTSEG002"
+
+# magic, row count, log generation, UTC offset of the day index, day count
+_HEADER = struct.Struct("<8sQQqQ")
+HEADER_SIZE = 64
+# day number, first row, row count, sum, min, max
+_DAY = struct.Struct("<qQQddd")
+_SECONDS_PER_DAY = 86400
+
+
+def _day_index(timestamps, values, utc_offset):
+    # [(day, first row, count, sum, min, max)] for sorted columns, one bisect per
+    # day and C-speed sum/min/max over each day's slice
+    days = []
+    count = len(timestamps)
+    first = 0
+    while first < count:
+        day = int((timestamps[first] + utc_offset) // _SECONDS_PER_DAY)
+        end = bisect_left(timestamps, (day + 1) * _SECONDS_PER_DAY - utc_offset, first)
+        end = max(end, first + 1)
+        chunk = values[first:end]
+        days.append((day, first, end - first, sum(chunk), min(chunk), max(chunk)))
+        first = end
+    return days
+
+
+def fsync_directory(path):
+    # Makes the files created, renamed or removed in a directory so far durable.
+    # Windows cannot open a directory, and NTFS journals the entries itself.
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_segment(path, timestamps, values, generation, utc_offset):
+    # Writes a segment for sorted columns (arrays or memoryviews of doubles)
+    # through a temporary file, so path only ever holds a complete, synced segment.
+    # The directory is synced too: the caller removes the rows' old home next, and
+    # a crash must not keep that removal but lose the rename.
+    days = _day_index(timestamps, values, utc_offset)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(SEGMENT_MAGIC, len(values), generation, utc_offset, len(days)).ljust(HEADER_SIZE, b"\0"))
+        f.write(memoryview(timestamps).cast("B"))
+        f.write(memoryview(values).cast("B"))
+        f.write(b"".join(_DAY.pack(*entry) for entry in days))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+class Segment:
+    # A segment file mapped read-only. timestamps and values are memoryviews of
+    # doubles straight over the mapping, valid until close(); columns() gives views
+    # of their own for anything that may outlive it.
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER_SIZE:
+                raise ValueError(f"{path} is not a metric segment")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.generation, self.utc_offset, self.day_count = _HEADER.unpack_from(self._map)
+        columns_end = HEADER_SIZE + 16 * self.count
+        if magic != SEGMENT_MAGIC or size != columns_end + _DAY.size * self.day_count:
+            self._map.close()
+            raise ValueError(f"{path} is not a metric segment")
+        view = memoryview(self._map)
+        self.timestamps = view[HEADER_SIZE : HEADER_SIZE + 8 * self.count].cast("d")
+        self.values = view[HEADER_SIZE + 8 * self.count : columns_end].cast("d")
+        self._index = view[columns_end:]
+        view.release()
+
+    def __len__(self):
+        return self.count
+
+    def days(self, utc_offset):
+        # [(day, first row, count, sum, min, max)], or None if the index was built
+        # for another UTC offset
+        if utc_offset != self.utc_offset:
+            return None
+        return list(_DAY.iter_unpack(self._index))
+
+    def columns(self):
+        return self.timestamps[:], self.values[:]
+
+    def rows_between(self, start, end):
+        # (low, high): the rows with start <= timestamp < end
+        return bisect_left(self.timestamps, start), bisect_left(self.timestamps, end)
+
+    def numpy(self):
+        # (timestamps, values) as read-only NumPy arrays over the mapping, None
+        # without NumPy
+        np = optional_numpy()
+        if np is None:
+            return None
+        timestamps, values = self.columns()
+        return np.frombuffer(timestamps, dtype=np.float64), np.frombuffer(values, dtype=np.float64)
+
+    def close(self):
+        # Views handed out (series columns, NumPy arrays) keep the mapping alive
+        # until they are gone, it is only unmapped here if there are none
+        for view in (self.timestamps, self.values, self._index):
+            try:
+                view.release()
+            except BufferError:
+                pass
+        try:
+            self._map.close()
+        except BufferError:
+            pass
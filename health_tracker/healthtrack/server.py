@@ -0,0 +1,431 @@
+# Local HTTP/JSON service over the tracker core, for other devices and scripts on
+# the same machine.
+#
+#     python -m healthtrack serve --port 8765
+#
+# GET  /health                              {"status": "ok", "advice_cache": hit/miss stats}
+# GET  /profiles                            profile names
+# POST /profiles/<name>/readings            {"metric", "value", "timestamp"?} or a list of them
+# GET  /profiles/<name>/summary             today's totals, goals, averages and streaks
+# GET  /profiles/<name>/appointments        bookings, optionally ?doctor=...
+# POST /profiles/<name>/appointments        {"doctor", "start"}, 409 with the next free slot
+# GET  /doctors                             doctors and slot times
+# POST /bmi                                 {"weight", "height"}
+# POST /advice                              {"symptoms"}
+# POST /batch                               [{"method", "path", "body"?}, ...] -> [{"status", "body"}, ...]
+#
+# Plain asyncio streams speaking HTTP/1.1, no dependencies. Connections are kept
+# alive (and pipelined requests answered in order) until the client closes them or
+# sends "Connection: close". Anything that touches a profile runs on a small thread
+# pool so the event loop only parses and routes. Readings posted by concurrent
+# requests are batched: they queue up while a batch is being written and the next
+# batch applies them all with one extend() per profile and metric, which is what
+# keeps the write rate up under load. A batch is only acknowledged once the
+# profiles' group commits have it on disk, so that is one fsync per batch too.
+#
+# A profile has one writer at a time (see storage.DirectoryLock). While the app or
+# another process has a profile open, requests that touch it get 409 Conflict
+# saying so, rather than two processes writing the same files.
+import argparse
+import asyncio
+import json
+import math
+import re
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from .advice import ADVICE_CACHE, cached_advice
+from .appointments import AppointmentConflict, check_slot, slot_times
+from .bmi import calculate_bmi, interpret_bmi
+from .core import DOCTORS
+from .profiles import ProfileManager
+from .storage import METRICS, StoreLocked, default_data_dir
+from .wearables import parse_timestamp
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 8 * 1024 * 1024
+KEEP_ALIVE_TIMEOUT = 30.0
+
+# (method, path pattern, handler method name)
+ROUTES = [
+    ("GET", r"/health", "get_health"),
+    ("GET", r"/profiles", "get_profiles"),
+    ("POST", r"/profiles/(?P<profile>[^/]+)/readings", "post_readings"),
+    ("GET", r"/profiles/(?P<profile>[^/]+)/summary", "get_summary"),
+    ("GET", r"/profiles/(?P<profile>[^/]+)/appointments", "get_appointments"),
+    ("POST", r"/profiles/(?P<profile>[^/]+)/appointments", "post_appointment"),
+    ("GET", r"/doctors", "get_doctors"),
+    ("POST", r"/bmi", "post_bmi"),
+    ("POST", r"/advice", "post_advice"),
+    ("POST", r"/batch", "post_batch"),
+]
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.body = dict(details, error=message)
+
+
+def field(body, name, types=str, default=KeyError):
+    # body[name] checked against types, a missing or mistyped field is a 400
+    if not isinstance(body, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected a JSON object.")
+    try:
+        value = body[name]
+    except KeyError:
+        if default is KeyError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing field: {name}") from None
+        return default
+    types = types if isinstance(types, tuple) else (types,)
+    # JSON true/false are ints to isinstance() but never a number here
+    if not isinstance(value, types) or (isinstance(value, bool) and int in types):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid {name}: {value!r}")
+    return value
+
+
+def number_field(body, name):
+    # A finite JSON number, NaN and infinities would poison every sum they enter
+    value = float(field(body, name, (int, float)))
+    if not math.isfinite(value):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid {name}: {value!r}")
+    return value
+
+
+class HealthService:
+    def __init__(self, profiles, workers=4):
+        self.profiles = profiles
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="healthtrack-service")
+        self.routes = [(method, re.compile(pattern + "$"), getattr(self, name)) for method, pattern, name in ROUTES]
+        self.server = None
+        self._pending = []
+        self._writing = []
+        self._writer = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.server = await asyncio.start_server(self._serve_connection, host, port)
+        return self.server
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        if self._writer is not None:
+            await self._writer
+        await self._run(self.profiles.flush)
+        self.executor.shutdown()
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, keep_alive, body = request
+                status, payload = await self.dispatch(method, target, body)
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (asyncio.LimitOverrunError, ValueError):
+            # A request or header line longer than the stream's limit
+            self._write_response(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, {"error": "Line too long."}, False)
+        except HTTPError as e:
+            # The request could not be parsed, so the connection cannot be reused
+            self._write_response(writer, e.status, e.body, False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        # (method, target, keep_alive, body), or None once the client is done
+        line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line.") from None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.") from None
+        if length > MAX_BODY:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request bodies are limited to {MAX_BODY} bytes.")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+        return method, target, keep_alive, body
+
+    def _write_response(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        status = HTTPStatus(status)
+        writer.write(
+            (
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            ).encode("latin-1")
+            + body
+        )
+
+    async def dispatch(self, method, target, body):
+        # (status, JSON payload) for a request with a raw body
+        try:
+            data = json.loads(body) if body else None
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {e}"}
+        return await self.handle(method, target, data)
+
+    async def handle(self, method, target, data):
+        # (status, JSON payload) for a request whose body is already decoded
+        url = urlsplit(target)
+        try:
+            allowed = []
+            for route_method, pattern, handler in self.routes:
+                match = pattern.match(url.path)
+                if match is None:
+                    continue
+                if route_method != method:
+                    allowed.append(route_method)
+                    continue
+                if method == "POST" and data is None:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "A JSON body is required.")
+                query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                return await handler(data, query, **match.groupdict())
+            if allowed:
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{url.path} only accepts {', '.join(allowed)}.")
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No such resource: {url.path}")
+        except HTTPError as e:
+            return e.status, e.body
+        except StoreLocked as e:
+            return HTTPStatus.CONFLICT, {"error": str(e)}
+        except (TypeError, ValueError) as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+
+    def _profile(self, name):
+        self.profiles.path(name)  # raises ValueError for names that are not allowed
+        return name
+
+    async def _tracker_call(self, profile, fn, *args):
+        # fn(tracker, *args) on the thread pool, once the readings already posted for
+        # the profile are written, so a client always reads its own writes
+        queued = [future for name, _, future in self._writing + self._pending if name == profile]
+        if queued:
+            await asyncio.gather(*queued, return_exceptions=True)
+        def call():
+            # Leased, so other requests cannot evict and close it mid-call
+            with self.profiles.lease(profile) as tracker:
+                return fn(tracker, *args)
+
+        return await self._run(call)
+
+    async def get_health(self, body, query):
+        return HTTPStatus.OK, {"status": "ok", "advice_cache": ADVICE_CACHE.stats()}
+
+    async def get_profiles(self, body, query):
+        return HTTPStatus.OK, {"profiles": await self._run(self.profiles.names)}
+
+    async def post_readings(self, body, query, profile):
+        profile = self._profile(profile)
+        readings = []
+        for reading in body if isinstance(body, list) else [body]:
+            metric = field(reading, "metric")
+            if metric not in METRICS:
+                raise ValueError(f"Unknown metric: {metric}")
+            timestamp = field(reading, "timestamp", (int, float, str, type(None)), None)
+            timestamp = time.time() if timestamp is None else parse_timestamp(timestamp)
+            if not math.isfinite(timestamp):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid timestamp: {timestamp!r}")
+            readings.append((metric, timestamp, number_field(reading, "value")))
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((profile, readings, future))
+        if self._writer is None:
+            self._writer = asyncio.get_running_loop().create_task(self._write_readings())
+        await future
+        return HTTPStatus.CREATED, {"accepted": len(readings)}
+
+    async def _write_readings(self):
+        # Applies everything queued since the last batch, until the queue stays empty
+        try:
+            while self._pending:
+                # Let the requests already read on other connections join this batch
+                await asyncio.sleep(0)
+                batch = self._writing = self._pending
+                self._pending = []
+                failures = await self._run(self._apply_readings, batch)
+                for profile, readings, future in batch:
+                    if future.done():
+                        continue
+                    if profile in failures:
+                        future.set_exception(failures[profile])
+                    else:
+                        future.set_result(None)
+        finally:
+            self._writing = []
+            self._writer = None
+
+    def _apply_readings(self, batch):
+        # {profile: exception} for the profiles that could not be written
+        columns = {}
+        for profile, readings, _ in batch:
+            by_metric = columns.setdefault(profile, {})
+            for metric, timestamp, value in readings:
+                timestamps, values = by_metric.setdefault(metric, ([], []))
+                timestamps.append(timestamp)
+                values.append(value)
+        failures = {}
+        written = {}
+        try:
+            for profile, by_metric in columns.items():
+                try:
+                    # Leased until flushed, a batch can touch more profiles than max_open
+                    tracker = self.profiles.acquire(profile)
+                    written[profile] = tracker
+                    for metric, (timestamps, values) in by_metric.items():
+                        tracker.extend(metric, timestamps, values)
+                except Exception as e:
+                    failures[profile] = e
+            # Every profile's fsync pass is already under way, these waits overlap
+            for profile, tracker in written.items():
+                try:
+                    tracker.flush()
+                except Exception as e:
+                    failures.setdefault(profile, e)
+        finally:
+            for profile in written:
+                self.profiles.release(profile)
+        return failures
+
+    async def get_summary(self, body, query, profile):
+        def summarize(tracker):
+            goals = tracker.goal_stats()
+            return {
+                metric: {
+                    "today": total,
+                    "goal": target,
+                    "met": total >= target,
+                    "week_mean": week.mean,
+                    "month_mean": month.mean,
+                    "days_met": goals[metric].met,
+                    "days": goals[metric].days,
+                    "streak": goals[metric].current_streak,
+                    "best_streak": goals[metric].best_streak,
+                }
+                for metric, (total, target, week, month) in tracker.summary().items()
+            }
+
+        return HTTPStatus.OK, await self._tracker_call(self._profile(profile), summarize)
+
+    async def get_appointments(self, body, query, profile):
+        def appointments(tracker):
+            with tracker.lock:
+                book = tracker.appointments
+                doctors = [query["doctor"]] if "doctor" in query else book.doctors()
+                return [appointment.to_dict() for doctor in doctors for appointment in book.appointments(doctor)]
+
+        return HTTPStatus.OK, {"appointments": await self._tracker_call(self._profile(profile), appointments)}
+
+    async def post_appointment(self, body, query, profile):
+        doctor = field(body, "doctor")
+        if doctor not in DOCTORS:
+            raise ValueError(f"Unknown doctor: {doctor}")
+        start = datetime.fromisoformat(field(body, "start"))
+        check_slot(start)
+
+        def book(tracker):
+            with tracker.lock:
+                try:
+                    return tracker.appointments.book(doctor, start).to_dict()
+                except AppointmentConflict as e:
+                    free = tracker.appointments.next_free_slot(doctor, start)
+                    raise HTTPError(HTTPStatus.CONFLICT, str(e), next_free=free.isoformat()) from None
+
+        return HTTPStatus.CREATED, await self._tracker_call(self._profile(profile), book)
+
+    async def get_doctors(self, body, query):
+        return HTTPStatus.OK, {"doctors": DOCTORS, "slots": slot_times()}
+
+    async def post_bmi(self, body, query):
+        bmi = calculate_bmi(number_field(body, "weight"), number_field(body, "height"))
+        return HTTPStatus.OK, {"bmi": bmi, "category": interpret_bmi(bmi)}
+
+    async def post_advice(self, body, query):
+        symptoms = field(body, "symptoms")
+        if not symptoms.strip():
+            raise ValueError("Please enter your symptoms.")
+        # Notes short enough to be cached are answered on the loop, a repeat is a
+        # dict lookup and a miss a few microseconds. Long ones go to the pool.
+        if len(symptoms) <= ADVICE_CACHE.max_text:
+            return HTTPStatus.OK, {"advice": cached_advice(symptoms)}
+        return HTTPStatus.OK, {"advice": await self._run(cached_advice, symptoms)}
+
+    async def post_batch(self, body, query):
+        # Sub-requests run concurrently, so readings among them share a write batch.
+        # Reads of a profile still see the readings posted before them.
+        if not isinstance(body, list):
+            raise ValueError("A batch is a list of requests.")
+        requests = [
+            (field(request, "method", default="GET"), field(request, "path"), field(request, "body", object, None))
+            for request in body
+        ]
+        results = await asyncio.gather(*(self.handle(method, path, data) for method, path, data in requests))
+        return HTTPStatus.OK, [{"status": int(status), "body": payload} for status, payload in results]
+
+
+async def serve(profiles, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=4):
+    service = HealthService(profiles, workers)
+    await service.start(host, port)
+    try:
+        # Stop cleanly on SIGTERM too, so the last readings are synced
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, service.server.close)
+    except (NotImplementedError, AttributeError):
+        pass  # Windows
+    print(f"Serving on http://{host}:{service.port}", file=sys.stderr)
+    try:
+        await service.server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m healthtrack serve", description="Serve the tracker over HTTP/JSON.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="interface to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--data-dir", default=None, help=f"defaults to {default_data_dir()}")
+    parser.add_argument("--workers", type=int, default=4, help="threads for profile access")
+    parser.add_argument("--max-open", type=int, default=16, help="profiles kept open at once")
+    args = parser.parse_args(argv)
+
+    with ProfileManager(args.data_dir, max_open=args.max_open) as profiles:
+        profiles.adopt_legacy_data()
+        try:
+            asyncio.run(serve(profiles, args.host, args.port, args.workers))
+        except KeyboardInterrupt:
+            pass
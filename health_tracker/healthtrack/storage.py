@@ -0,0 +1,448 @@
+import os
+import struct
+import time
+from array import array
+from itertools import islice
+
+from .journal import COMMIT_DELAY, GroupCommit, read_frames, write_frame
+from .metrics import MetricSeries, copy_column, local_utc_offset
+from .segments import Segment, write_segment
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+METRICS = ("steps", "water", "sleep")
+LOCK_NAME = "store.lock"
+
+# Each log row is a (timestamp, value) pair of native doubles, the same layout
+# array("d") uses so a whole log can be loaded with a single frombytes call. Rows
+# are written in checksummed frames (see journal.py), one per append or extend,
+# after a magic number. Logs without it are from before frames and hold bare rows.
+_RECORD = struct.Struct("=dd")
+_LOG_MAGIC = b"HTLOG002"
+
+# Segments from before segments.py: <name>.seg holding a header, then the
+# timestamp column, then the value column. They are read once and rewritten.
+_LEGACY_SEGMENT_MAGIC = b"HTSEG001"
+_LEGACY_SEGMENT_HEADER = struct.Struct("<8sQQ")  # magic, row count, log generation
+
+
+def default_data_dir():
+    return os.environ.get("HEALTHTRACK_HOME", os.path.join(os.path.expanduser("~"), ".healthtrack"))
+
+
+class StoreLocked(RuntimeError):
+    pass
+
+
+class DirectoryLock:
+    # An exclusive lock on a directory's store.lock for as long as it is held. The
+    # metric logs rely on being the only writer: compaction writes segment N + 1 and
+    # removes log N, and a second writer appending to log N or writing the same
+    # segment would lose readings. Readers (read_log) need no lock. The OS drops the
+    # lock when the holder exits however it exits, so a crash leaves nothing stale.
+    def __init__(self, directory):
+        self.path = os.path.join(directory, LOCK_NAME)
+        os.makedirs(directory, exist_ok=True)
+        f = open(self.path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            holder = self._holder(f)
+            f.close()
+            raise StoreLocked(
+                f"{directory} is already open in {f'process {holder}' if holder else 'another process'}, "
+                "close it there first."
+            ) from None
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()).encode())
+        f.flush()
+        self._file = f
+
+    @staticmethod
+    def _holder(f):
+        # The process id the holder wrote, if it can be read
+        try:
+            f.seek(0)
+            return int(f.read(32) or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def release(self):
+        # Closing the file releases the lock
+        self._file.close()
+
+
+def _files(directory, name):
+    # ({generation: segment path}, {generation: log path}, legacy segment path or
+    # None, [leftover temporary files]) for a metric
+    segments = {}
+    logs = {}
+    legacy = None
+    temporary = []
+    for entry in os.listdir(directory):
+        parts = entry.split(".")
+        if parts[0] != name:
+            continue
+        path = os.path.join(directory, entry)
+        if parts[-1] == "tmp":
+            temporary.append(path)
+        elif len(parts) == 2 and parts[1] == "seg":
+            legacy = path
+        elif len(parts) == 3 and parts[1].isdigit() and parts[2] in ("seg", "log"):
+            (segments if parts[2] == "seg" else logs)[int(parts[1])] = path
+    return segments, logs, legacy, temporary
+
+
+def _remove(path):
+    # A segment another process still has mapped cannot be removed on Windows, it
+    # is left for the next open to tidy up
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _read_legacy_segment(path):
+    # (timestamps, values, generation) stored in a legacy segment file
+    timestamps = array("d")
+    values = array("d")
+    with open(path, "rb") as f:
+        magic, count, generation = _LEGACY_SEGMENT_HEADER.unpack(f.read(_LEGACY_SEGMENT_HEADER.size))
+        if magic != _LEGACY_SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not a metric segment")
+        timestamps.fromfile(f, count)
+        values.fromfile(f, count)
+    return timestamps, values, generation
+
+
+def _read_log(data):
+    # (interleaved rows, bytes they end at, whether the log predates frames)
+    rows = array("d")
+    legacy = not data.startswith(_LOG_MAGIC)
+    if legacy:
+        usable = len(data) - len(data) % _RECORD.size
+        rows.frombytes(data[:usable])
+    else:
+        payloads, usable = read_frames(data, len(_LOG_MAGIC))
+        rows.frombytes(b"".join(payloads))
+    return rows, usable, legacy
+
+
+def _combine(name, segment, tail):
+    # The full series: the segment's columns in place when nothing was logged
+    # since, otherwise a copy of them with the tail added
+    if segment is None:
+        return tail
+    timestamps, values = segment.columns()
+    if not len(tail):
+        return MetricSeries(name, timestamps, values)
+    series = MetricSeries(name, copy_column(timestamps), copy_column(values))
+    series.extend(tail.timestamps, tail.values)
+    return series
+
+
+def read_log(directory, name, attempts=5):
+    # (Segment or None, MetricSeries of the rows logged since) as they are on disk,
+    # without opening the metric for writing: nothing is created, truncated or
+    # compacted, so another process can go on writing. A torn last record is left
+    # out. A compaction finishing between listing the files and reading the log
+    # shows up as the log being gone, and the read starts again.
+    for _ in range(attempts):
+        segments, _, legacy, _ = _files(directory, name)
+        segment = None
+        tail = MetricSeries(name)
+        generation = 0
+        try:
+            if segments:
+                generation = max(segments)
+                segment = Segment(segments[generation])
+            if legacy is not None:
+                timestamps, values, legacy_generation = _read_legacy_segment(legacy)
+                if legacy_generation >= generation:
+                    if segment is not None:
+                        segment.close()
+                        segment = None
+                    tail.extend(timestamps, values)
+                    generation = legacy_generation
+            with open(os.path.join(directory, f"{name}.{generation}.log"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            if max(_files(directory, name)[0], default=0) <= generation:
+                # Nothing newer was compacted, so the log is missing because it was
+                # never written: before the first reading, or between a compaction
+                # writing its segment and starting the next log
+                return segment, tail
+            if segment is not None:
+                segment.close()
+            continue
+        rows = _read_log(data)[0]
+        tail.extend(rows[0::2], rows[1::2])
+        return segment, tail
+    raise RuntimeError(f"{name} in {directory} kept changing while it was read")
+
+
+def read_series(directory, name):
+    # Every reading of a metric as on disk, see read_log
+    segment, tail = read_log(directory, name)
+    series = _combine(name, segment, tail)
+    if segment is not None:
+        segment.close()
+    return series
+
+
+class MetricLog:
+    # A single metric: a compacted columnar segment, mapped rather than loaded (see
+    # segments.py), plus an append-only tail log. Segment N and log N belong
+    # together: the log only holds rows that are not in the segment, and
+    # compaction writes segment N + 1 before removing log N, so a crash half way
+    # through never loses or duplicates readings. Every write reaches the OS at
+    # once and is fsynced by the (shared) group committer.
+    #
+    # The rows logged since the last compaction are kept in self.tail. The full
+    # series is only put together when something asks for it.
+    #
+    # There can only be one writer per directory, a log takes the directory's lock
+    # unless it is handed one held by its store (see DirectoryLock).
+    def __init__(self, directory, name, compact_every=100000, committer=None, lock=None):
+        self.directory = directory
+        self.name = name
+        self.compact_every = compact_every
+        self._own_lock = lock is None
+        self.lock = DirectoryLock(directory) if lock is None else lock
+        self._own_committer = committer is None
+        self.committer = GroupCommit() if committer is None else committer
+
+        self.segment = None
+        self.tail = MetricSeries(name)
+        self.generation = 0
+        self._series = None
+        self._legacy_segment = None
+        self._ticket = 0
+
+        legacy = self._load()
+        self._log = self._open_log(self.generation)
+        if legacy:
+            # Rewrites the old files' rows as a mapped segment, the next log has frames
+            self.compact()
+
+    @property
+    def series(self):
+        if self._series is None:
+            self._series = _combine(self.name, self.segment, self.tail)
+        return self._series
+
+    @property
+    def timestamps(self):
+        return self.series.timestamps
+
+    @property
+    def values(self):
+        return self.series.values
+
+    def _segment_path(self, generation):
+        return os.path.join(self.directory, f"{self.name}.{generation}.seg")
+
+    def _log_path(self, generation):
+        return os.path.join(self.directory, f"{self.name}.{generation}.log")
+
+    def _load(self):
+        # Returns whether the files predate frames or mapped segments
+        segments, logs, legacy_segment, temporary = _files(self.directory, self.name)
+        for path in temporary:
+            _remove(path)
+        legacy = False
+        if segments:
+            self.generation = max(segments)
+            self.segment = Segment(segments[self.generation])
+        if legacy_segment is not None:
+            timestamps, values, generation = _read_legacy_segment(legacy_segment)
+            if generation >= self.generation:
+                if self.segment is not None:
+                    self.segment.close()
+                    self.segment = None
+                self.tail.extend(timestamps, values)
+                self.generation = generation
+                self._legacy_segment = legacy_segment
+                legacy = True
+            else:
+                _remove(legacy_segment)
+
+        # Files from older generations were folded into the newest segment, they
+        # are only left behind by an interrupted compaction
+        for generation, path in segments.items():
+            if generation < self.generation:
+                _remove(path)
+        for generation, path in logs.items():
+            if generation != self.generation:
+                os.remove(path)
+
+        log_path = self._log_path(self.generation)
+        if self.generation not in logs:
+            return legacy
+        with open(log_path, "rb") as f:
+            data = f.read()
+        rows, usable, legacy_log = _read_log(data)
+        if usable != len(data):
+            # Drop the record torn by a crash mid-write
+            with open(log_path, "r+b") as f:
+                f.truncate(usable)
+        self.tail.extend(rows[0::2], rows[1::2])
+        return legacy or (legacy_log and usable > 0)
+
+    def _open_log(self, generation):
+        log = open(self._log_path(generation), "ab")
+        if not log.tell():
+            log.write(_LOG_MAGIC)
+            log.flush()
+            os.fsync(log.fileno())
+        return log
+
+    def _write(self, payload):
+        write_frame(self._log, payload)
+        self._log.flush()
+        self._ticket = self.committer.submit(self._log)
+
+    def __len__(self):
+        return (len(self.segment) if self.segment is not None else 0) + len(self.tail)
+
+    def append(self, value, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        self._write(_RECORD.pack(timestamp, value))
+        self.tail.append(value, timestamp)
+        if self._series is not None and self._series is not self.tail:
+            self._series.append(value, timestamp)
+        if len(self.tail) >= self.compact_every:
+            self.compact()
+
+    def extend(self, timestamps, values):
+        # Bulk append: the rows are interleaved into one buffer and written with a
+        # single call. A bulk load only compacts once the log is as large as the
+        # segment, so loading n rows sorts O(n log n) rather than rewriting
+        # everything every compact_every rows.
+        count = len(values)
+        if len(timestamps) != count:
+            raise ValueError("timestamps and values differ in length")
+        if not count:
+            return
+        timestamps = array("d", timestamps)
+        values = array("d", values)
+        rows = array("d", bytes(_RECORD.size * count))
+        rows[0::2] = timestamps
+        rows[1::2] = values
+        self._write(rows.tobytes())
+        self.tail.extend(timestamps, values)
+        if self._series is not None and self._series is not self.tail:
+            self._series.extend(timestamps, values)
+        if len(self.tail) >= max(self.compact_every, len(self) - len(self.tail)):
+            self.compact()
+
+    def sync(self):
+        # Waits until every row written so far is on disk
+        self.committer.wait(self._ticket)
+
+    def _sorted_columns(self):
+        # The segment is sorted and readings mostly arrive in order, so the full
+        # sort is only needed when the tail goes back in time
+        series = self.series
+        tail = self.tail.timestamps
+        in_order = all(a <= b for a, b in zip(tail, islice(tail, 1, None)))
+        if in_order and len(tail) and self.segment is not None and len(self.segment):
+            in_order = tail[0] >= self.segment.timestamps[-1]
+        if in_order:
+            return series.timestamps, series.values
+        order = sorted(range(len(series)), key=series.timestamps.__getitem__)
+        return array("d", (series.timestamps[i] for i in order)), array("d", (series.values[i] for i in order))
+
+    def compact(self):
+        # Writes everything as the next generation's segment and starts its log
+        self.sync()
+        timestamps, values = self._sorted_columns()
+        generation = self.generation + 1
+        write_segment(self._segment_path(generation), timestamps, values, generation, local_utc_offset())
+
+        self.committer.retire(self._log)
+        self._log.close()
+        os.remove(self._log_path(self.generation))
+        previous = self.segment
+        self.generation = generation
+        self.segment = Segment(self._segment_path(generation))
+        self.tail = MetricSeries(self.name)
+        self._series = None
+        self._log = self._open_log(generation)
+        # The previous segment stays mapped for whoever still has views of it
+        if previous is not None:
+            previous.close()
+            _remove(previous.path)
+        if self._legacy_segment is not None:
+            _remove(self._legacy_segment)
+            self._legacy_segment = None
+
+    def close(self):
+        if not self._log.closed:
+            self.committer.retire(self._log)
+            self._log.close()
+        if self.segment is not None:
+            self.segment.close()
+        if self._own_committer:
+            self.committer.close()
+        if self._own_lock:
+            self.lock.release()
+
+
+class MetricStore:
+    # Persistent per-metric time series, one MetricLog per metric in a shared
+    # directory. The logs, and anything else given self.committer, share one group
+    # commit, so a burst of writes across metrics still costs one fsync pass.
+    # Opening a store locks its directory, a second store on it (in this process
+    # or another) raises StoreLocked until the first is closed.
+    def __init__(self, directory=None, commit_delay=COMMIT_DELAY, **log_options):
+        self.directory = directory or default_data_dir()
+        self.log_options = log_options
+        self.lock = DirectoryLock(self.directory)
+        self.committer = GroupCommit(commit_delay)
+        self._logs = {}
+
+    def log(self, metric):
+        if metric not in self._logs:
+            self._logs[metric] = MetricLog(
+                self.directory, metric, committer=self.committer, lock=self.lock, **self.log_options
+            )
+        return self._logs[metric]
+
+    def append(self, metric, value, timestamp=None):
+        self.log(metric).append(value, timestamp)
+
+    def extend(self, metric, timestamps, values):
+        self.log(metric).extend(timestamps, values)
+
+    def series(self, metric):
+        return self.log(metric).series
+
+    def total(self, metric):
+        return self.series(metric).total()
+
+    def flush(self):
+        # Waits until everything written so far, by any user of the committer, is on disk
+        self.committer.wait()
+
+    def close(self):
+        for log in self._logs.values():
+            log.close()
+        self.committer.close()
+        self.lock.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
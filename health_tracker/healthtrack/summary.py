@@ -0,0 +1,200 @@
+from array import array
+from datetime import date
+
+from .metrics import MetricSeries, date_to_day, day_number, local_utc_offset, optional_numpy
+
+WINDOWS = (1, 7, 30)
+
+
+class DayBucket:
+    __slots__ = ("sum", "count", "min", "max")
+
+    def __init__(self, total=0.0, count=0, low=None, high=None):
+        self.sum = total
+        self.count = count
+        self.min = low
+        self.max = high
+
+    def add(self, value):
+        self.sum += value
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        self.sum += other.sum
+        self.count += other.count
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+
+
+class WindowStats:
+    # Stats over the daily totals of the last `days` days, `logged_days` counts the
+    # days that have at least one entry and is what the mean is taken over
+    __slots__ = ("days", "sum", "logged_days", "mean", "min", "max")
+
+    def __init__(self, days, total, logged_days, low, high):
+        self.days = days
+        self.sum = total
+        self.logged_days = logged_days
+        self.mean = total / logged_days if logged_days else 0.0
+        self.min = low
+        self.max = high
+
+
+class RollingSummary:
+    # Per-day buckets plus running sums for each trailing window. Adding an entry
+    # touches one bucket and the window sums, moving to a new day only subtracts the
+    # days that fall out of each window, so neither depends on how much history exists.
+    def __init__(self, windows=WINDOWS, utc_offset=None):
+        self.windows = tuple(sorted(windows))
+        self.utc_offset = local_utc_offset() if utc_offset is None else utc_offset
+        self.days = {}
+        self.current_day = None
+        self._sums = dict.fromkeys(self.windows, 0.0)
+        self._logged = dict.fromkeys(self.windows, 0)
+
+    @classmethod
+    def from_series(cls, series, windows=WINDOWS, utc_offset=None):
+        summary = cls(windows, utc_offset)
+        if not len(series):
+            return summary
+        if optional_numpy() is None:
+            # Without NumPy one pass filling the buckets beats four aggregate() passes
+            summary._fill(series)
+        else:
+            aggregates = {
+                how: series.aggregate("day", how, summary.utc_offset) for how in ("sum", "count", "min", "max")
+            }
+            for (day, total), (_, count), (_, low), (_, high) in zip(
+                aggregates["sum"], aggregates["count"], aggregates["min"], aggregates["max"]
+            ):
+                summary.days[date_to_day(day)] = DayBucket(total, count, low, high)
+        summary._rebuild(max(summary.days))
+        return summary
+
+    @classmethod
+    def from_segment(cls, segment, tail, windows=WINDOWS, utc_offset=None):
+        # From a segment's day index plus the rows logged since (a MetricSeries), so
+        # no reading in the segment is looked at. The columns are only scanned when
+        # the index was built for another UTC offset.
+        summary = cls(windows, utc_offset)
+        days = segment.days(summary.utc_offset) if segment is not None else []
+        if days is None:
+            summary = cls.from_series(MetricSeries(None, *segment.columns()), windows, summary.utc_offset)
+        elif days:
+            for day, _, count, total, low, high in days:
+                summary.days[day] = DayBucket(total, count, low, high)
+            summary._rebuild(max(summary.days))
+        if len(tail):
+            summary.extend(tail.timestamps, tail.values)
+        return summary
+
+    def _fill(self, series):
+        days = self.days
+        offset = self.utc_offset
+        last_day = None
+        bucket = None
+        for timestamp, value in zip(series.timestamps, series.values):
+            day = int((timestamp + offset) // 86400)
+            if day != last_day:
+                last_day = day
+                bucket = days.get(day)
+                if bucket is None:
+                    bucket = days[day] = DayBucket()
+            bucket.add(value)
+
+    def _rebuild(self, current_day):
+        self.current_day = current_day
+        for window in self.windows:
+            total = 0.0
+            logged = 0
+            for day in range(current_day - window + 1, current_day + 1):
+                bucket = self.days.get(day)
+                if bucket is not None:
+                    total += bucket.sum
+                    logged += 1
+            self._sums[window] = total
+            self._logged[window] = logged
+
+    def _advance(self, day):
+        if self.current_day is None:
+            self._rebuild(day)
+            return
+        if day <= self.current_day:
+            return
+        for window in self.windows:
+            if day - self.current_day >= window:
+                self._sums[window] = 0.0
+                self._logged[window] = 0
+                continue
+            for old in range(self.current_day - window + 1, day - window + 1):
+                bucket = self.days.get(old)
+                if bucket is not None:
+                    self._sums[window] -= bucket.sum
+                    self._logged[window] -= 1
+        self.current_day = day
+
+    def add(self, value, timestamp):
+        day = day_number(timestamp, self.utc_offset)
+        self._advance(day)
+        bucket = self.days.get(day)
+        new_day = bucket is None
+        if new_day:
+            bucket = self.days[day] = DayBucket()
+        bucket.add(value)
+        for window in self.windows:
+            if day > self.current_day - window:
+                self._sums[window] += value
+                if new_day:
+                    self._logged[window] += 1
+
+    def extend(self, timestamps, values):
+        # Bulk add: the batch is aggregated per day first (vectorized when NumPy is
+        # available), then each day is merged into its bucket and the windows once
+        batch = RollingSummary.from_series(MetricSeries(None, array("d", timestamps), array("d", values)), (), self.utc_offset)
+        if not batch.days:
+            return
+        self._advance(max(batch.days))
+        for day, added in batch.days.items():
+            bucket = self.days.get(day)
+            new_day = bucket is None
+            if new_day:
+                self.days[day] = added
+            else:
+                bucket.merge(added)
+            for window in self.windows:
+                if day > self.current_day - window:
+                    self._sums[window] += added.sum
+                    if new_day:
+                        self._logged[window] += 1
+
+    def day(self, value=None):
+        # Bucket for a date (today by default), or None if nothing was logged
+        return self.days.get(date_to_day(value or date.today()))
+
+    def window(self, days, today=None):
+        if days not in self._sums:
+            raise ValueError(f"No {days}-day window is maintained")
+        end = date_to_day(today or date.today())
+        self._advance(end)
+        totals = [
+            bucket.sum for bucket in (self.days.get(day) for day in range(end - days + 1, end + 1)) if bucket is not None
+        ]
+        if end == self.current_day:
+            total, logged = self._sums[days], self._logged[days]
+        else:
+            # A day before the latest reading (a past date asked for, or readings
+            # dated in the future), the running sums are for the latest day
+            total, logged = sum(totals), len(totals)
+        return WindowStats(
+            days,
+            total,
+            logged,
+            min(totals) if totals else None,
+            max(totals) if totals else None,
+        )
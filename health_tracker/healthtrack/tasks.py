@@ -0,0 +1,113 @@
+# Runs slow work off the Tk thread. Workers never touch widgets: results, errors and
+# progress are queued and handed to their callbacks from a root.after poll on the
+# thread running mainloop. Nothing here imports tkinter, `root` only needs after().
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from .instruments import callable_name
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class Task:
+    # Passed as the first argument to every task function, so long-running work can
+    # report progress and stop early when cancelled
+    def __init__(self, runner, on_progress=None):
+        self._runner = runner
+        self._on_progress = on_progress
+        self._cancelled = threading.Event()
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise TaskCancelled()
+
+    def progress(self, done, total=None):
+        self.check()
+        if self._on_progress is not None:
+            self._runner._post(self._on_progress, done, total)
+
+
+class TaskRunner:
+    def __init__(self, root, workers=4, poll_ms=50, instruments=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        # Optional healthtrack.instruments.Instruments timing each task and callback
+        self.instruments = instruments if instruments is not None and instruments.enabled else None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="healthtrack-task")
+        self._results = queue.SimpleQueue()
+        self._closed = False
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_cancel=None, on_progress=None):
+        # Runs fn(task, *args) on the pool. Exactly one of on_done(result),
+        # on_error(exception) or on_cancel() is later called on the Tk thread.
+        task = Task(self, on_progress)
+        task.future = self._executor.submit(self._run, task, fn, args, on_done, on_error, on_cancel)
+        if on_cancel is not None:
+            # A task cancelled before it started never reaches _run
+            def cancelled_while_queued(future):
+                if future.cancelled():
+                    self._post(on_cancel, source=fn)
+
+            task.future.add_done_callback(cancelled_while_queued)
+        return task
+
+    def _run(self, task, fn, args, on_done, on_error, on_cancel):
+        start = time.perf_counter()
+        try:
+            task.check()
+            result = fn(task, *args)
+            task.check()
+        except TaskCancelled:
+            if on_cancel is not None:
+                self._post(on_cancel, source=fn)
+        except Exception as e:
+            if on_error is not None:
+                self._post(on_error, e, source=fn)
+            else:
+                traceback.print_exception(type(e), e, e.__traceback__)
+        else:
+            if on_done is not None:
+                self._post(on_done, result, source=fn)
+        finally:
+            if self.instruments is not None:
+                self.instruments.record("task." + callable_name(fn), time.perf_counter() - start)
+
+    def _post(self, callback, *args, source=None):
+        # source is the task function the callback reports on, for instruments
+        self._results.put((callback, args, source))
+
+    def _poll(self):
+        while True:
+            try:
+                callback, args, source = self._results.get_nowait()
+            except queue.Empty:
+                break
+            start = time.perf_counter()
+            try:
+                callback(*args)
+            except Exception:
+                traceback.print_exc()
+            if self.instruments is not None:
+                self.instruments.record("task.callback." + callable_name(source or callback), time.perf_counter() - start)
+        if not self._closed:
+            self.root.after(self.poll_ms, self._poll)
+
+    def shutdown(self, wait=True):
+        self._closed = True
+        self._executor.shutdown(wait=wait, cancel_futures=True)
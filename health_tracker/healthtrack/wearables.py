@@ -0,0 +1,362 @@
+# Bulk import and export of wearable data.
+#
+#     python -m healthtrack wearables import export.zip --profile alice
+#     python -m healthtrack wearables export steps.csv --metric steps
+#
+# Three formats, picked from the file extension unless --format is given:
+#
+#     csv    metric,timestamp,value rows
+#     jsonl  {"metric": ..., "timestamp": ..., "value": ...} per line
+#     xml    an Apple Health export.xml, or the export.zip it ships in
+#
+# Timestamps are Unix seconds or ISO 8601 strings (naive ones are local time).
+# Files are streamed: rows are collected in typed arrays per metric and written to
+# the store in batches, so memory stays flat however large the export is. The XML
+# and zip modules are only imported when an Apple Health file is read, the GUI
+# imports this module at startup.
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import sys
+import time
+from array import array
+from datetime import date, datetime
+
+from .metrics import copy_column
+from .profiles import DEFAULT_PROFILE, ProfileManager
+from .storage import METRICS, StoreLocked, default_data_dir
+
+FORMATS = ("csv", "jsonl", "xml")
+BATCH_SIZE = 1 << 16
+
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".xml": "xml",
+    ".zip": "xml",
+}
+
+# Apple Health record type -> metric
+APPLE_TYPES = {
+    "HKQuantityTypeIdentifierStepCount": "steps",
+    "HKQuantityTypeIdentifierDietaryWater": "water",
+    "HKCategoryTypeIdentifierSleepAnalysis": "sleep",
+}
+
+# Water is stored in liters
+_WATER_UNITS = {
+    "L": 1.0,
+    "mL": 0.001,
+    "fl_oz_us": 0.0295735,
+    "cup_us": 0.236588,
+}
+
+# Sleep stages that count as asleep; "in bed" is left out so it is not counted twice
+_ASLEEP = frozenset(
+    (
+        "HKCategoryValueSleepAnalysisAsleep",
+        "HKCategoryValueSleepAnalysisAsleepUnspecified",
+        "HKCategoryValueSleepAnalysisAsleepCore",
+        "HKCategoryValueSleepAnalysisAsleepDeep",
+        "HKCategoryValueSleepAnalysisAsleepREM",
+    )
+)
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def detect_format(path):
+    format = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if format is None:
+        raise ValueError(f"Cannot tell the format of {path}, pass one of {', '.join(FORMATS)}")
+    return format
+
+
+def parse_timestamp(value):
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class _AppleTimes:
+    # Apple Health writes "2024-01-31 07:45:00 +0100". Every record in an export
+    # shares a handful of dates and offsets, so those are parsed once and cached and
+    # only the time of day is parsed per record.
+    def __init__(self):
+        self._days = {}
+        self._offsets = {}
+
+    def __call__(self, text):
+        day = self._days.get(text[:10])
+        if day is None:
+            day = self._days[text[:10]] = (date.fromisoformat(text[:10]).toordinal() - _EPOCH_ORDINAL) * 86400
+        offset = self._offsets.get(text[20:])
+        if offset is None:
+            sign = -1 if text[20] == "-" else 1
+            offset = self._offsets[text[20:]] = sign * (int(text[21:23]) * 3600 + int(text[23:25]) * 60)
+        return day + int(text[11:13]) * 3600 + int(text[14:16]) * 60 + int(text[17:19]) - offset
+
+
+def _apple_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S %z", time.localtime(timestamp))
+
+
+def _check_finite(timestamp, value):
+    # NaN and infinities would poison every sum the reading enters
+    if not (math.isfinite(timestamp) and math.isfinite(value)):
+        raise ValueError(f"non-finite reading: timestamp {timestamp!r}, value {value!r}")
+
+
+def read_csv(source, name="<csv>"):
+    # Yields (metric, timestamp, value) from a text file with a metric,timestamp,value
+    # header, name is the file errors are reported against
+    reader = csv.reader(source)
+    header = next(reader, None)
+    if header is None:
+        return
+    missing = [column for column in ("metric", "timestamp", "value") if column not in header]
+    if missing:
+        raise ValueError(f"{name}: missing column {', '.join(map(repr, missing))}")
+    metric_index = header.index("metric")
+    timestamp_index = header.index("timestamp")
+    value_index = header.index("value")
+    width = max(metric_index, timestamp_index, value_index) + 1
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < width:
+            raise ValueError(f"{name}, line {reader.line_num}: expected {width} fields, got {len(row)}")
+        try:
+            timestamp, value = parse_timestamp(row[timestamp_index]), float(row[value_index])
+            _check_finite(timestamp, value)
+        except ValueError as e:
+            raise ValueError(f"{name}, line {reader.line_num}: {e}") from None
+        yield row[metric_index], timestamp, value
+
+
+def read_jsonl(source, name="<jsonl>"):
+    # Yields (metric, timestamp, value) from one JSON object per line, name is the
+    # file errors are reported against
+    for number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+            if not isinstance(entry, dict):
+                raise ValueError("expected a JSON object")
+            metric, timestamp, value = entry["metric"], entry["timestamp"], entry["value"]
+            if isinstance(timestamp, str):
+                timestamp = parse_timestamp(timestamp)
+            timestamp, value = float(timestamp), float(value)
+            _check_finite(timestamp, value)
+        except KeyError as e:
+            raise ValueError(f"{name}, line {number}: missing field {e}") from None
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{name}, line {number}: {e}") from None
+        yield metric, timestamp, value
+
+
+def read_apple_health(source, name="<xml>"):
+    # Yields (metric, timestamp, value) for the records of APPLE_TYPES in a binary
+    # export.xml. Each top level element is cleared once it has been read, so the
+    # tree never holds more than the one being parsed. ElementTree keeps no line
+    # numbers, errors give the Record's position in the file instead.
+    from xml.etree.ElementTree import iterparse
+
+    parse_time = _AppleTimes()
+    root = None
+    depth = 0
+    number = 0
+    for event, element in iterparse(source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+        if element.tag != "Record":
+            root.clear()
+            continue
+        number += 1
+        attributes = element.attrib
+        metric = APPLE_TYPES.get(attributes.get("type"))
+        timestamp = None
+        try:
+            if metric == "steps":
+                timestamp, value = parse_time(attributes["startDate"]), float(attributes["value"])
+            elif metric == "water":
+                scale = _WATER_UNITS.get(attributes.get("unit"))
+                if scale is not None:
+                    timestamp, value = parse_time(attributes["startDate"]), float(attributes["value"]) * scale
+            elif metric == "sleep" and attributes.get("value") in _ASLEEP:
+                # Filed under the time the user woke up, in hours
+                start = parse_time(attributes["startDate"])
+                timestamp = parse_time(attributes["endDate"])
+                value = (timestamp - start) / 3600
+            if timestamp is not None:
+                _check_finite(timestamp, value)
+        except KeyError as e:
+            raise ValueError(f"{name}, record {number}: missing attribute {e}") from None
+        except (IndexError, ValueError) as e:
+            raise ValueError(f"{name}, record {number}: {e}") from None
+        root.clear()
+        if timestamp is not None:
+            yield metric, timestamp, value
+
+
+def write_csv(target, rows):
+    target.write("metric,timestamp,value\n")
+    for metric, timestamps, values in rows:
+        target.writelines(f"{metric},{timestamp!r},{value!r}\n" for timestamp, value in zip(timestamps, values))
+
+
+def write_jsonl(target, rows):
+    for metric, timestamps, values in rows:
+        target.writelines(
+            f'{{"metric": "{metric}", "timestamp": {timestamp!r}, "value": {value!r}}}\n'
+            for timestamp, value in zip(timestamps, values)
+        )
+
+
+def write_apple_health(target, rows):
+    # The subset of an Apple Health export that read_apple_health reads back
+    types = {metric: apple_type for apple_type, metric in APPLE_TYPES.items()}
+    target.write('<?xml version="1.0" encoding="UTF-8"?>\n<HealthData locale="en_US">\n')
+    for metric, timestamps, values in rows:
+        apple_type = types[metric]
+        for timestamp, value in zip(timestamps, values):
+            if metric == "sleep":
+                target.write(
+                    f' <Record type="{apple_type}" sourceName="HealthTrack" '
+                    f'startDate="{_apple_time(timestamp - value * 3600)}" endDate="{_apple_time(timestamp)}" '
+                    f'value="HKCategoryValueSleepAnalysisAsleepUnspecified"/>\n'
+                )
+            else:
+                unit = "count" if metric == "steps" else "L"
+                stamp = _apple_time(timestamp)
+                target.write(
+                    f' <Record type="{apple_type}" sourceName="HealthTrack" unit="{unit}" '
+                    f'startDate="{stamp}" endDate="{stamp}" value="{value!r}"/>\n'
+                )
+    target.write("</HealthData>\n")
+
+
+def _open_source(path):
+    # (binary file, size in bytes), an Apple Health export.zip is read in place
+    if not path.lower().endswith(".zip"):
+        return open(path, "rb"), os.path.getsize(path)
+    import zipfile
+
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.filename.endswith("export.xml"):
+                return archive.open(info), info.file_size
+    raise ValueError(f"{path} does not contain an export.xml")
+
+
+def import_file(tracker, path, format=None, batch_size=BATCH_SIZE, progress=None):
+    # Streams a file into tracker, returns {metric: rows imported}. progress(bytes
+    # done, bytes total) is called after every batch; rows from batches already
+    # written stay imported if it raises to stop the import.
+    format = format or detect_format(path)
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format: {format}")
+    counts = dict.fromkeys(METRICS, 0)
+    pending = {metric: (array("d"), array("d")) for metric in METRICS}
+    buffered = 0
+
+    def write_batch():
+        for metric, (timestamps, values) in pending.items():
+            if values:
+                tracker.extend(metric, timestamps, values)
+                counts[metric] += len(values)
+                pending[metric] = (array("d"), array("d"))
+
+    raw, total = _open_source(path)
+    with raw:
+        if format == "xml":
+            rows = read_apple_health(raw, path)
+        else:
+            text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+            rows = read_csv(text, path) if format == "csv" else read_jsonl(text, path)
+        for number, (metric, timestamp, value) in enumerate(rows, 1):
+            columns = pending.get(metric)
+            if columns is None:
+                raise ValueError(f"Row {number}: unknown metric {metric!r}")
+            columns[0].append(timestamp)
+            columns[1].append(value)
+            buffered += 1
+            if buffered >= batch_size:
+                write_batch()
+                buffered = 0
+                if progress is not None:
+                    progress(min(raw.tell(), total), total)
+        write_batch()
+    tracker.flush()
+    if progress is not None:
+        progress(total, total)
+    return counts
+
+
+def export_file(tracker, path, format=None, metrics=METRICS):
+    # Writes every reading of metrics to path, returns the number of rows written
+    format = format or detect_format(path)
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format: {format}")
+    if path.lower().endswith(".zip"):
+        raise ValueError("Apple Health data is exported as a plain .xml file")
+    write = {"csv": write_csv, "jsonl": write_jsonl, "xml": write_apple_health}[format]
+    with tracker.lock:
+        # Copies, so the GUI can keep recording while the file is written
+        rows = [
+            (metric, copy_column(tracker.store.series(metric).timestamps), copy_column(tracker.store.series(metric).values))
+            for metric in metrics
+        ]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        write(f, rows)
+    return sum(len(values) for _, _, values in rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m healthtrack wearables", description="Import or export wearable data.")
+    parser.add_argument("--data-dir", default=None, help=f"defaults to {default_data_dir()}")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="add the readings in a file to the profile")
+    import_parser.add_argument("input")
+    import_parser.add_argument("--format", choices=FORMATS)
+    export_parser = commands.add_parser("export", help="write the profile's readings to a file")
+    export_parser.add_argument("output")
+    export_parser.add_argument("--format", choices=FORMATS)
+    export_parser.add_argument("--metric", action="append", choices=METRICS, help="repeat for several, default all")
+    args = parser.parse_args(argv)
+
+    with ProfileManager(args.data_dir, max_open=1) as profiles:
+        profiles.adopt_legacy_data()
+        try:
+            tracker = profiles.get(args.profile)
+        except StoreLocked as e:
+            parser.error(str(e))
+        start = time.perf_counter()
+        try:
+            if args.command == "import":
+                counts = import_file(tracker, args.input, args.format)
+            else:
+                rows = export_file(tracker, args.output, args.format, args.metric or METRICS)
+        except (KeyError, OSError, ValueError) as e:
+            parser.error(str(e))
+        elapsed = time.perf_counter() - start
+        if args.command == "import":
+            rows = sum(counts.values())
+            for metric, count in counts.items():
+                print(f"{metric}: {count}")
+    rate = rows / elapsed if elapsed else 0.0
+    print(f"{rows} rows {args.command}ed in {elapsed * 1000:.1f} ms ({rate:,.0f} rows/s)", file=sys.stderr)
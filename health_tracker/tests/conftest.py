@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# Opens a store on argv[1], says so and keeps it open until stdin closes
+HOLD_STORE = """
+import sys
+from healthtrack import MetricStore
+store = MetricStore(sys.argv[1])
+store.append("steps", 1.0, 1.0)
+store.flush()
+print("open", flush=True)
+sys.stdin.read()
+store.close()
+"""
+
+
+@pytest.fixture
+def hold_store():
+    # hold_store(directory) -> a process that has a store open on directory until
+    # its stdin is closed, or it is killed
+    processes = []
+
+    def start(directory):
+        process = subprocess.Popen(
+            [sys.executable, "-c", HOLD_STORE, directory],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=dict(os.environ, PYTHONPATH=APP_DIR),
+            text=True,
+        )
+        processes.append(process)
+        assert process.stdout.readline().strip() == "open"
+        return process
+
+    yield start
+    for process in processes:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        process.stdin.close()
+        process.stdout.close()
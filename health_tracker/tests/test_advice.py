@@ -0,0 +1,63 @@
+from healthtrack.advice import DEFAULT_ADVICE, MATCHER, SYMPTOM_ADVICE, AdviceCache, generate_advice
+
+
+def test_inflections_and_synonyms_match():
+    assert MATCHER.match("I keep coughing") == {"cough"}
+    assert MATCHER.match("Two headaches today, feeling queasy") == {"headache", "nausea"}
+    assert MATCHER.match("my HEAD   hurts!") == {"headache"}
+
+
+def test_no_match_inside_other_words():
+    assert MATCHER.match("hiccough") == set()
+    assert MATCHER.match("feverfew tea") == set()
+    assert MATCHER.match("coughdrop") == set()
+    assert generate_advice("feverfew tea") == DEFAULT_ADVICE
+
+
+def test_multi_symptom_note():
+    advice = generate_advice("Sore throat and a runny nose since Monday, plus a fever and I'm exhausted")
+    # One line per symptom, in SYMPTOM_ADVICE order
+    assert advice.split("\n") == [
+        SYMPTOM_ADVICE[symptom] for symptom in ("fever", "fatigue", "sore throat", "runny nose")
+    ]
+
+
+def test_cache_hits_on_repeats_and_variants():
+    cache = AdviceCache()
+    advice = cache.get("headache")
+    assert cache.get("headache") is advice
+    assert cache.get("  Headache!") is advice
+    # Another text finding the same symptoms shares the composed advice
+    assert cache.get("migraine") is advice
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = AdviceCache(maxsize=2)
+    cache.get("headache")
+    cache.get("fever")
+    cache.get("headache")
+    cache.get("cough")
+    assert cache.stats()["evictions"] == 1
+    cache.get("headache")
+    assert cache.hits == 2
+    cache.get("fever")
+    assert cache.misses == 4
+    assert cache.stats()["size"] == 2
+
+
+def test_cache_expires_entries():
+    now = [0.0]
+    cache = AdviceCache(ttl=10, clock=lambda: now[0])
+    cache.get("fever")
+    now[0] = 9.0
+    cache.get("fever")
+    now[0] = 10.0
+    cache.get("fever")
+    assert (cache.hits, cache.misses, cache.expirations) == (1, 2, 1)
+
+
+def test_long_texts_are_not_cached():
+    cache = AdviceCache(max_text=10)
+    assert cache.get("a fever, then a cough") == generate_advice("a fever, then a cough")
+    assert cache.stats()["size"] == 0
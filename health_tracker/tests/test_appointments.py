@@ -0,0 +1,79 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from healthtrack import AppointmentBook, AppointmentConflict, check_slot
+
+
+def at(hour, minute=0, day=2):
+    return datetime(2026, 3, day, hour, minute)
+
+
+@pytest.fixture
+def book(tmp_path):
+    appointments = AppointmentBook(str(tmp_path / "appointments.jsonl"))
+    yield appointments
+    appointments.close()
+
+
+def test_check_slot():
+    for start in (at(9), at(10, 30), at(16, 30)):
+        check_slot(start)
+    for start in (at(8, 30), at(17), at(10, 15), at(16, 30) + timedelta(seconds=1)):
+        with pytest.raises(ValueError):
+            check_slot(start)
+    # Has to end by closing time
+    with pytest.raises(ValueError):
+        check_slot(at(16, 30), timedelta(hours=1))
+
+
+def test_double_booking_conflicts(book):
+    long = book.book("Dr. Lee", at(10), timedelta(hours=1))
+    with pytest.raises(AppointmentConflict) as conflict:
+        book.book("Dr. Lee", at(10, 30))
+    assert conflict.value.appointment is long
+    with pytest.raises(AppointmentConflict):
+        book.book("Dr. Lee", at(9, 30), timedelta(hours=1))
+    # Back to back and other doctors are fine
+    book.book("Dr. Lee", at(9, 30))
+    book.book("Dr. Lee", at(11))
+    book.book("Dr. Smith", at(10, 30))
+    assert [appointment.start for appointment in book.appointments("Dr. Lee")] == [at(9, 30), at(10), at(11)]
+
+
+def test_next_free_slot(book):
+    assert book.next_free_slot("Dr. Lee", at(7)) == at(9)
+    assert book.next_free_slot("Dr. Lee", at(9, 10)) == at(9, 30)
+    for hour in (9, 10, 11):
+        book.book("Dr. Lee", at(hour))
+        book.book("Dr. Lee", at(hour, 30))
+    # Walks over the back to back bookings
+    assert book.next_free_slot("Dr. Lee", at(9)) == at(12)
+    assert book.next_free_slot("Dr. Smith", at(9)) == at(9)
+    book.book("Dr. Lee", at(16, 30))
+    assert book.next_free_slot("Dr. Lee", at(16, 15)) == at(9, day=3)
+    assert book.next_free_slot("Dr. Lee", at(18)) == at(9, day=3)
+
+
+def test_rebuilt_from_journal_with_torn_last_line(tmp_path):
+    path = str(tmp_path / "appointments.jsonl")
+    appointments = AppointmentBook(path)
+    appointments.book("Dr. Lee", at(9))
+    appointments.book("Dr. Lee", at(10))
+    appointments.close()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 5)
+
+    appointments = AppointmentBook(path)
+    assert [appointment.start for appointment in appointments.appointments("Dr. Lee")] == [at(9)]
+    # The replayed bookings are checked against like any other
+    with pytest.raises(AppointmentConflict):
+        appointments.book("Dr. Lee", at(9))
+    appointments.book("Dr. Lee", at(10))
+    appointments.close()
+
+    appointments = AppointmentBook(path)
+    assert [appointment.start for appointment in appointments.appointments("Dr. Lee")] == [at(9), at(10)]
+    assert appointments.booked_dates() == {at(9).date()}
+    appointments.close()
@@ -0,0 +1,11 @@
+import json
+
+from healthtrack.batch import main
+
+
+def test_notes_are_numbered_by_input_line(tmp_path, capsys):
+    path = tmp_path / "notes.txt"
+    path.write_text("headache\n\nsore throat\n")
+    main([str(path), "--workers", "1"])
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [result["note"] for result in results] == [1, 3]
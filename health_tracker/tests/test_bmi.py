@@ -0,0 +1,54 @@
+import sys
+
+import pytest
+
+from healthtrack import bmi
+from healthtrack.__main__ import main as healthtrack_main
+from healthtrack.bmi import main, read_csv
+
+
+def test_read_csv_skips_blank_lines(tmp_path):
+    path = tmp_path / "people.csv"
+    path.write_text("name,weight,height\nann,70,175\n\nbob,x,180\n")
+    weights, heights = read_csv(str(path))
+    assert list(heights) == [175.0, 180.0]
+    assert weights[0] == 70.0 and weights[1] != weights[1]
+
+
+def test_read_csv_short_row_is_invalid(tmp_path, capsys):
+    path = tmp_path / "people.csv"
+    path.write_text("weight,height\n70\n80,180\n")
+    weights, heights = read_csv(str(path))
+    assert list(weights) == [70.0, 80.0]
+    assert heights[0] != heights[0] and heights[1] == 180.0
+    main([str(path)])
+    assert "Invalid: 1" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [("", "is empty"), ("weight,tall\n70,175\n", "has no 'height' column"), ("a,b\n", "has no 'weight' or 'height' column")],
+)
+def test_bad_input_is_a_usage_error(tmp_path, capsys, text, message):
+    path = tmp_path / "people.csv"
+    path.write_text(text)
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(path)])
+    assert exit_info.value.code == 2
+    assert f"{path} {message}" in capsys.readouterr().err
+
+
+def test_parquet_without_pyarrow(tmp_path, capsys, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(tmp_path / "people.parquet")])
+    assert exit_info.value.code == 2
+    assert "requires pyarrow" in capsys.readouterr().err
+
+
+def test_subcommand_status_is_the_exit_status(monkeypatch):
+    monkeypatch.setattr(bmi, "main", lambda argv: 3)
+    assert healthtrack_main(["bmi"]) == 3
+    monkeypatch.setattr(bmi, "main", lambda argv: None)
+    assert healthtrack_main(["bmi"]) == 0
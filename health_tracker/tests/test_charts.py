@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from healthtrack.charts import TrendTiles, lttb, minmax
+
+
+def readings(count, span, seed=3):
+    # count readings spread over [0, span) with one spike and one dip among the noise
+    rng = random.Random(seed)
+    timestamps = [i * span / count for i in range(count)]
+    values = [rng.random() for _ in range(count)]
+    values[count // 3] = 5.0
+    values[2 * count // 3] = -5.0
+    return timestamps, values
+
+
+def test_lttb_keeps_ends_and_extremes():
+    timestamps, values = readings(10000, 1000)
+    kept_timestamps, kept_values = lttb(timestamps, values, 100)
+    assert len(kept_values) == 100
+    assert (kept_timestamps[0], kept_values[0]) == (timestamps[0], values[0])
+    assert (kept_timestamps[-1], kept_values[-1]) == (timestamps[-1], values[-1])
+    assert max(kept_values) == 5.0 and min(kept_values) == -5.0
+    assert list(kept_timestamps) == sorted(kept_timestamps)
+    # Nothing to drop
+    assert list(lttb(timestamps[:50], values[:50], 100)[1]) == values[:50]
+
+
+def test_minmax_keeps_extremes_of_every_column():
+    timestamps, values = readings(10000, 1000)
+    kept_timestamps, kept_values = minmax(timestamps, values, 0, 10, 100)
+    assert len(kept_values) <= 202
+    assert (kept_timestamps[0], kept_timestamps[-1]) == (timestamps[0], timestamps[-1])
+    assert max(kept_values) == 5.0 and min(kept_values) == -5.0
+    for column in range(100):
+        in_column = [value for timestamp, value in zip(timestamps, values) if column * 10 <= timestamp < (column + 1) * 10]
+        kept = [value for timestamp, value in zip(kept_timestamps, kept_values) if column * 10 <= timestamp < (column + 1) * 10]
+        assert (min(kept), max(kept)) == (min(in_column), max(in_column))
+
+
+@pytest.mark.parametrize("method, most", [("lttb", 16), ("minmax", 34)])
+def test_tiles_are_bounded_and_keep_ends_and_extremes(method, most):
+    # 10000 readings in tile 0, one reading either side of it
+    timestamps, values = readings(10000, 16)
+    timestamps = [-3.0] + timestamps + [20.0]
+    values = [0.5] + values + [0.5]
+    tiles = TrendTiles(timestamps, values, tile_width=16, base_resolution=1, method=method)
+    tile_timestamps, tile_values = tiles.tile(0, 0)
+    # The neighbours either side join the lines up
+    assert (tile_timestamps[0], tile_timestamps[-1]) == (-3.0, 20.0)
+    assert (tile_timestamps[1], tile_timestamps[-2]) == (timestamps[1], timestamps[-2])
+    assert len(tile_values) <= most + 2
+    assert max(tile_values) == 5.0 and min(tile_values) == -5.0
+    assert tiles.tile(0, 0) is tiles.tile(0, 0)
+    assert (tiles.hits, tiles.misses) == (2, 1)
@@ -0,0 +1,68 @@
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+
+import pytest
+
+from healthtrack import RECOMMENDED, GoalSettings, HealthTracker, MetricStore, personal_targets
+
+
+def test_bmi_raises_steps_target():
+    assert personal_targets(GoalSettings(weight=70, height=180), RECOMMENDED)["steps"] == 10000
+    # BMI 27.8
+    assert personal_targets(GoalSettings(weight=90, height=180), RECOMMENDED)["steps"] == 12000
+    # Older and overweight, both apply
+    assert personal_targets(GoalSettings(age=70, weight=90, height=180), RECOMMENDED)["steps"] == 9000
+    # Height alone has no BMI
+    assert personal_targets(GoalSettings(height=180), RECOMMENDED)["steps"] == 10000
+
+
+def test_targets_set_by_hand_win():
+    settings = GoalSettings(weight=90, height=180, targets={"steps": 8000})
+    assert personal_targets(settings, RECOMMENDED)["steps"] == 8000
+
+
+START = date(2026, 3, 2)
+
+
+def at(day, hour=12, minute=0):
+    # Local time, the day buckets are local days
+    return datetime.combine(START + timedelta(days=day), dt_time(hour, minute)).timestamp()
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    with HealthTracker(MetricStore(str(tmp_path))) as tracker:
+        yield tracker
+
+
+def test_new_reading_invalidates_cached_stats(tracker):
+    tracker.record("water", 1.0, at(0))
+    assert tracker.goals.stats("water", START).met == 0
+    tracker.record("water", 1.5, at(0, 18))
+    stats = tracker.goals.stats("water", START)
+    assert (stats.met, stats.current_streak) == (1, 1)
+    # A bulk import into the cached range is picked up too
+    tracker.extend("water", [at(1), at(2)], [2.0, 2.0])
+    stats = tracker.goals.stats("water", START + timedelta(days=2))
+    assert (stats.days, stats.met, stats.current_streak) == (3, 3, 3)
+    tracker.record("water", 1.0, at(3))
+    tracker.goals.stats("water", START + timedelta(days=3))
+    tracker.record("water", 1.0, at(3, 20))
+    assert tracker.goals.stats("water", START + timedelta(days=3)).current_streak == 4
+
+
+def test_streaks_across_day_boundaries(tracker):
+    tracker.record("water", 2.0, at(0))
+    tracker.record("water", 2.0, at(1))
+    # Together they would meet the goal, but they fall on two days
+    tracker.record("water", 1.0, at(2, 23, 59))
+    tracker.record("water", 1.5, at(3, 0, 1))
+    tracker.record("water", 2.0, at(4))
+    tracker.record("water", 2.0, at(5))
+    stats = tracker.goals.stats("water", START + timedelta(days=5))
+    assert (stats.days, stats.met, stats.current_streak, stats.best_streak) == (6, 4, 2, 2)
+    # Today is not over yet, nothing logged so far does not break the streak
+    assert tracker.goals.stats("water", START + timedelta(days=6)).current_streak == 2
+    # A whole missed day does
+    stats = tracker.goals.stats("water", START + timedelta(days=7))
+    assert (stats.days, stats.current_streak, stats.best_streak) == (8, 0, 2)
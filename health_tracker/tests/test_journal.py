@@ -0,0 +1,248 @@
+import io
+import os
+import signal
+import struct
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from healthtrack import AppointmentBook, GroupCommit, MetricLog, journal
+from healthtrack.journal import checksum_line, read_frames, read_lines, write_frame
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def frames(*payloads):
+    f = io.BytesIO()
+    for payload in payloads:
+        write_frame(f, payload)
+    return f.getvalue()
+
+
+def test_read_frames_stops_at_torn_frame():
+    data = frames(b"one", b"two", b"three")
+    end_of_two = len(frames(b"one", b"two"))
+    for cut in range(end_of_two, len(data)):
+        payloads, end = read_frames(data[:cut])
+        assert [bytes(p) for p in payloads] == [b"one", b"two"]
+        assert end == end_of_two
+
+
+def test_read_frames_stops_at_bad_checksum():
+    data = bytearray(frames(b"one", b"two", b"three"))
+    data[len(frames(b"one")) + 8] ^= 0xFF  # first payload byte of "two"
+    payloads, end = read_frames(bytes(data))
+    assert [bytes(p) for p in payloads] == [b"one"]
+    assert end == len(frames(b"one"))
+
+
+def test_read_lines_stops_at_torn_or_corrupt_line():
+    data = checksum_line("first") + checksum_line("second")
+    assert read_lines(data + checksum_line("third")[:-1]) == (["first", "second"], len(data))
+    corrupt = checksum_line("third").replace(b"third", b"thirD")
+    assert read_lines(data + corrupt + checksum_line("fourth")) == (["first", "second"], len(data))
+    # Lines from before checksums are taken as they are
+    assert read_lines(b'{"a": 1}\n' + data)[0] == ['{"a": 1}', "first", "second"]
+
+
+def write_readings(directory, count):
+    log = MetricLog(directory, "steps")
+    for i in range(count):
+        log.append(float(i), 1000.0 + i)
+    log.close()
+    return os.path.join(directory, "steps.0.log")
+
+
+def reopen_values(directory):
+    log = MetricLog(directory, "steps")
+    values = list(log.series.values)
+    log.close()
+    return values
+
+
+@pytest.mark.parametrize("cut", [1, 8, 15, 16, 23])
+def test_metric_log_recovers_committed_prefix(tmp_path, cut):
+    # Every row is its own 24-byte frame (8 header, 16 payload)
+    directory = str(tmp_path)
+    path = write_readings(directory, 10)
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size - cut)
+    assert reopen_values(directory) == [float(i) for i in range(9)]
+    # The torn frame was cut off, so what is written next is read back after it
+    assert os.path.getsize(path) == size - 24
+    log = MetricLog(directory, "steps")
+    log.append(99.0, 5000.0)
+    log.close()
+    assert reopen_values(directory) == [float(i) for i in range(9)] + [99.0]
+
+
+def test_metric_log_drops_corrupt_tail(tmp_path):
+    directory = str(tmp_path)
+    path = write_readings(directory, 10)
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    assert reopen_values(directory) == [float(i) for i in range(9)]
+
+
+def test_legacy_log_torn_record(tmp_path):
+    # Logs from before frames hold bare (timestamp, value) rows
+    rows = b"".join(struct.pack("=dd", 1000.0 + i, float(i)) for i in range(3))
+    (tmp_path / "steps.0.log").write_bytes(rows + rows[:5])
+    assert reopen_values(str(tmp_path)) == [0.0, 1.0, 2.0]
+
+
+def book(path, *hours):
+    appointments = AppointmentBook(path)
+    for hour in hours:
+        appointments.book("Dr. Lee", datetime(2026, 3, 2, hour))
+    appointments.close()
+
+
+def booked_hours(path):
+    appointments = AppointmentBook(path)
+    hours = [appointment.start.hour for appointment in appointments.appointments("Dr. Lee")]
+    appointments.close()
+    return hours
+
+
+def test_appointment_journal_replay(tmp_path):
+    path = str(tmp_path / "appointments.jsonl")
+    book(path, 9, 10, 11)
+    appointments = AppointmentBook(path)
+    appointments.cancel(appointments.appointments("Dr. Lee")[1])
+    appointments.close()
+    assert booked_hours(path) == [9, 11]
+
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size - 3)
+    # The torn cancel is dropped, and cut off so the next booking follows the rest
+    assert booked_hours(path) == [9, 10, 11]
+    book(path, 12)
+    assert booked_hours(path) == [9, 10, 11, 12]
+
+
+def test_appointment_journal_corrupt_line(tmp_path):
+    path = str(tmp_path / "appointments.jsonl")
+    book(path, 9, 10, 11)
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    lines[1] = lines[1].replace(b"10:00", b"10:30")
+    with open(path, "wb") as f:
+        f.writelines(lines)
+    assert booked_hours(path) == [9]
+
+
+def test_failed_booking_write_leaves_no_booking(tmp_path):
+    appointments = AppointmentBook(str(tmp_path / "appointments.jsonl"))
+    appointments._log.close()
+    with pytest.raises(ValueError):
+        appointments.book("Dr. Lee", datetime(2026, 3, 2, 9))
+    assert appointments.appointments("Dr. Lee") == []
+    assert appointments.conflict("Dr. Lee", datetime(2026, 3, 2, 9), datetime(2026, 3, 2, 10)) is None
+
+
+class RecordingFsync:
+    # Stands in for os.fsync, recording when each call started and ended
+    def __init__(self, duration=0.002):
+        self.duration = duration
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, fd):
+        start = time.perf_counter()
+        time.sleep(self.duration)
+        with self.lock:
+            self.calls.append((start, time.perf_counter()))
+
+
+def test_group_commit_waits_for_an_fsync_after_the_write(tmp_path, monkeypatch):
+    fsync = RecordingFsync()
+    monkeypatch.setattr(journal.os, "fsync", fsync)
+    committer = GroupCommit()
+    results = []
+    f = open(tmp_path / "shared.log", "ab")
+    write_lock = threading.Lock()
+
+    def writer():
+        for _ in range(20):
+            with write_lock:
+                f.write(b"x")
+                f.flush()
+                submitted = time.perf_counter()
+                ticket = committer.submit(f)
+            committer.wait(ticket)
+            results.append((ticket, submitted, time.perf_counter()))
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    committer.retire(f)
+    f.close()
+    committer.close()
+
+    assert sorted(ticket for ticket, _, _ in results) == list(range(1, 81))
+    for ticket, submitted, acknowledged in results:
+        # Some fsync ran entirely between the submit and the acknowledgement
+        assert any(submitted <= start and end <= acknowledged for start, end in fsync.calls), ticket
+    # Concurrent writers shared passes
+    assert len(fsync.calls) < 80
+
+
+def test_group_commit_reports_fsync_errors(tmp_path, monkeypatch):
+    def failing_fsync(fd):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(journal.os, "fsync", failing_fsync)
+    committer = GroupCommit()
+    with open(tmp_path / "x.log", "ab") as f:
+        f.write(b"x")
+        f.flush()
+        with pytest.raises(OSError):
+            committer.wait(committer.submit(f))
+    committer.close()
+
+
+# Appends readings, printing how many are durable after every sync
+KILLED_WRITER = """
+import sys
+from healthtrack import MetricLog
+log = MetricLog(sys.argv[1], "steps", compact_every=1000)
+i = 0
+while True:
+    log.append(float(i), float(i))
+    i += 1
+    if i % 10 == 0:
+        log.sync()
+        print(i, flush=True)
+"""
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs SIGKILL")
+def test_killed_writer_keeps_every_synced_reading(tmp_path):
+    directory = str(tmp_path)
+    writer = subprocess.Popen(
+        [sys.executable, "-c", KILLED_WRITER, directory],
+        stdout=subprocess.PIPE,
+        env=dict(os.environ, PYTHONPATH=APP_DIR),
+        text=True,
+    )
+    synced = 0
+    while synced < 2500:
+        synced = int(writer.stdout.readline())
+    writer.send_signal(signal.SIGKILL)
+    writer.wait()
+    writer.stdout.close()
+    values = reopen_values(directory)
+    assert len(values) >= synced
+    assert values == [float(i) for i in range(len(values))]
@@ -0,0 +1,51 @@
+import pytest
+
+from healthtrack import ProfileManager
+
+
+def test_leased_tracker_outlives_eviction(tmp_path):
+    with ProfileManager(str(tmp_path), max_open=1) as profiles:
+        with profiles.lease("alice") as alice:
+            profiles.get("bob")
+            assert profiles.open_profiles() == ["bob"]
+            # Still open for the task that holds it
+            alice.record("steps", 100)
+            assert alice.records.find() == []
+            # Asking for it again gives the same tracker back
+            assert profiles.get("alice") is alice
+        # Back in the LRU, the end of the lease leaves it open
+        alice.record("steps", 50)
+        assert alice.total_today("steps") == 150
+
+
+def test_tracker_closed_after_last_lease(tmp_path):
+    with ProfileManager(str(tmp_path), max_open=1) as profiles:
+        alice = profiles.acquire("alice")
+        profiles.acquire("alice")
+        profiles.get("bob")
+        profiles.release("alice")
+        alice.record("steps", 1)
+        profiles.release("alice")
+        with pytest.raises(ValueError):
+            alice.record("steps", 1)
+        # The profile can be opened again once it is closed
+        assert profiles.get("alice").total_today("steps") == 1
+
+
+def test_unleased_tracker_closed_on_eviction(tmp_path):
+    with ProfileManager(str(tmp_path), max_open=1) as profiles:
+        alice = profiles.get("alice")
+        profiles.get("bob")
+        with pytest.raises(ValueError):
+            alice.record("steps", 1)
+
+
+def test_legacy_data_only_moved_when_asked(tmp_path):
+    (tmp_path / "steps.log").write_bytes(b"")
+    (tmp_path / "appointments.jsonl").write_text("")
+    profiles = ProfileManager(str(tmp_path))
+    assert profiles.names() == []
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ["appointments.jsonl", "steps.log"]
+    profiles.adopt_legacy_data()
+    assert profiles.names() == ["default"]
+    assert sorted(entry.name for entry in (tmp_path / "profiles" / "default").iterdir()) == ["appointments.jsonl", "steps.log"]
@@ -0,0 +1,64 @@
+import os
+import random
+import threading
+
+from healthtrack.records import RecordStore
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def stored_chunks(store):
+    return sum(len(files) for _, _, files in os.walk(store.chunk_directory))
+
+
+def test_round_trip_and_chunks_shared_between_versions(tmp_path):
+    store = RecordStore(str(tmp_path / "records"))
+    data = random.Random(1).randbytes(2 << 20)
+    first = store.ingest(write(tmp_path / "scan.pdf", data), doctor="Dr. Lee")
+    chunks = stored_chunks(store)
+    assert chunks > 4
+    edited = data[:1 << 20] + b"amended" + data[1 << 20:]
+    second = store.ingest(write(tmp_path / "scan-v2.pdf", edited))
+    # Only the chunks around the edit are new
+    assert chunks < stored_chunks(store) <= chunks + 3
+    assert b"".join(store.read(first)) == data
+    assert b"".join(store.read(second)) == edited
+    assert (first.record_type, first.size) == ("pdf", len(data))
+    assert [record.id for record in store.find(doctor="Dr. Lee")] == [first.id]
+    store.close()
+
+
+def test_duplicate_ingest(tmp_path):
+    store = RecordStore(str(tmp_path / "records"))
+    path = write(tmp_path / "labs.csv", b"hb,13.5\n" * 10000)
+    first = store.ingest(path)
+    again = store.ingest(path)
+    assert not first.duplicate
+    assert again.duplicate and again.id == first.id
+    assert len(store.find()) == 1
+    store.close()
+
+
+def test_concurrent_duplicate_ingest(tmp_path):
+    store = RecordStore(str(tmp_path / "records"))
+    path = write(tmp_path / "labs.csv", random.Random(2).randbytes(1 << 20))
+    barrier = threading.Barrier(4)
+    results = []
+
+    def upload():
+        barrier.wait()
+        results.append(store.ingest(path))
+
+    threads = [threading.Thread(target=upload) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4
+    assert sorted(record.duplicate for record in results) == [False, True, True, True]
+    assert len({record.id for record in results}) == 1
+    store.close()
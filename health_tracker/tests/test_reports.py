@@ -0,0 +1,64 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from healthtrack import HealthTracker, MetricStore
+from healthtrack.reports import COLUMNS, profile_rows, split_range
+
+
+def test_split_by_month():
+    assert split_range(date(2025, 12, 31), date(2026, 3, 1), "month") == [
+        (date(2025, 12, 31), date(2025, 12, 31)),
+        (date(2026, 1, 1), date(2026, 1, 31)),
+        (date(2026, 2, 1), date(2026, 2, 28)),
+        (date(2026, 3, 1), date(2026, 3, 1)),
+    ]
+    assert split_range(date(2028, 2, 1), date(2028, 2, 29), "month") == [(date(2028, 2, 1), date(2028, 2, 29))]
+
+
+def test_split_by_week():
+    # 2026-03-01 is a Sunday, weeks run Monday to Sunday
+    assert split_range(date(2026, 3, 1), date(2026, 3, 16), "week") == [
+        (date(2026, 3, 1), date(2026, 3, 1)),
+        (date(2026, 3, 2), date(2026, 3, 8)),
+        (date(2026, 3, 9), date(2026, 3, 15)),
+        (date(2026, 3, 16), date(2026, 3, 16)),
+    ]
+    assert split_range(date(2026, 3, 4), date(2026, 3, 4), "week") == [(date(2026, 3, 4), date(2026, 3, 4))]
+
+
+def test_split_rejects_bad_ranges():
+    assert split_range(date(2026, 3, 4), date(2026, 5, 1)) == [(date(2026, 3, 4), date(2026, 5, 1))]
+    with pytest.raises(ValueError):
+        split_range(date(2026, 3, 4), date(2026, 3, 3))
+    with pytest.raises(ValueError):
+        split_range(date(2026, 3, 4), date(2026, 3, 5), "year")
+
+
+def test_profile_rows(tmp_path):
+    start = date(2026, 3, 2)
+
+    def at(day):
+        return datetime.combine(start + timedelta(days=day), time(12)).timestamp()
+
+    directory = str(tmp_path / "alice")
+    with HealthTracker(MetricStore(directory)) as tracker:
+        for day, liters in enumerate((2.0, 2.5, 1.0, 2.0, 3.0)):
+            tracker.record("water", liters, at(day))
+        tracker.record("steps", 4000.0, at(1))
+        tracker.record("steps", 2000.0, at(1))
+        tracker.record_bmi(70, 175, at(0))
+        tracker.record_bmi(68, 175, at(4))
+
+    ranges = [(start, start + timedelta(days=2)), (start + timedelta(days=3), start + timedelta(days=6))]
+    # Days after today are not judged yet
+    first, second = [dict(zip(COLUMNS, row)) for row in profile_rows(directory, "alice", ranges, start + timedelta(days=4))]
+    assert (first["profile"], first["start"], first["end"], first["days"]) == ("alice", "2026-03-02", "2026-03-04", 3)
+    assert (first["water_total"], first["water_logged_days"], first["water_goal_met"], first["water_best_streak"]) == (5.5, 3, 2, 2)
+    assert first["water_daily_mean"] == pytest.approx(5.5 / 3)
+    assert (first["steps_total"], first["steps_logged_days"]) == (6000.0, 1)
+    assert (first["sleep_total"], first["sleep_daily_mean"]) == (0, None)
+    assert (second["water_total"], second["water_goal_met"], second["water_attainment"]) == (5.0, 2, 1.0)
+    assert first["bmi_readings"] == 1 and second["bmi_readings"] == 1
+    assert second["bmi_last"] == pytest.approx(68 / 1.75 ** 2)
+    assert second["bmi_category"] == "Normal weight"
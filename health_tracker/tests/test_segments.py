@@ -0,0 +1,49 @@
+import os
+from array import array
+
+from healthtrack import MetricLog
+from healthtrack import segments
+from healthtrack.segments import Segment, write_segment
+
+DAY = 86400
+
+
+def test_round_trip_and_day_index(tmp_path):
+    path = str(tmp_path / "steps.seg")
+    timestamps = array("d", [10, 20, DAY + 5, 3 * DAY])
+    values = array("d", [1, 2, 4, 8])
+    write_segment(path, timestamps, values, 3, 0)
+    segment = Segment(path)
+    assert (len(segment), segment.generation) == (4, 3)
+    assert list(segment.timestamps) == list(timestamps)
+    assert list(segment.values) == list(values)
+    assert segment.days(0) == [(0, 0, 2, 3.0, 1.0, 2.0), (1, 2, 1, 4.0, 4.0, 4.0), (3, 3, 1, 8.0, 8.0, 8.0)]
+    # Built for another offset, readers fall back to the columns
+    assert segment.days(3600) is None
+    assert segment.rows_between(DAY, 3 * DAY) == (2, 3)
+    segment.close()
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_reopen_after_compaction(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    synced = []
+    fsync_directory = segments.fsync_directory
+
+    def record_sync(path):
+        # The segment's entry must be durable while the old log still exists
+        synced.append(sorted(name for name in os.listdir(path) if ".log" in name or name.endswith(".seg")))
+        fsync_directory(path)
+
+    monkeypatch.setattr(segments, "fsync_directory", record_sync)
+    log = MetricLog(directory, "steps", compact_every=5)
+    for i in range(12):
+        log.append(float(i), i * DAY / 4)
+    assert log.generation == 2
+    assert len(synced) == 2 and all(any(".log" in name for name in names) for names in synced)
+    log.close()
+
+    log = MetricLog(directory, "steps", compact_every=5)
+    assert list(log.series.values) == [float(i) for i in range(12)]
+    assert len(log.segment) == 10 and len(log.tail) == 2
+    log.close()
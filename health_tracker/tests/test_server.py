@@ -0,0 +1,95 @@
+import asyncio
+import os
+
+import pytest
+
+from healthtrack import ProfileManager
+from healthtrack.server import HealthService
+
+
+@pytest.fixture
+def request_service(tmp_path):
+    # request_service(method, path, body=None) -> (status, payload) from a service
+    # on a fresh data directory
+    loop = asyncio.new_event_loop()
+    profiles = ProfileManager(str(tmp_path))
+    service = HealthService(profiles)
+
+    def request(method, path, body=None):
+        return loop.run_until_complete(service.handle(method, path, body))
+
+    yield request
+    service.executor.shutdown()
+    profiles.close()
+    loop.close()
+
+
+def test_appointments_only_in_opening_hours_on_slots(request_service):
+    for start in ("2026-03-02T03:17", "2026-03-02T10:15", "2026-03-02T17:00"):
+        status, body = request_service("POST", "/profiles/alice/appointments", {"doctor": "Dr. Lee", "start": start})
+        assert status == 400, body
+    status, body = request_service("POST", "/profiles/alice/appointments", {"doctor": "Dr. Lee", "start": "2026-03-02T16:30"})
+    assert status == 201
+    status, body = request_service("POST", "/profiles/alice/appointments", {"doctor": "Dr. Lee", "start": "2026-03-02T16:30"})
+    assert status == 409
+    assert body["next_free"] == "2026-03-03T09:00:00"
+
+
+def test_profile_open_in_another_process(tmp_path, request_service, hold_store):
+    holder = hold_store(os.path.join(str(tmp_path), "profiles", "alice"))
+    reading = {"metric": "steps", "value": 500}
+    status, body = request_service("POST", "/profiles/alice/readings", reading)
+    assert status == 409
+    assert f"process {holder.pid}" in body["error"]
+    status, body = request_service("GET", "/profiles/alice/summary")
+    assert status == 409
+    # Other profiles are not affected
+    assert request_service("POST", "/profiles/bob/readings", reading)[0] == 201
+
+    holder.stdin.close()
+    holder.wait()
+    assert request_service("POST", "/profiles/alice/readings", reading)[0] == 201
+    status, body = request_service("GET", "/profiles/alice/summary")
+    assert status == 200
+    assert body["steps"]["today"] == 500
+
+
+def test_client_errors_are_400(request_service):
+    for path, body in (
+        ("/bmi", {"weight": 70}),
+        ("/bmi", {"weight": "70", "height": 180}),
+        ("/bmi", {"weight": True, "height": 180}),
+        ("/bmi", [1]),
+        ("/profiles/alice/readings", {"metric": "steps", "value": float("nan")}),
+        ("/profiles/alice/readings", {"metric": "steps", "value": float("inf")}),
+        ("/profiles/alice/readings", [{"metric": "steps", "value": 1}, 1]),
+        ("/advice", {"symptoms": 5}),
+        ("/batch", [1]),
+        ("/batch", [{"method": "GET"}]),
+    ):
+        status, payload = request_service("POST", path, body)
+        assert status == 400, (path, body, payload)
+    status, payload = request_service("POST", "/batch", [{"method": "POST", "path": "/bmi", "body": [1]}])
+    assert status == 200
+    assert payload[0]["status"] == 400
+    # Nothing was written by the rejected readings
+    status, payload = request_service("GET", "/profiles/alice/summary")
+    assert payload["steps"]["today"] == 0
+
+
+def test_over_long_request_line(tmp_path):
+    async def exchange():
+        profiles = ProfileManager(str(tmp_path))
+        service = HealthService(profiles)
+        await service.start(port=0)
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", service.port)
+            writer.write(b"GET /" + b"x" * 100000 + b" HTTP/1.1\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            return response
+        finally:
+            await service.close()
+            profiles.close()
+
+    assert asyncio.run(exchange()).startswith(b"HTTP/1.1 431 ")
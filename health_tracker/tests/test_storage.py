@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from healthtrack import HealthTracker, MetricLog, MetricStore, StoreLocked, read_series
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_second_process_cannot_open_store(tmp_path, hold_store):
+    directory = str(tmp_path)
+    holder = hold_store(directory)
+    with pytest.raises(StoreLocked, match=f"process {holder.pid}"):
+        MetricStore(directory)
+    with pytest.raises(StoreLocked):
+        MetricLog(directory, "steps")
+    # Reading needs no lock
+    assert list(read_series(directory, "steps").values) == [1.0]
+    holder.stdin.close()
+    holder.wait()
+    with MetricStore(directory) as store:
+        store.append("steps", 2.0, 2.0)
+        assert list(store.series("steps").values) == [1.0, 2.0]
+
+
+def test_lock_released_when_holder_dies(tmp_path, hold_store):
+    directory = str(tmp_path)
+    holder = hold_store(directory)
+    holder.kill()
+    holder.wait()
+    with MetricStore(directory) as store:
+        assert list(store.series("steps").values) == [1.0]
+
+
+def test_second_store_in_same_process(tmp_path):
+    with HealthTracker(MetricStore(str(tmp_path))):
+        with pytest.raises(StoreLocked):
+            MetricStore(str(tmp_path))
+    MetricStore(str(tmp_path)).close()
+
+
+def test_compaction_keeps_every_reading(tmp_path):
+    directory = str(tmp_path)
+    with MetricStore(directory, compact_every=10) as store:
+        for i in range(35):
+            store.append("steps", float(i), float(i))
+        assert store.log("steps").generation == 3
+    with MetricStore(directory) as store:
+        assert list(store.series("steps").values) == [float(i) for i in range(35)]
+    assert sorted(os.listdir(directory)) == ["steps.3.log", "steps.3.seg", "store.lock"]
+
+
+# Appends argv[2] readings to argv[1], compacting every 100
+APPEND_READINGS = """
+import sys
+from healthtrack import MetricLog
+log = MetricLog(sys.argv[1], "steps", compact_every=100)
+for i in range(int(sys.argv[2])):
+    log.append(float(i), float(i))
+    if i % 20 == 0:
+        log.sync()
+log.close()
+"""
+
+
+def test_reader_during_compactions(tmp_path):
+    # Every read sees a prefix of what was written, however the compactions fall
+    directory = str(tmp_path)
+    writer = subprocess.Popen(
+        [sys.executable, "-c", APPEND_READINGS, directory, "20000"], env=dict(os.environ, PYTHONPATH=APP_DIR)
+    )
+    seen = 0
+    while writer.poll() is None:
+        values = list(read_series(directory, "steps").values)
+        assert values == [float(i) for i in range(len(values))]
+        assert len(values) >= seen
+        seen = len(values)
+    assert writer.returncode == 0
+    assert len(read_series(directory, "steps")) == 20000
@@ -0,0 +1,29 @@
+from datetime import date, datetime, timedelta, timezone
+
+from healthtrack.summary import RollingSummary
+
+TODAY = date(2026, 3, 10)
+
+
+def at(day):
+    return datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc).timestamp()
+
+
+def test_future_reading_does_not_replace_today():
+    summary = RollingSummary(utc_offset=0)
+    summary.add(100.0, at(TODAY))
+    summary.add(5.0, at(TODAY + timedelta(days=3)))
+    assert summary.window(1, TODAY).sum == 100.0
+    assert summary.window(7, TODAY).sum == 100.0
+    assert summary.window(7, TODAY).logged_days == 1
+    assert summary.window(1, TODAY + timedelta(days=3)).sum == 5.0
+
+
+def test_window_for_a_past_day():
+    summary = RollingSummary(utc_offset=0)
+    summary.extend([at(TODAY - timedelta(days=10)), at(TODAY)], [100.0, 7.0])
+    past = summary.window(1, TODAY - timedelta(days=10))
+    assert (past.sum, past.logged_days, past.min, past.max) == (100.0, 1, 100.0, 100.0)
+    assert summary.window(30, TODAY - timedelta(days=1)).sum == 100.0
+    assert summary.window(30, TODAY).sum == 107.0
+    assert summary.window(1, TODAY).sum == 7.0
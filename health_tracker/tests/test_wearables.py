@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+from healthtrack.wearables import main, read_apple_health, read_csv, read_jsonl
+
+
+def rows(text):
+    return list(read_csv(io.StringIO(text), "steps.csv"))
+
+
+def test_read_csv():
+    assert rows("metric,timestamp,value\nsteps,60,500\n\nwater,120,0.5\n") == [("steps", 60.0, 500.0), ("water", 120.0, 0.5)]
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("metric,time,value\n", "steps.csv: missing column 'timestamp'"),
+        ("metric,timestamp,value\nsteps,60\n", "steps.csv, line 2: expected 3 fields, got 2"),
+        ("metric,timestamp,value\nsteps,60,500\n\nsteps,120,lots\n", "steps.csv, line 4: could not convert"),
+        ("metric,timestamp,value\nsteps,1700000000,nan\n", "steps.csv, line 2: non-finite"),
+        ("metric,timestamp,value\nsteps,inf,5\n", "steps.csv, line 2: non-finite"),
+    ],
+)
+def test_bad_csv_names_file_and_line(text, message):
+    with pytest.raises(ValueError, match=message):
+        rows(text)
+
+
+def test_read_jsonl():
+    text = '{"metric": "steps", "timestamp": 60, "value": 500}\n\n{"metric": "water", "timestamp": "1970-01-01T00:02:00Z", "value": 0.5}\n'
+    assert list(read_jsonl(io.StringIO(text), "steps.jsonl")) == [("steps", 60.0, 500.0), ("water", 120.0, 0.5)]
+
+
+@pytest.mark.parametrize(
+    "line, message",
+    [
+        ('{"metric": "steps", "value": 5}', "missing field 'timestamp'"),
+        ('{"metric": "steps", "timestamp": 60, "value": 5', "Expecting"),
+        ("[1]", "expected a JSON object"),
+        ('{"metric": "steps", "timestamp": 60, "value": "lots"}', "could not convert"),
+        ('{"metric": "steps", "timestamp": 60, "value": NaN}', "non-finite"),
+        ('{"metric": "steps", "timestamp": "inf", "value": 5}', "non-finite"),
+    ],
+)
+def test_bad_jsonl_names_file_and_line(line, message):
+    text = '{"metric": "steps", "timestamp": 60, "value": 500}\n\n' + line + "\n"
+    with pytest.raises(ValueError, match=f"steps.jsonl, line 3: .*{message}"):
+        list(read_jsonl(io.StringIO(text), "steps.jsonl"))
+
+
+def apple_export(*records):
+    return io.BytesIO(
+        (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<HealthData locale="en_US">\n'
+            + "".join(f'<Record type="HKQuantityTypeIdentifierStepCount" {record}/>\n' for record in records)
+            + "</HealthData>\n"
+        ).encode("utf-8")
+    )
+
+
+def test_read_apple_health():
+    source = apple_export('startDate="1970-01-01 00:01:00 +0000" value="500"')
+    assert list(read_apple_health(source, "export.xml")) == [("steps", 60, 500.0)]
+
+
+@pytest.mark.parametrize(
+    "record, message",
+    [
+        ('startDate="1970-01-01 00:01:00 +0000" value="NaN"', "non-finite"),
+        ('value="5"', "missing attribute 'startDate'"),
+    ],
+)
+def test_bad_apple_health_names_file_and_record(record, message):
+    source = apple_export('startDate="1970-01-01 00:01:00 +0000" value="500"', record)
+    with pytest.raises(ValueError, match=f"export.xml, record 2: {message}"):
+        list(read_apple_health(source, "export.xml"))
+
+
+def test_bad_import_is_a_usage_error(tmp_path, capsys):
+    path = tmp_path / "bad.jsonl"
+    path.write_text('{"metric": "steps", "value": 5}\n')
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--data-dir", str(tmp_path / "data"), "import", str(path)])
+    assert exit_info.value.code == 2
+    assert f"{path}, line 1: missing field 'timestamp'" in capsys.readouterr().err
@@ -0,0 +1,118 @@
+# Light and dark themes built on ttk.Style.
+#
+# ttk widgets take their colors from the style database, so switching theme is one
+# set of style updates however many widgets exist; nothing walks the widget tree.
+# The few classic Tk widgets (Text, Canvas, Toplevel) have no style, they subscribe
+# with on_change() and are recolored by their owner.
+from tkinter import ttk
+
+THEMES = {
+    "light": {
+        "background": "#f0f4f7",
+        "foreground": "#000000",
+        "field": "#ffffff",
+        "border": "#b8c2cc",
+        "active": "#dde6ee",
+        "select": "#4a90d9",
+        "select_foreground": "#ffffff",
+        "disabled": "#8a939b",
+    },
+    "dark": {
+        "background": "#2e2e2e",
+        "foreground": "#f0f4f7",
+        "field": "#3a3a3a",
+        "border": "#555555",
+        "active": "#454545",
+        "select": "#4a90d9",
+        "select_foreground": "#ffffff",
+        "disabled": "#8a8a8a",
+    },
+}
+
+
+class ThemeManager:
+    def __init__(self, root, name="light"):
+        self.root = root
+        self.style = ttk.Style(root)
+        # The native Windows and macOS themes ignore background colors on most
+        # widgets, clam draws with whatever colors the style gives it everywhere
+        self.style.theme_use("clam")
+        self.name = None
+        self.colors = None
+        self._listeners = []
+        self.use(name)
+
+    def on_change(self, callback):
+        # callback(colors) now and after every switch, returns a function that unsubscribes
+        self._listeners.append(callback)
+        callback(self.colors)
+        return lambda: self._listeners.remove(callback)
+
+    def toggle(self):
+        self.use("light" if self.name == "dark" else "dark")
+
+    def use(self, name):
+        colors = THEMES[name]
+        self.name = name
+        self.colors = colors
+        self.style.configure(
+            ".",
+            background=colors["background"],
+            foreground=colors["foreground"],
+            fieldbackground=colors["field"],
+            bordercolor=colors["border"],
+            lightcolor=colors["background"],
+            darkcolor=colors["background"],
+            troughcolor=colors["field"],
+            selectbackground=colors["select"],
+            selectforeground=colors["select_foreground"],
+            insertcolor=colors["foreground"],
+        )
+        self.style.map(
+            ".",
+            background=[("disabled", colors["background"]), ("active", colors["active"])],
+            foreground=[("disabled", colors["disabled"])],
+        )
+        # clam maps these itself, so they have to be overridden by name
+        self.style.configure("TButton", background=colors["field"])
+        self.style.map("TButton", background=[("pressed", colors["active"]), ("active", colors["active"])])
+        self.style.map("TCombobox", fieldbackground=[("readonly", colors["field"])])
+        # Classic widgets created from now on, such as the combobox drop-down lists
+        for option, value in (
+            ("*Background", colors["background"]),
+            ("*Foreground", colors["foreground"]),
+            ("*selectBackground", colors["select"]),
+            ("*selectForeground", colors["select_foreground"]),
+        ):
+            self.root.option_add(option, value)
+        self.root.configure(bg=colors["background"])
+        for callback in list(self._listeners):
+            callback(colors)
+
+
+def style_text(widget):
+    # on_change callback for a tk.Text or tk.Entry
+    def apply(colors):
+        widget.configure(bg=colors["field"], fg=colors["foreground"], insertbackground=colors["foreground"])
+
+    return apply
+
+
+def style_window(window):
+    # on_change callback for a tk.Toplevel, tk.Canvas or anything else with just a background
+    def apply(colors):
+        window.configure(bg=colors["background"])
+
+    return apply
+
+
+def subscribe(theme, widget, callback):
+    # Follows the theme until widget is destroyed
+    unsubscribe = theme.on_change(callback)
+
+    def destroyed(event):
+        if event.widget is widget:
+            unsubscribe()
+
+    widget.bind("<Destroy>", destroyed, add="+")
+
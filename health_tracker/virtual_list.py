@@ -0,0 +1,118 @@
+# A scrolling list for Tk that only has widgets for the rows in view.
+#
+# A fixed pool of row widgets is laid out once and re-pointed at different rows as
+# the list scrolls, so a 100,000-row log costs the same widgets and memory as a
+# 20-row one. Rows are fetched through get_row(index) only when they come into view.
+# Scroll, wheel and resize events only record what changed and schedule one redraw
+# for when Tk is next idle, however many of them arrive in a burst.
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualList(ttk.Frame):
+    def __init__(self, master, columns, get_row, row_count=0, widths=None, visible_rows=15, **options):
+        super().__init__(master, **options)
+        self.columns = columns
+        self.get_row = get_row
+        self.row_count = row_count
+        self.widths = widths or [15] * len(columns)
+        self.top = 0
+        self.pool = []
+        self.pool_size = 0
+        self._shown = []
+        self._pending_draw = None
+
+        for column, (title, width) in enumerate(zip(columns, self.widths)):
+            ttk.Label(self, text=title, width=width, font=("Helvetica", 10, "bold")).grid(row=0, column=column, sticky="w")
+        self.body = ttk.Frame(self)
+        self.body.grid(row=1, column=0, columnspan=len(columns), sticky="nsew")
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.grid(row=0, column=len(columns), rowspan=2, sticky="ns")
+        self.rowconfigure(1, weight=1)
+
+        self._resize_pool(visible_rows)
+        self.body.bind("<Configure>", self._resized)
+        self._bind_wheel(self.body)
+        self.schedule_draw()
+
+    def _resize_pool(self, size):
+        # Rows past the new size are hidden rather than destroyed, to be reused if
+        # the list grows again
+        while len(self.pool) < size:
+            labels = []
+            for column, width in enumerate(self.widths):
+                label = ttk.Label(self.body, text="", width=width, anchor="w")
+                label.grid(row=len(self.pool), column=column, sticky="w")
+                self._bind_wheel(label)
+                labels.append(label)
+            self.pool.append(labels)
+            self._shown.append(None)
+        for slot in range(min(size, self.pool_size), max(size, self.pool_size)):
+            for label in self.pool[slot]:
+                if slot < size:
+                    label.grid()
+                else:
+                    label.grid_remove()
+        self.pool_size = size
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._wheel)
+        widget.bind("<Button-4>", self._wheel)
+        widget.bind("<Button-5>", self._wheel)
+
+    def _resized(self, event):
+        # Only the pool size depends on the height, the rows themselves never move
+        row_height = max(self.pool[0][0].winfo_reqheight(), 1)
+        size = max(1, event.height // row_height)
+        if event.height > 1 and size != self.pool_size:
+            self._resize_pool(size)
+            self.scroll_to(self.top)
+
+    def _wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.top - 3)
+        else:
+            self.scroll_to(self.top + 3)
+        return "break"
+
+    def yview(self, *args):
+        # Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"/"pages")
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * self.row_count))
+        elif args[0] == "scroll":
+            step = self.pool_size if args[2] == "pages" else 1
+            self.scroll_to(self.top + int(args[1]) * step)
+
+    def scroll_to(self, index):
+        self.top = max(0, min(index, self.row_count - self.pool_size))
+        self.schedule_draw()
+
+    def set_rows(self, row_count, get_row=None):
+        # Points the list at new data, every row in the pool is drawn again (-1 is
+        # never a row index, None means the slot is blank)
+        self.row_count = row_count
+        if get_row is not None:
+            self.get_row = get_row
+        self._shown = [-1] * len(self.pool)
+        self.scroll_to(self.top)
+
+    def schedule_draw(self):
+        if self._pending_draw is None:
+            self._pending_draw = self.after_idle(self.draw)
+
+    def draw(self):
+        self._pending_draw = None
+        for slot, labels in enumerate(self.pool[: self.pool_size]):
+            index = self.top + slot
+            if index >= self.row_count:
+                index = None
+            if self._shown[slot] == index:
+                continue
+            self._shown[slot] = index
+            values = self.get_row(index) if index is not None else ("",) * len(labels)
+            for label, value in zip(labels, values):
+                label.configure(text=value)
+        if self.row_count:
+            self.scrollbar.set(self.top / self.row_count, min(self.top + self.pool_size, self.row_count) / self.row_count)
+        else:
+            self.scrollbar.set(0, 1)